@@ -1,4 +1,4 @@
-from .abcs import Behavior, BehaviorManager, Browser, Driver, Tab
+from .abcs import Behavior, BehaviorManager, Browser, Driver, Frontier, Tab
 from .automation import (
     AutomationConfig,
     BrowserExitInfo,
@@ -47,6 +47,7 @@ __all__ = [
     "CrawlerTab",
     "Driver",
     "DriverError",
+    "Frontier",
     "Helper",
     "LocalBrowserDiver",
     "MultiBrowserDriver",
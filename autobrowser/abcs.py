@@ -1,13 +1,24 @@
 from abc import ABCMeta, abstractmethod
 from asyncio import AbstractEventLoop, Task
-from typing import Any, Awaitable, Dict, List, Optional, TYPE_CHECKING, Union
+from typing import (
+    Any,
+    Awaitable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    TYPE_CHECKING,
+    Tuple,
+    Union,
+)
 
 from pyee2 import EventEmitterS
 
 if TYPE_CHECKING:
     from autobrowser.automation import AutomationConfig, BrowserExitInfo, TabClosedInfo
+    from autobrowser.frontier import AdmissionResult
 
-__all__ = ["Behavior", "BehaviorManager", "Browser", "Driver", "Tab"]
+__all__ = ["Behavior", "BehaviorManager", "Browser", "Driver", "Frontier", "Tab"]
 
 
 # we use ABCMeta in order to not force a __dict__ on any subclass that does not explicitly opt in for one
@@ -297,6 +308,160 @@ class Driver(metaclass=ABCMeta):
         """
 
 
+class Frontier(metaclass=ABCMeta):
+    """This class defines the expected interface for all frontiers, the source of the
+    URLs crawled by a crawler tab.
+
+    Frontier lifecycle:
+     - init() -> load the frontier's configuration, optionally waiting for the q to become populated
+     - crawl loop -> while(next_url() is not None): crawl the URL, add_all(outlinks),
+       remove_current_from_pending
+     - release() -> complete any outstanding URLs
+    """
+
+    __slots__: List[str] = []
+
+    @property
+    @abstractmethod
+    def did_wait(self) -> bool:
+        """Returns T/F indicating if the frontier has waited for the q to become populated"""
+
+    @abstractmethod
+    async def init(self) -> bool:
+        """Initialize the frontier. Returns T/F indicating if the frontier is exhausted"""
+
+    @abstractmethod
+    def crawling_new_page(self, page_url: str) -> None:
+        """Indicate to the frontier that we are now crawling a new page
+
+        :param page_url: The URL of the page being crawled
+        """
+
+    @abstractmethod
+    def next_depth(self) -> int:
+        """Returns the depth the outlinks of the currently crawled URL are to be crawled at"""
+
+    @abstractmethod
+    async def wait_for_populated_q(
+        self, max_time: Union[int, float] = 60, poll_rate: Union[int, float] = 5
+    ) -> bool:
+        """Waits for the q to become populated or max_time is reached.
+
+        :param max_time: The maximum amount of time to wait for the frontier to become populated
+        :param poll_rate: The interval time in seconds for polling the q, if the frontier polls
+        :return: T/F indicating if the frontier is still exhausted or not
+        """
+
+    @abstractmethod
+    async def q_len(self) -> int:
+        """Returns the number of URLs queued"""
+
+    @abstractmethod
+    async def exhausted(self) -> bool:
+        """Returns T/F indicating if the frontier is exhausted"""
+
+    @abstractmethod
+    async def is_seen(self, url: str) -> bool:
+        """Returns T/F indicating if the supplied URL has been seen
+
+        :param url: The URL to be tested
+        """
+
+    @abstractmethod
+    async def next_url(self) -> Optional[str]:
+        """Claims the next URL to be crawled, adding it to the pending set.
+
+        :return: The next URL to be crawled or None if the frontier is exhausted
+        """
+
+    @abstractmethod
+    async def remove_current_from_pending(self) -> None:
+        """Indicates that the currently crawled URL has been crawled"""
+
+    @abstractmethod
+    async def retry_current(self) -> bool:
+        """Returns the currently crawled URL, whose navigation failed, to the q to be
+        crawled again after a backoff counting a retry
+
+        :return: T/F indicating if the URL will be retried rather than failed
+        """
+
+    @abstractmethod
+    async def park_current(self, delay: float) -> bool:
+        """Returns the currently crawled URL, whose host is backing off, to the q to be
+        crawled once the supplied delay has elapsed without counting a retry
+
+        :param delay: The number of seconds the URL is parked for
+        :return: T/F indicating if the URL is not to be navigated to, as it was parked
+        or it was returned to the q already, e.g. its lease expired, or False if the
+        frontier can not park URLs
+        """
+
+    @abstractmethod
+    async def mark_crawled(self, url: str, aliases: Iterable[str] = ()) -> bool:
+        """Marks the page being crawled as seen and crawled under the supplied URL,
+        the URL of the page after any redirects, and its aliases so that the page is
+        not queued or crawled again under any of them
+
+        :param url: The URL of the page after any redirects
+        :param aliases: The other URLs of the page, e.g. its canonical URL
+        :return: T/F indicating if the page was not crawled before under the URL
+        or its aliases for a claimed URL other than the currently crawled URL
+        """
+
+    @abstractmethod
+    async def release(self) -> None:
+        """Completes any crawled URLs and returns any claimed but not crawled URLs to the q"""
+
+    @abstractmethod
+    async def add(self, url: str, depth: int) -> bool:
+        """Conditionally adds a URL to frontier.
+
+        :param url: The URL to maybe add to the frontier
+        :param depth: The depth the URL is to be crawled at
+        :return: T/F indicating if the URL @ depth was added to the frontier
+        """
+
+    @abstractmethod
+    async def add_all(self, urls: Iterable[str]) -> bool:
+        """Conditionally adds the outlinks of the currently crawled URL to the frontier
+
+        :param urls: An iterable containing URLs to be added to the frontier
+        :return: T/F indicating if any of the URLs @ next depth were added to the frontier
+        """
+
+    @abstractmethod
+    async def admit(
+        self, urls: Iterable[str], depth: int
+    ) -> List[Tuple[str, "AdmissionResult"]]:
+        """Offers the supplied URLs to the frontier
+
+        :param urls: An iterable containing URLs to be added to the frontier
+        :param depth: The depth the URLs are to be crawled at
+        :return: A list of (URL, AdmissionResult) in the order the URLs were supplied
+        """
+
+    @abstractmethod
+    async def pop_inner_page_link(self) -> Optional[str]:
+        """Removes and returns the first discovered inner page link of the current page"""
+
+    @abstractmethod
+    async def have_inner_page_links(self) -> bool:
+        """Returns T/F indicating if the current page has inner page links"""
+
+    @abstractmethod
+    async def remove_inner_page_links(self) -> None:
+        """Removes the inner page links of the current page"""
+
+    @abstractmethod
+    async def record_capture(self, url: str, digest: str = "") -> None:
+        """Records that the supplied URL has been captured
+
+        :param url: The captured URL
+        :param digest: The digest of the captured content, if known
+        """
+
+
 class Tab(EventEmitterS, metaclass=ABCMeta):
     """This class defines the expected interface for all Tab classes"""
 
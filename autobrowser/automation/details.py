@@ -96,6 +96,20 @@ def env(
         return ujson.loads(val)
 
 
+def convert_shard_urls(value: Optional[Union[str, List[str]]]) -> List[str]:
+    """Converts the supplied env string, a comma separated list of redis URLs,
+    to the list of redis URLs of the additional frontier shards
+
+    :param value: The redis URLs of the additional frontier shards
+    :return: The list of the redis URLs
+    """
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [url.strip() for url in value.split(",") if url.strip()]
+    return list(value)
+
+
 def convert_screenshot_dims(
     value: Optional[Union[str, ScreenShotDims]]
 ) -> Optional[ScreenShotDims]:
@@ -150,11 +164,46 @@ class AutomationConfig:
     navigation_timeout: Union[int, float] = attr.ib(default=30)
     wait_for_q: Optional[Union[int, float]] = attr.ib(default=-1)
     wait_for_q_poll_rate: Optional[Union[int, float]] = attr.ib(default=-1)
+    wait_for_q_blocking: bool = attr.ib(default=True)
+    frontier_prefetch: int = attr.ib(default=1)
+    frontier_lease_time: Union[int, float] = attr.ib(default=300)
+    frontier_spill_dir: Optional[str] = attr.ib(default=None)
+    frontier_hot_size: int = attr.ib(default=100_000)
+    frontier_spill_segment_size: int = attr.ib(default=10_000)
+    seen_cache_size: int = attr.ib(default=100_000)
+    seen_cache_memory: int = attr.ib(default=32 << 20)
+    frontier_backend: str = attr.ib(default="redis")
+    frontier_info: Optional[Dict] = attr.ib(default=None)
+    frontier_db: Optional[str] = attr.ib(default=None)
+    capture_index: Optional[str] = attr.ib(default=None)
+    capture_freshness: Union[int, float] = attr.ib(default=7 * 24 * 60 * 60)
+    capture_fresh_action: str = attr.ib(default="skip")
+    skip_unchanged_pages: bool = attr.ib(default=False)
+    outlink_page_budget: int = attr.ib(default=0)
+    outlink_host_budget: int = attr.ib(default=0)
+    retry_backoff: Union[int, float] = attr.ib(default=30)
+    retry_backoff_max: Union[int, float] = attr.ib(default=3600)
+    host_rate_limit: Union[int, float] = attr.ib(default=0)
+    host_rate_limits: Optional[Dict] = attr.ib(default=None)
+    host_rate_burst: Union[int, float] = attr.ib(default=1)
+    host_rate_limit_key: str = attr.ib(default="ratelimit")
+    adaptive_host_backoff: bool = attr.ib(default=False)
+    host_backoff_delay: Union[int, float] = attr.ib(default=1)
+    host_backoff_max: Union[int, float] = attr.ib(default=300)
+    host_slow_latency: Union[int, float] = attr.ib(default=15)
+    host_health_key: str = attr.ib(default="hosthealth")
+    feed_sitemaps: bool = attr.ib(default=False)
+    sitemap_max_urls: int = attr.ib(default=100_000)
+    robots_key: str = attr.ib(default="robots")
+    robots_ttl: int = attr.ib(default=86400)
+    robots_user_agent: str = attr.ib(default="autobrowser")
+    dedupe_canonical_links: bool = attr.ib(default=False)
     net_cache_disabled: bool = attr.ib(default=True)
     browser_overrides: Optional[Dict] = attr.ib(default=None)
 
     # configuration details concerning redis
     redis_url: str = attr.ib(default=None)
+    redis_shard_urls: List[str] = attr.ib(factory=list, converter=convert_shard_urls)
     redis_keys: "RedisKeys" = attr.ib()
 
     # configuration details concerning behaviors
@@ -168,6 +217,7 @@ class AutomationConfig:
     page_url_expression: str = attr.ib(default=None)
     outlinks_expression: str = attr.ib(default=None)
     clear_outlinks_expression: str = attr.ib(default=None)
+    canonical_link_expression: str = attr.ib(default=None)
     no_out_links_express: str = attr.ib(default=None)
 
     # configuration details concerning shepherd
@@ -223,6 +273,27 @@ class AutomationConfig:
     def has_browser_overrides(self) -> bool:
         return self.browser_overrides is not None
 
+    @property
+    def num_frontier_shards(self) -> int:
+        """Returns the number of shards the automation's redis frontier is split over,
+        the redis instance at redis_url is always the first shard"""
+        return len(self.redis_shard_urls) + 1
+
+    def frontier_shard_url(self, shard: int) -> str:
+        """Returns the redis URL of the supplied frontier shard
+
+        :param shard: The index of the frontier shard
+        :return: The redis URL of the shard
+        """
+        if shard == 0:
+            return self.redis_url
+        return self.redis_shard_urls[shard - 1]
+
+    @property
+    def redis_frontier(self) -> bool:
+        """Returns T/F indicating if the automation's frontier is kept in redis"""
+        return self.frontier_backend in ("redis", "stream")
+
     def make_shepherd_url(self, shepherd_endpoint: str = "") -> str:
         """Creates a full shepherd end point URL using the supplied
         endpoint URL
@@ -355,6 +426,7 @@ def build_automation_config(
     behavior_api_url = env("BEHAVIOR_API_URL", default="http://localhost:3030")
     conf = dict(
         redis_url=env("REDIS_URL", default="redis://localhost"),
+        redis_shard_urls=env("REDIS_SHARD_URLS"),
         tab_type=env("TAB_TYPE", default="BehaviorTab"),
         browser_id=env("BROWSER_ID", default="chrome:67"),
         browser_host=browser_host,
@@ -368,6 +440,44 @@ def build_automation_config(
         navigation_timeout=env("NAV_TO", type_=float, default=30),
         wait_for_q=env("WAIT_FOR_Q", type_=int, default=-1),
         wait_for_q_poll_rate=env("WAIT_FOR_Q_POLL_RATE", type_=int, default=5),
+        wait_for_q_blocking=env("WAIT_FOR_Q_BLOCKING", type_=bool, default=True),
+        frontier_prefetch=env("FRONTIER_PREFETCH", type_=int, default=1),
+        frontier_lease_time=env("FRONTIER_LEASE_TIME", type_=float, default=300),
+        frontier_spill_dir=env("FRONTIER_SPILL_DIR"),
+        frontier_hot_size=env("FRONTIER_HOT_SIZE", type_=int, default=100_000),
+        frontier_spill_segment_size=env(
+            "FRONTIER_SPILL_SEGMENT_SIZE", type_=int, default=10_000
+        ),
+        seen_cache_size=env("SEEN_CACHE_SIZE", type_=int, default=100_000),
+        seen_cache_memory=env("SEEN_CACHE_MEMORY", type_=int, default=32 << 20),
+        frontier_backend=env("FRONTIER_BACKEND", default="redis"),
+        frontier_db=env("FRONTIER_DB"),
+        frontier_info=env("FRONTIER_INFO", type_=dict),
+        capture_index=env("CAPTURE_INDEX"),
+        capture_freshness=env(
+            "CAPTURE_FRESHNESS", type_=float, default=7 * 24 * 60 * 60
+        ),
+        capture_fresh_action=env("CAPTURE_FRESH_ACTION", default="skip"),
+        skip_unchanged_pages=env("SKIP_UNCHANGED_PAGES", type_=bool, default=False),
+        outlink_page_budget=env("OUTLINK_PAGE_BUDGET", type_=int, default=0),
+        outlink_host_budget=env("OUTLINK_HOST_BUDGET", type_=int, default=0),
+        retry_backoff=env("RETRY_BACKOFF", type_=float, default=30),
+        retry_backoff_max=env("RETRY_BACKOFF_MAX", type_=float, default=3600),
+        host_rate_limit=env("HOST_RATE_LIMIT", type_=float, default=0),
+        host_rate_limits=env("HOST_RATE_LIMITS", type_=dict),
+        host_rate_burst=env("HOST_RATE_BURST", type_=float, default=1),
+        host_rate_limit_key=env("HOST_RATE_LIMIT_KEY", default="ratelimit"),
+        adaptive_host_backoff=env("ADAPTIVE_HOST_BACKOFF", type_=bool, default=False),
+        host_backoff_delay=env("HOST_BACKOFF_DELAY", type_=float, default=1),
+        host_backoff_max=env("HOST_BACKOFF_MAX", type_=float, default=300),
+        host_slow_latency=env("HOST_SLOW_LATENCY", type_=float, default=15),
+        host_health_key=env("HOST_HEALTH_KEY", default="hosthealth"),
+        feed_sitemaps=env("FEED_SITEMAPS", type_=bool, default=False),
+        sitemap_max_urls=env("SITEMAP_MAX_URLS", type_=int, default=100_000),
+        robots_key=env("ROBOTS_KEY", default="robots"),
+        robots_ttl=env("ROBOTS_TTL", type_=int, default=86400),
+        robots_user_agent=env("ROBOTS_USER_AGENT", default="autobrowser"),
+        dedupe_canonical_links=env("DEDUPE_CANONICAL_LINKS", type_=bool, default=False),
         net_cache_disabled=env("CRAWL_NO_NETCACHE", type_=bool, default=True),
         behavior_api_url=behavior_api_url,
         fetch_behavior_endpoint=env(
@@ -402,6 +512,10 @@ def build_automation_config(
         clear_outlinks_expression=env(
             "CLEAR_OUTLINKS_EXPRESSION", default="window.$wbOutlinkSet$.clear()"
         ),
+        canonical_link_expression=env(
+            "CANONICAL_LINK_EXPRESSION",
+            default="(function () { var link = document.querySelector('link[rel=canonical][href]'); return link ? link.href : null; })()",
+        ),
         no_out_links_express=env(
             "NO_OUT_LINKS_EXPRESS", default="window.$WBNOOUTLINKS = true;"
         ),
@@ -425,14 +539,24 @@ def build_automation_config(
     return AutomationConfig(**conf)
 
 
-def to_redis_key(aid: str) -> str:
+def to_redis_key(aid: str, shard: int = 0) -> str:
     """Converter used to turn the supplied automation id into
-    the correct automation prefix for redis
+    the correct automation prefix for redis.
+
+    The keys of the first shard are the automation's unsharded keys, the keys of
+    the other frontier shards are prefixed by a:{aid:shard} so that they do not
+    collide with the keys of the first shard when the shards share a redis instance.
+    Each shard is a standalone redis instance, redis cluster is not supported as the
+    keys of the first shard share no hash tag and the frontier's scripts use keys,
+    e.g. the per host queues, that are not passed to them as KEYS
 
     :param aid: The id of the automation
+    :param shard: The index of the frontier shard
     :return: The automation's redis key prefix
     """
-    return f"a:{aid}"
+    if shard == 0:
+        return f"a:{aid}"
+    return f"a:{{{aid}:{shard}}}"
 
 
 class RedisKeys:
@@ -442,27 +566,72 @@ class RedisKeys:
         "__weakref__",
         "auto_done",
         "autoid",
-        "inner_page_links",
+        "crawled",
+        "failed",
         "info",
         "pending",
+        "pending_leases",
+        "pending_retries",
         "queue",
+        "queue_buckets",
+        "queue_doorbell",
+        "queue_host_state",
+        "queue_hosts",
+        "queue_retry",
+        "queue_spilled",
+        "queue_stream",
+        "referrer_ids",
+        "referrers",
         "scope",
         "seen",
+        "seen_bloom",
+        "seen_fingerprints",
+        "shard",
+        "sitemaps",
+        "validators",
     ]
 
-    def __init__(self, config: AutomationConfig) -> None:
+    def __init__(self, config: AutomationConfig, shard: int = 0) -> None:
         """Initialize the new RedisKeys instance
 
         :param config: The automation config
+        :param shard: The index of the frontier shard the keys are for
         """
-        self.autoid: str = f"a:{config.autoid}"
+        self.shard: int = shard
+        self.autoid: str = to_redis_key(config.autoid, shard)
         self.info: str = f"{self.autoid}:info"
         self.queue: str = f"{self.autoid}:q"
+        self.queue_buckets: str = f"{self.autoid}:q:buckets"
+        self.queue_doorbell: str = f"{self.autoid}:q:doorbell"
+        self.queue_hosts: str = f"{self.autoid}:q:hosts"
+        self.queue_host_state: str = f"{self.autoid}:q:hosts:state"
+        self.queue_retry: str = f"{self.autoid}:q:retry"
+        self.queue_spilled: str = f"{self.autoid}:q:spilled"
+        self.queue_stream: str = f"{self.autoid}:q:stream"
+        self.referrers: str = f"{self.autoid}:referrers"
+        self.referrer_ids: str = f"{self.autoid}:referrer_ids"
         self.pending: str = f"{self.autoid}:qp"
+        self.pending_leases: str = f"{self.autoid}:qp:leases"
+        self.pending_retries: str = f"{self.autoid}:qp:retries"
+        self.failed: str = f"{self.autoid}:failed"
         self.seen: str = f"{self.autoid}:seen"
+        self.crawled: str = f"{self.autoid}:crawled"
+        self.seen_fingerprints: str = f"{self.autoid}:seen:fp"
+        self.seen_bloom: str = f"{self.autoid}:seen:bloom"
         self.scope: str = f"{self.autoid}:scope"
+        self.sitemaps: str = f"{self.autoid}:sitemaps"
+        self.validators: str = f"{self.autoid}:validators"
         self.auto_done: str = f"{self.autoid}:br:done"
-        self.inner_page_links: str = f"{self.autoid}:{config.reqid}:ipls"
+
+    def leased_by(self, crawler_id: str) -> str:
+        """Returns the key of the set of the entries leased by the supplied crawler,
+        each tab of a browser is a crawler with its own set so that the entries
+        leased by one tab are not recovered by another
+
+        :param crawler_id: The id of the crawler, {reqid}:{tab number}
+        :return: The key of the crawler's leased set
+        """
+        return f"{self.autoid}:{crawler_id}:leased"
 
 
 class CloseReason(Enum):
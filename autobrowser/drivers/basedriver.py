@@ -11,6 +11,15 @@ from autobrowser.automation import AutomationConfig, BrowserExitInfo, ShutdownCo
 from autobrowser.behaviors import RemoteBehaviorManager
 from autobrowser.chrome_browser import Chrome
 from autobrowser.events import Events
+from autobrowser.frontier import (
+    close_shard_pools,
+    close_sqlite_queues,
+    drop_admission_caches,
+    drop_capture_indexes,
+    drop_host_healths,
+    drop_host_rate_limiters,
+    drop_robots_stores,
+)
 from autobrowser.util import AutoLogger, Helper, create_autologger
 
 __all__ = ["BaseDriver"]
@@ -35,16 +44,27 @@ class BaseDriver(Driver):
         self.behavior_manager: RemoteBehaviorManager = RemoteBehaviorManager(
             conf=self.conf, session=self.session, loop=self.loop
         )
-        self.redis: Redis = None
+        self.redis: Optional[Redis] = None
         self.logger: AutoLogger = create_autologger("drivers", self.__class__.__name__)
         self._browser_exit_infos: List[BrowserExitInfo] = []
 
+    @property
+    def requires_redis(self) -> bool:
+        """Returns T/F indicating if the driver requires a connection to redis.
+
+        Redis is only required when the automation's frontier is kept in redis
+        """
+        return self.conf.redis_frontier
+
     async def init(self) -> None:
         """Initialize the driver."""
         logged_method = "init"
+        self.did_init = True
+        if not self.requires_redis:
+            self.logger.info(logged_method, "not connecting to redis, not required")
+            return
         redis_url = self.conf.redis_url
         self.logger.info(logged_method, f"connecting to redis <url={redis_url}>")
-        self.did_init = True
         self.redis = await create_redis_pool(
             redis_url, loop=self.loop, encoding="utf-8"
         )
@@ -73,6 +93,14 @@ class BaseDriver(Driver):
             await Helper.no_raise_await(self.redis.wait_closed())
             self.logger.info(logged_method, "closed redis connection")
 
+        await close_shard_pools()
+        close_sqlite_queues()
+        drop_admission_caches()
+        drop_capture_indexes()
+        drop_host_healths()
+        drop_host_rate_limiters()
+        drop_robots_stores()
+
         if not self.session.closed:
             self.logger.info(logged_method, "closing HTTP session")
             await Helper.no_raise_await(self.session.close())
@@ -43,6 +43,11 @@ class ShepherdDriver(BaseDriver):
         self.pubsub_channel: Channel = None
         self.pubsub_task: Task = None
 
+    @property
+    def requires_redis(self) -> bool:
+        """Shepherd automations are controlled using redis pubsub so redis is always required"""
+        return True
+
     async def stage_new_browser(
         self, browser_id: str, data: Optional[Any] = None
     ) -> str:
@@ -1,4 +1,115 @@
-from .memory import Frontier
+from asyncio import AbstractEventLoop
+from typing import Callable, Dict, Optional
+
+from aioredis import Redis
+
+from autobrowser.abcs import Frontier
+from autobrowser.automation import AutomationConfig
+from .admission import AdmissionResult
+from .budget import OutlinkBudget
+from .cache import AdmissionCache, drop_admission_caches
+from .captures import Capture, CaptureIndex, drop_capture_indexes
+from .entry import QueueEntry
+from .health import HostHealth, drop_host_healths, host_health
+from .memory import MemoryFrontier, MemoryQueue, drop_memory_queue
+from .ordering import CrawlOrder, register_score_function
+from .politeness import HostPoliteness
+from .ratelimit import HostRateLimiter, drop_host_rate_limiters, host_rate_limiter
 from .redis import RedisFrontier
+from .robots import RobotsRules, RobotsStore, drop_robots_stores, robots_store
+from .seeding import SeedImportStats, admit_seed_batch, import_seeds, read_seed_urls
+from .seen import (
+    BloomSeenSet,
+    FingerprintSeenSet,
+    SeenSet,
+    load_seen_set,
+    migrate_seen_set,
+)
+from .shards import FrontierShard, ShardMap, close_shard_pools, create_frontier_shards
+from .sitemaps import SitemapFeeder, sitemap_feeder
+from .snapshot import export_frontier, import_frontier
+from .spill import QueueSpiller
+from .sqlite import SqliteFrontier, SqliteQueue, close_sqlite_queues
+from .stream import StreamFrontier
+from .validators import PageValidators, ValidatorStore
+
+__all__ = [
+    "AdmissionCache",
+    "AdmissionResult",
+    "BloomSeenSet",
+    "Capture",
+    "CaptureIndex",
+    "CrawlOrder",
+    "FRONTIER_CLASSES",
+    "FingerprintSeenSet",
+    "FrontierShard",
+    "HostHealth",
+    "HostPoliteness",
+    "HostRateLimiter",
+    "MemoryFrontier",
+    "MemoryQueue",
+    "OutlinkBudget",
+    "PageValidators",
+    "QueueEntry",
+    "QueueSpiller",
+    "RedisFrontier",
+    "RobotsRules",
+    "RobotsStore",
+    "SeedImportStats",
+    "SeenSet",
+    "ShardMap",
+    "SitemapFeeder",
+    "SqliteFrontier",
+    "SqliteQueue",
+    "StreamFrontier",
+    "ValidatorStore",
+    "admit_seed_batch",
+    "close_shard_pools",
+    "close_sqlite_queues",
+    "create_frontier",
+    "create_frontier_shards",
+    "drop_admission_caches",
+    "drop_capture_indexes",
+    "drop_host_healths",
+    "drop_host_rate_limiters",
+    "drop_memory_queue",
+    "drop_robots_stores",
+    "export_frontier",
+    "host_health",
+    "host_rate_limiter",
+    "import_frontier",
+    "import_seeds",
+    "load_seen_set",
+    "migrate_seen_set",
+    "read_seed_urls",
+    "register_score_function",
+    "robots_store",
+    "sitemap_feeder",
+]
+
+#: The available frontier backends, selected using the frontier_backend config option,
+#: each is created with (redis, config=config, loop=loop)
+FRONTIER_CLASSES: Dict[str, Callable[..., Frontier]] = dict(
+    redis=RedisFrontier,
+    stream=StreamFrontier,
+    memory=MemoryFrontier,
+    sqlite=SqliteFrontier,
+)
+
+
+def create_frontier(
+    redis: Optional[Redis],
+    config: AutomationConfig,
+    loop: Optional[AbstractEventLoop] = None,
+) -> Frontier:
+    """Creates the frontier of the configured backend
 
-__all__ = ["Frontier", "RedisFrontier"]
+    :param redis: The redis instance to be used, may be None if the backend does not use redis
+    :param config: The automation config
+    :param loop: The event loop used by the automation
+    :return: The new frontier
+    """
+    frontier_class = FRONTIER_CLASSES.get(config.frontier_backend)
+    if frontier_class is None:
+        raise ValueError(f"Unknown frontier backend '{config.frontier_backend}'")
+    return frontier_class(redis, config=config, loop=loop)
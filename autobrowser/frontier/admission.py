@@ -0,0 +1,30 @@
+from enum import Enum, auto
+from typing import Dict
+
+__all__ = ["ADMISSION_MESSAGES", "AdmissionResult"]
+
+
+class AdmissionResult(Enum):
+    """An enumeration of the possible outcomes of offering a URL to the frontier"""
+
+    ADDED = auto()
+    NOT_IN_SCOPE = auto()
+    INNER_PAGE_LINK = auto()
+    SEEN = auto()
+    RECENTLY_CAPTURED = auto()
+
+    def __str__(self) -> str:
+        return self.name
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+#: The messages logged by the frontiers for each admission result
+ADMISSION_MESSAGES: Dict[AdmissionResult, str] = {
+    AdmissionResult.ADDED: "Added URL to the frontier",
+    AdmissionResult.NOT_IN_SCOPE: "Not adding URL to the frontier, not in scope",
+    AdmissionResult.INNER_PAGE_LINK: "Not adding URL to the frontier, inner page link",
+    AdmissionResult.SEEN: "Not adding URL to the frontier, seen",
+    AdmissionResult.RECENTLY_CAPTURED: "Not adding URL to the frontier, captured within the freshness window",
+}
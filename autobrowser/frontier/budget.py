@@ -0,0 +1,246 @@
+import re
+from collections import Counter
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+from urllib.parse import urlsplit
+
+from autobrowser.automation import AutomationConfig
+from .admission import AdmissionResult
+
+__all__ = ["OutlinkBudget", "admit_within_budget", "outlink_budget", "path_template"]
+
+#: The score bonus of an outlink on the same host as the page it was discovered on
+SAME_HOST_BONUS: float = 2.0
+#: The score bonus of an outlink whose path template has not been admitted for the page
+NEW_TEMPLATE_BONUS: float = 1.0
+#: The score penalty of each segment of an outlink's path
+PATH_SEGMENT_PENALTY: float = 0.5
+
+_DIGITS = re.compile(r"\d+")
+_HEX_ID = re.compile(r"^[0-9a-fA-F-]{16,}$")
+
+#: A coroutine function offering URLs to the frontier at a depth, see Frontier.admit
+AdmitFunction = Callable[
+    [Iterable[str], int], Awaitable[List[Tuple[str, AdmissionResult]]]
+]
+
+#: A coroutine function returning, for each of the supplied URLs, the rejection the
+#: frontier is known to give the URL or None, without offering the URLs to the frontier
+ProbeFunction = Callable[[List[str]], Awaitable[List[Optional[AdmissionResult]]]]
+
+
+def path_template(url: str) -> str:
+    """Returns the path template of the supplied URL, its host and path with runs of
+    digits and long hexadecimal ids replaced so that URLs differing only by an id,
+    page number or date share a template
+
+    :param url: The URL
+    :return: The URL's path template
+    """
+    parts = urlsplit(url)
+    segments = [
+        "{id}" if _HEX_ID.match(segment) else _DIGITS.sub("{n}", segment)
+        for segment in parts.path.split("/")
+    ]
+    return f"{parts.hostname or ''}{'/'.join(segments)}"
+
+
+class OutlinkBudget:
+    """The number of outlinks of the currently crawled page admitted to the frontier,
+    limited per page and per host of the outlinks.
+
+    When more outlinks are offered than the remaining budget allows, the most valuable
+    outlinks are offered first: those on the same host as the page, with shallow paths
+    and with path templates not yet admitted for the page. The outlinks not offered
+    are counted as dropped.
+    """
+
+    __slots__ = [
+        "__weakref__",
+        "admitted",
+        "dropped",
+        "host_budget",
+        "hosts",
+        "page",
+        "page_budget",
+        "page_host",
+        "templates",
+    ]
+
+    def __init__(self, page_budget: int = 0, host_budget: int = 0) -> None:
+        """Initialize the new instance of OutlinkBudget
+
+        :param page_budget: The maximum number of outlinks admitted per page, 0 is unlimited
+        :param host_budget: The maximum number of outlinks admitted per host per page,
+        0 is unlimited
+        """
+        self.page_budget: int = max(page_budget, 0)
+        self.host_budget: int = max(host_budget, 0)
+        self.page: str = ""
+        self.page_host: str = ""
+        self.admitted: int = 0
+        self.dropped: int = 0
+        self.hosts: Counter = Counter()
+        self.templates: Set[str] = set()
+
+    @property
+    def enabled(self) -> bool:
+        """Returns T/F indicating if the admitted outlinks are limited"""
+        return self.page_budget > 0 or self.host_budget > 0
+
+    @property
+    def remaining(self) -> Optional[int]:
+        """Returns the number of outlinks the page can still admit or None if unlimited"""
+        if self.page_budget == 0:
+            return None
+        return max(self.page_budget - self.admitted, 0)
+
+    def crawling_new_page(self, page_url: str) -> None:
+        """Resets the budget for the supplied newly crawled page
+
+        :param page_url: The URL of the page
+        """
+        self.page = page_url
+        self.page_host = urlsplit(page_url).hostname or ""
+        self.admitted = 0
+        self.dropped = 0
+        self.hosts.clear()
+        self.templates.clear()
+
+    def rank(self, urls: Iterable[str]) -> List[str]:
+        """Returns the supplied outlinks, without duplicates, most valuable first
+
+        :param urls: The outlinks
+        :return: The ranked outlinks
+        """
+        templates = set(self.templates)
+        scored: List[Tuple[float, int, str]] = []
+        unique: Dict[str, None] = dict.fromkeys(urls)
+        for position, url in enumerate(unique):
+            parts = urlsplit(url)
+            score = -PATH_SEGMENT_PENALTY * parts.path.strip("/").count("/")
+            if (parts.hostname or "") == self.page_host:
+                score += SAME_HOST_BONUS
+            template = path_template(url)
+            if template not in templates:
+                templates.add(template)
+                score += NEW_TEMPLATE_BONUS
+            scored.append((-score, position, url))
+        scored.sort()
+        return [url for _, _, url in scored]
+
+    def take(self, ranked: List[str]) -> Tuple[List[str], List[str]]:
+        """Splits the supplied ranked outlinks into the outlinks to be offered to the
+        frontier next, within the page and host budgets, and the outlinks held back
+
+        :param ranked: The ranked outlinks
+        :return: A tuple of the outlinks to be offered and the held back outlinks
+        """
+        remaining = self.remaining
+        if remaining is not None and remaining == 0:
+            return [], ranked
+        if self.host_budget == 0:
+            if remaining is None:
+                return ranked, []
+            return ranked[:remaining], ranked[remaining:]
+        offered: List[str] = []
+        held_back: List[str] = []
+        tentative = Counter(self.hosts)
+        for url in ranked:
+            host = urlsplit(url).hostname or ""
+            at_page_budget = remaining is not None and len(offered) >= remaining
+            if at_page_budget or tentative[host] >= self.host_budget:
+                held_back.append(url)
+            else:
+                tentative[host] += 1
+                offered.append(url)
+        return offered, held_back
+
+    def record(self, admitted: List[Tuple[str, AdmissionResult]]) -> None:
+        """Counts the outlinks added to the frontier against the budget
+
+        :param admitted: The (URL, AdmissionResult)s of the offered outlinks
+        """
+        for url, result in admitted:
+            if result is AdmissionResult.ADDED:
+                self.admitted += 1
+                self.hosts[urlsplit(url).hostname or ""] += 1
+                self.templates.add(path_template(url))
+
+    def stats(self) -> Dict[str, Union[int, str]]:
+        """Returns the counters of the current page
+
+        :return: A dictionary containing the counters of the current page
+        """
+        return dict(page=self.page, admitted=self.admitted, dropped=self.dropped)
+
+    def __str__(self) -> str:
+        return f"OutlinkBudget(page_budget={self.page_budget}, host_budget={self.host_budget}, admitted={self.admitted}, dropped={self.dropped})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+def outlink_budget(config: AutomationConfig) -> OutlinkBudget:
+    """Creates the outlink budget configured for the automation
+
+    :param config: The automation config
+    :return: The outlink budget
+    """
+    return OutlinkBudget(config.outlink_page_budget, config.outlink_host_budget)
+
+
+async def admit_within_budget(
+    admit: AdmitFunction,
+    budget: OutlinkBudget,
+    urls: Iterable[str],
+    depth: int,
+    probe: Optional[ProbeFunction] = None,
+) -> List[Tuple[str, AdmissionResult]]:
+    """Offers the supplied outlinks of the current page to the frontier within the
+    page's outlink budget, most valuable first.
+
+    Outlinks are offered in rounds of at most the remaining budget, as offered outlinks
+    rejected by the frontier (seen, not in scope etc) do not count against the budget,
+    until the budget is exhausted or every outlink has been offered.
+    When the frontier supplies a probe, the outlinks it is known to reject are looked
+    up first, all at once, and are not offered, so that the rounds are not spent on
+    outlinks that were already seen.
+
+    :param admit: The frontier's admit coroutine function
+    :param budget: The outlink budget of the current page
+    :param urls: The outlinks to be offered
+    :param depth: The depth the outlinks are to be crawled at
+    :param probe: The frontier's probe coroutine function, if any
+    :return: The (URL, AdmissionResult)s of the offered and probed outlinks
+    """
+    if not budget.enabled:
+        return await admit(urls, depth)
+    admitted: List[Tuple[str, AdmissionResult]] = []
+    held_back = budget.rank(urls)
+    if probe is not None and held_back:
+        candidates: List[str] = []
+        for url, rejection in zip(held_back, await probe(held_back)):
+            if rejection is None:
+                candidates.append(url)
+            else:
+                admitted.append((url, rejection))
+        held_back = candidates
+    while held_back:
+        offered, held_back = budget.take(held_back)
+        if not offered:
+            break
+        results = await admit(offered, depth)
+        budget.record(results)
+        admitted.extend(results)
+    budget.dropped += len(held_back)
+    return admitted
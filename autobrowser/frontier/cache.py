@@ -0,0 +1,171 @@
+from collections import Counter, OrderedDict
+from sys import getsizeof
+from typing import Counter as CounterT, Dict, Optional, Union
+
+from autobrowser.automation import AutomationConfig
+from .admission import AdmissionResult
+
+__all__ = [
+    "AdmissionCache",
+    "admission_cache",
+    "drop_admission_caches",
+    "release_admission_cache",
+]
+
+#: The approximate number of bytes used by an entry of the cache excluding its URL
+ENTRY_OVERHEAD: int = 100
+
+
+class AdmissionCache:
+    """A bounded process local LRU cache of the URLs known to be rejected by the
+    frontier, either seen or not in scope, consulted before the frontier offers
+    a URL to redis.
+
+    As URLs are never removed from the seen set or the scope of a running automation,
+    a cached rejection remains valid for the lifetime of the automation. The cache is
+    bounded by both its number of entries and the approximate memory used by them.
+    """
+
+    __slots__ = [
+        "__weakref__",
+        "_entries",
+        "evictions",
+        "hits",
+        "max_entries",
+        "max_memory",
+        "memory",
+        "misses",
+    ]
+
+    def __init__(self, max_entries: int = 100_000, max_memory: int = 32 << 20) -> None:
+        """Initialize the new instance of AdmissionCache
+
+        :param max_entries: The maximum number of URLs cached, 0 disables the cache
+        :param max_memory: The maximum approximate number of bytes used by the cached URLs
+        """
+        self.max_entries: int = max(max_entries, 0)
+        self.max_memory: int = max(max_memory, 0)
+        self.memory: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self._entries: "OrderedDict[str, AdmissionResult]" = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        """Returns T/F indicating if URLs are cached"""
+        return self.max_entries > 0 and self.max_memory > 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Returns the fraction of lookups that were hits"""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, url: str) -> Optional[AdmissionResult]:
+        """Returns the cached rejection of the supplied URL, if any
+
+        :param url: The URL being offered to the frontier
+        :return: The cached rejection of the URL or None
+        """
+        result = self._entries.get(url)
+        if result is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(url)
+        self.hits += 1
+        return result
+
+    def put(self, url: str, result: AdmissionResult) -> None:
+        """Caches the rejection of the supplied URL, evicting the least recently
+        used URLs if the cache is full
+
+        :param url: The rejected URL
+        :param result: The reason the URL was rejected
+        """
+        if not self.enabled:
+            return
+        entries = self._entries
+        if url in entries:
+            entries.move_to_end(url)
+            entries[url] = result
+            return
+        entries[url] = result
+        self.memory += getsizeof(url) + ENTRY_OVERHEAD
+        while len(entries) > self.max_entries or self.memory > self.max_memory:
+            evicted, _ = entries.popitem(last=False)
+            self.memory -= getsizeof(evicted) + ENTRY_OVERHEAD
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """Removes all URLs from the cache"""
+        self._entries.clear()
+        self.memory = 0
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Returns the counters of the cache
+
+        :return: A dictionary containing the counters of the cache
+        """
+        return dict(
+            entries=len(self._entries),
+            memory=self.memory,
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=round(self.hit_rate, 4),
+            evictions=self.evictions,
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+
+    def __str__(self) -> str:
+        return f"AdmissionCache(entries={len(self._entries)}, memory={self.memory}, hits={self.hits}, misses={self.misses})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+#: The admission caches of the automations running in this process
+_ADMISSION_CACHES: Dict[str, AdmissionCache] = {}
+#: The number of frontiers using each admission cache
+_ADMISSION_CACHE_USERS: CounterT[str] = Counter()
+
+
+def admission_cache(config: AutomationConfig) -> AdmissionCache:
+    """Returns the admission cache of the automation, shared by the tabs of
+    the process, creating it if it does not exist
+
+    :param config: The automation config
+    :return: The automation's admission cache
+    """
+    key = config.redis_keys.autoid
+    cache = _ADMISSION_CACHES.get(key)
+    if cache is None:
+        cache = _ADMISSION_CACHES[key] = AdmissionCache(
+            config.seen_cache_size, config.seen_cache_memory
+        )
+    _ADMISSION_CACHE_USERS[key] += 1
+    return cache
+
+
+def release_admission_cache(config: AutomationConfig) -> None:
+    """Releases the admission cache of the automation, dropping it once
+    it is no longer used by any of the tabs of the process
+
+    :param config: The automation config
+    """
+    key = config.redis_keys.autoid
+    _ADMISSION_CACHE_USERS[key] -= 1
+    if _ADMISSION_CACHE_USERS[key] <= 0:
+        del _ADMISSION_CACHE_USERS[key]
+        _ADMISSION_CACHES.pop(key, None)
+
+
+def drop_admission_caches() -> None:
+    """Drops the admission caches of the automations run by this process"""
+    _ADMISSION_CACHES.clear()
+    _ADMISSION_CACHE_USERS.clear()
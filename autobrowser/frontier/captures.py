@@ -0,0 +1,206 @@
+import time
+from typing import Any, Awaitable, Dict, List, Optional, Sequence, Tuple
+
+import attr
+from aioredis import Redis
+from urlcanon.canon import remove_fragment, whatwg
+
+from autobrowser.automation import AutomationConfig
+from autobrowser.util import AutoLogger, create_autologger
+from .seen import url_fingerprint
+
+__all__ = [
+    "CAPTURE_FRESH_ACTIONS",
+    "Capture",
+    "CaptureIndex",
+    "canonical_url",
+    "capture_index",
+    "drop_capture_indexes",
+]
+
+#: The number of hashes the captures are distributed over. Keeping the number of
+#: captures per hash below hash-max-ziplist-entries (128 by default) allows redis to
+#: store each hash compactly, with the fingerprint fields stored as integers
+CAPTURE_BUCKETS: int = 1 << 16
+
+#: The priority bucket offset given to deferred URLs, placing them after every
+#: URL queued in the normal priority buckets
+DEFERRED_PRIORITY_OFFSET: int = 1 << 20
+
+#: What is done with the URLs captured within the freshness window:
+#:  - skip: the URLs are not added to the frontier
+#:  - defer: the URLs are added to a priority bucket crawled after all other URLs
+CAPTURE_FRESH_ACTIONS = ("skip", "defer")
+
+
+def canonical_url(url: str) -> str:
+    """Returns the WHATWG canonicalized form of the supplied URL without its fragment,
+    the form URLs are recorded in the capture index in
+
+    :param url: The URL to be canonicalized
+    :return: The canonicalized URL
+    """
+    canonicalized = whatwg.canonicalize(url)
+    remove_fragment(canonicalized)
+    return str(canonicalized)
+
+
+@attr.dataclass(slots=True)
+class Capture:
+    """The last capture of a URL recorded in the capture index"""
+
+    #: The time, in seconds since the epoch, the URL was captured at
+    captured_at: int = attr.ib()
+    #: The digest of the captured content, empty if it was not known
+    digest: str = attr.ib(default="")
+
+    @staticmethod
+    def decode(value: str) -> "Capture":
+        """Decodes the supplied capture index value
+
+        :param value: The value stored in the capture index, `time:digest`
+        :return: The decoded capture
+        """
+        captured_at, _, digest = value.partition(":")
+        return Capture(int(captured_at), digest)
+
+    def encode(self) -> str:
+        """Returns the value stored in the capture index for the capture
+
+        :return: The encoded capture
+        """
+        return f"{self.captured_at}:{self.digest}"
+
+
+class CaptureIndex:
+    """An index of the URLs captured by every automation sharing its key, used to
+    skip or defer the URLs captured by any of them within the freshness window.
+
+    Captures are keyed by the 64bit fingerprint of the canonicalized URL and stored
+    as `time:digest` in the hashes {key}:{bucket}, distributed over CAPTURE_BUCKETS
+    hashes. Lookups for a batch of URLs are made in a single round trip.
+    """
+
+    __slots__ = ["__weakref__", "action", "freshness", "key", "logger", "redis"]
+
+    def __init__(
+        self,
+        redis: Redis,
+        key: str = "captures",
+        freshness: float = 7 * 24 * 60 * 60,
+        action: str = "skip",
+    ) -> None:
+        """Initialize the new instance of CaptureIndex
+
+        :param redis: The redis instance to be used
+        :param key: The prefix of the index's keys
+        :param freshness: How long, in seconds, a capture is considered fresh for
+        :param action: What is done with the URLs captured within the freshness window,
+        see CAPTURE_FRESH_ACTIONS
+        """
+        if action not in CAPTURE_FRESH_ACTIONS:
+            raise ValueError(f"Unknown capture index fresh action '{action}'")
+        self.redis: Redis = redis
+        self.key: str = key
+        self.freshness: float = freshness
+        self.action: str = action
+        self.logger: AutoLogger = create_autologger("frontier", "CaptureIndex")
+
+    @property
+    def defers(self) -> bool:
+        """Returns T/F indicating if fresh URLs are deferred rather than skipped"""
+        return self.action == "defer"
+
+    def location(self, url: str) -> Tuple[str, int]:
+        """Returns the hash and field the capture of the supplied URL is stored in
+
+        :param url: The URL
+        :return: A tuple of the key of the hash and the field
+        """
+        fingerprint = url_fingerprint(canonical_url(url))
+        return f"{self.key}:{fingerprint % CAPTURE_BUCKETS}", fingerprint
+
+    async def lookup(self, urls: Sequence[str]) -> List[Optional[Capture]]:
+        """Returns the last capture of each of the supplied URLs using a single pipeline
+
+        :param urls: The URLs to be looked up
+        :return: The capture, or None if the URL has not been captured, of each URL
+        """
+        if not urls:
+            return []
+        pipeline = self.redis.pipeline()
+        futures = [pipeline.hget(*self.location(url)) for url in urls]
+        await pipeline.execute()
+        captures: List[Optional[Capture]] = []
+        for future in futures:
+            value = future.result()
+            captures.append(Capture.decode(value) if value else None)
+        return captures
+
+    async def fresh(
+        self, urls: Sequence[str], now: Optional[float] = None
+    ) -> List[bool]:
+        """Returns T/F for each of the supplied URLs indicating if it was captured
+        within the freshness window
+
+        :param urls: The URLs to be tested
+        :param now: The current time in seconds since the epoch, defaults to the time
+        :return: T/F indicating if each URL was captured within the freshness window
+        """
+        oldest = (time.time() if now is None else now) - self.freshness
+        return [
+            capture is not None and capture.captured_at >= oldest
+            for capture in await self.lookup(urls)
+        ]
+
+    def record(
+        self, url: str, digest: str = "", captured_at: Optional[float] = None
+    ) -> Awaitable[Any]:
+        """Records the capture of the supplied URL
+
+        :param url: The captured URL
+        :param digest: The digest of the captured content, if known
+        :param captured_at: The time the URL was captured at, defaults to the time
+        :return: An awaitable resolving once the capture has been recorded
+        """
+        capture = Capture(
+            int(time.time() if captured_at is None else captured_at), digest
+        )
+        key, field = self.location(url)
+        return self.redis.hset(key, field, capture.encode())
+
+    def __str__(self) -> str:
+        return f"CaptureIndex(key={self.key}, freshness={self.freshness}, action={self.action})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+#: The capture indexes used by the automations running in this process, by key
+_CAPTURE_INDEXES: Dict[str, CaptureIndex] = {}
+
+
+def capture_index(redis: Redis, config: AutomationConfig) -> Optional[CaptureIndex]:
+    """Returns the capture index used by the automation, shared by the tabs of
+    the process, or None if the automation does not use one
+
+    :param redis: The redis instance to be used
+    :param config: The automation config
+    :return: The capture index used by the automation
+    """
+    if not config.capture_index:
+        return None
+    index = _CAPTURE_INDEXES.get(config.capture_index)
+    if index is None:
+        index = _CAPTURE_INDEXES[config.capture_index] = CaptureIndex(
+            redis,
+            config.capture_index,
+            config.capture_freshness,
+            config.capture_fresh_action,
+        )
+    return index
+
+
+def drop_capture_indexes() -> None:
+    """Drops the capture indexes of the automations run by this process"""
+    _CAPTURE_INDEXES.clear()
@@ -0,0 +1,70 @@
+from typing import Optional
+
+import attr
+from ujson import loads
+
+__all__ = ["QueueEntry"]
+
+
+@attr.dataclass(slots=True)
+class QueueEntry:
+    """A URL queued in the frontier.
+
+    Entries are stored in redis as tab separated records with the URL last
+
+        referrer id<TAB>depth<TAB>priority<TAB>host<TAB>url
+
+    where the referrer id is the interned id of the page the URL was discovered on
+    and priority and host are empty when not used. Entries stored as JSON
+    (url, depth, page, prio, host) by earlier versions are read transparently.
+    """
+
+    url: str = attr.ib()
+    depth: int = attr.ib()
+    #: The interned id of the page the URL was discovered on or its URL for JSON entries
+    referrer: str = attr.ib(default="")
+    prio: Optional[int] = attr.ib(default=None)
+    host: Optional[str] = attr.ib(default=None)
+    #: The entry as stored in redis, used when completing or releasing the entry
+    raw: str = attr.ib(default="", repr=False)
+    #: The index of the frontier shard the entry was claimed from
+    shard: int = attr.ib(default=0, repr=False)
+    #: The id of the stream message the entry was claimed as, see StreamFrontier
+    stream_id: str = attr.ib(default="", repr=False)
+
+    @staticmethod
+    def decode(raw: str) -> "QueueEntry":
+        """Decodes the supplied stored entry
+
+        :param raw: The entry as stored in redis
+        :return: The decoded entry
+        """
+        if raw[0] == "{":
+            info = loads(raw)
+            return QueueEntry(
+                info["url"],
+                int(info["depth"]),
+                info.get("page", ""),
+                info.get("prio"),
+                info.get("host"),
+                raw,
+            )
+        referrer, depth, prio, host, url = raw.split("\t", 4)
+        return QueueEntry(
+            url, int(depth), referrer, int(prio) if prio else None, host or None, raw
+        )
+
+    @staticmethod
+    def encode_unreferred(
+        url: str, depth: int, prio: Optional[int] = None, host: Optional[str] = None
+    ) -> str:
+        """Encodes the supplied entry fields, excluding the referrer id which is
+        prepended by the frontier's admission script once the referrer is interned
+
+        :param url: The URL to be queued
+        :param depth: The depth the URL is to be crawled at
+        :param prio: The priority bucket of the URL, if any
+        :param host: The host queue of the URL, if any
+        :return: The encoded entry without the referrer id
+        """
+        return f"{depth}\t{'' if prio is None else prio}\t{host or ''}\t{url}"
@@ -0,0 +1,218 @@
+import time
+from asyncio import AbstractEventLoop, sleep
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+from aioredis import Redis
+
+from autobrowser.automation import AutomationConfig
+from autobrowser.util import AutoLogger, Helper, create_autologger
+from .scripts import HOST_HEALTH_ACQUIRE_SCRIPT, HOST_HEALTH_RECORD_SCRIPT
+
+__all__ = [
+    "HostHealth",
+    "THROTTLED_STATUSES",
+    "drop_host_healths",
+    "host_health",
+    "retry_after",
+]
+
+#: The response statuses indicating that a host is throttling its crawlers
+THROTTLED_STATUSES = frozenset({429, 503})
+
+#: How long, in seconds, the health of a host not navigated to is kept for
+HOST_HEALTH_TTL: int = 60 * 60
+
+
+def retry_after(headers: Optional[Dict[str, str]]) -> float:
+    """Returns the number of seconds the Retry-After response header, either a number
+    of seconds or a HTTP date, asks crawlers to wait for
+
+    :param headers: The headers of a response
+    :return: The number of seconds to wait for, 0 if there was no valid Retry-After
+    """
+    for name, value in (headers or {}).items():
+        if name.lower() != "retry-after":
+            continue
+        value = value.strip()
+        if value.isdigit():
+            return float(value)
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+class HostHealth:
+    """The health of the hosts navigated to by every crawler sharing its key, used to
+    back off from hosts that are throttling the crawlers or slowing down.
+
+    The health of each host is kept in the hash {key}:{host} and updated atomically
+    by HOST_HEALTH_RECORD_SCRIPT using the status, Retry-After header and latency of
+    each navigation to the host. A throttled host (429 or 503) has its delay doubled
+    and is parked for the larger of its delay and the Retry-After, a host whose
+    average latency exceeds the slow latency has its delay increased by half and
+    every other navigation decreases the delay by a quarter, so hosts recover
+    gradually.
+
+    Navigations to a host with a delay are spaced at least the delay apart by
+    HOST_HEALTH_ACQUIRE_SCRIPT, the URLs of parked hosts, or of hosts whose next turn
+    is already taken, are parked in the frontier so that crawlers move on to
+    healthy hosts.
+    """
+
+    __slots__ = [
+        "__weakref__",
+        "base_delay",
+        "key",
+        "logger",
+        "loop",
+        "max_delay",
+        "redis",
+        "slow_latency",
+    ]
+
+    def __init__(
+        self,
+        redis: Redis,
+        key: str = "hosthealth",
+        base_delay: float = 1,
+        max_delay: float = 300,
+        slow_latency: float = 15,
+        loop: Optional[AbstractEventLoop] = None,
+    ) -> None:
+        """Initialize the new instance of HostHealth
+
+        :param redis: The redis instance to be used
+        :param key: The prefix of the keys of the hosts' health
+        :param base_delay: The delay, in seconds, of a host once it starts backing off
+        :param max_delay: The maximum delay, in seconds, of a host
+        :param slow_latency: The average navigation latency, in seconds, above which
+        a host is considered slow
+        :param loop: The event loop used by the automation
+        """
+        self.redis: Redis = redis
+        self.key: str = key
+        self.base_delay: float = max(base_delay, 0.001)
+        self.max_delay: float = max(max_delay, self.base_delay)
+        self.slow_latency: float = slow_latency
+        self.loop: AbstractEventLoop = Helper.ensure_loop(loop)
+        self.logger: AutoLogger = create_autologger("frontier", "HostHealth")
+
+    def location(self, url: str) -> Optional[str]:
+        """Returns the key of the hash the health of the supplied URL's host is kept in
+
+        :param url: The URL
+        :return: The key of the host's health or None if the URL has no host
+        """
+        host = (urlsplit(url).hostname or "").lower()
+        return f"{self.key}:{host}" if host else None
+
+    async def acquire(self, url: str) -> float:
+        """Waits for the turn of the supplied URL's host if it is backing off, unless
+        the host is parked
+
+        :param url: The URL to be navigated to
+        :return: The number of seconds the host is parked for, 0 if the URL can be
+        navigated to now
+        """
+        key = self.location(url)
+        if key is None:
+            return 0
+        wait = await HOST_HEALTH_ACQUIRE_SCRIPT(self.redis, keys=[key]) / 1000
+        if wait < 0:
+            return -wait
+        if wait > 0:
+            self.logger.debug(
+                "acquire", f"waiting {wait} seconds for the turn of {url} ({key})"
+            )
+            await sleep(wait, loop=self.loop)
+        return 0
+
+    async def record(
+        self,
+        url: str,
+        status: Optional[int],
+        latency: float,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> float:
+        """Records the outcome of a navigation to the supplied URL
+
+        :param url: The URL navigated to
+        :param status: The status of the navigation response or None if there was none
+        :param latency: The number of seconds the navigation took, 0 if unknown
+        :param headers: The headers of the navigation response
+        :return: The delay, in seconds, of the URL's host
+        """
+        key = self.location(url)
+        if key is None:
+            return 0
+        throttled = status in THROTTLED_STATUSES
+        delay = (
+            await HOST_HEALTH_RECORD_SCRIPT(
+                self.redis,
+                keys=[key],
+                args=[
+                    1 if throttled else 0,
+                    max(int(latency * 1000), 0),
+                    int(retry_after(headers) * 1000) if throttled else 0,
+                    int(self.base_delay * 1000),
+                    int(self.max_delay * 1000),
+                    int(self.slow_latency * 1000),
+                    HOST_HEALTH_TTL * 1000,
+                ],
+            )
+            / 1000
+        )
+        if throttled:
+            self.logger.info(
+                "record",
+                f"{url} was throttled ({status}), backing off its host for {delay} seconds",
+            )
+        return delay
+
+    def __str__(self) -> str:
+        return f"HostHealth(key={self.key}, base_delay={self.base_delay}, max_delay={self.max_delay}, slow_latency={self.slow_latency})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+#: The host health trackers used by the automations running in this process, by key
+_HOST_HEALTHS: Dict[str, HostHealth] = {}
+
+
+def host_health(
+    redis: Optional[Redis],
+    config: AutomationConfig,
+    loop: Optional[AbstractEventLoop] = None,
+) -> Optional[HostHealth]:
+    """Returns the host health tracker used by the automation, shared by the tabs of
+    the process, or None if the automation does not back off adaptively or redis is
+    not used
+
+    :param redis: The redis instance to be used
+    :param config: The automation config
+    :param loop: The event loop used by the automation
+    :return: The host health tracker used by the automation
+    """
+    if redis is None or not config.adaptive_host_backoff:
+        return None
+    health = _HOST_HEALTHS.get(config.host_health_key)
+    if health is None:
+        health = _HOST_HEALTHS[config.host_health_key] = HostHealth(
+            redis,
+            config.host_health_key,
+            config.host_backoff_delay,
+            config.host_backoff_max,
+            config.host_slow_latency,
+            loop=loop,
+        )
+    return health
+
+
+def drop_host_healths() -> None:
+    """Drops the host health trackers of the automations run by this process"""
+    _HOST_HEALTHS.clear()
@@ -1,52 +1,805 @@
-import logging
-from typing import List, Set, Tuple
+from asyncio import AbstractEventLoop, CancelledError, Event, TimeoutError, wait_for
+from collections import Counter, deque
+from heapq import heappop, heappush
+from itertools import count
+from typing import (
+    Any,
+    Counter as CounterT,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    TYPE_CHECKING,
+    Tuple,
+    Union,
+)
 
-import attr
+from async_timeout import timeout
 
-from autobrowser.scope import Scope
+from autobrowser.abcs import Frontier
+from autobrowser.automation import AutomationConfig, RedisKeys
+from autobrowser.scope import RedisScope
+from autobrowser.util import AutoLogger, Helper, create_autologger
+from .admission import ADMISSION_MESSAGES, AdmissionResult
+from .budget import OutlinkBudget, admit_within_budget, outlink_budget
+from .entry import QueueEntry
+from .ordering import CrawlOrder, crawl_order_from_info
+from .politeness import HostPoliteness, host_politeness_from_info
+from .seen import SEEN_ENCODING_FIELD, SeenSet, url_fingerprint
 
-__all__ = ["Frontier"]
+if TYPE_CHECKING:
+    from .sqlite import SqliteQueue  # noqa: F401
 
+__all__ = ["MemoryFrontier", "MemoryQueue", "memory_queue", "drop_memory_queue"]
 
-logger = logging.getLogger("autobrowser")
+CRAWL_DEPTH_FIELD: str = "crawl_depth"
+MAX_RETRIES_FIELD: str = "max_retries"
+#: The frontier_info keys, in addition to the info hash field names, used by MemoryFrontier
+SEEDS_FIELD: str = "seeds"
+SCOPE_RULES_FIELD: str = "scope_rules"
 
 
-@attr.dataclass(slots=True)
-class Frontier:
-    scope: Scope = attr.ib()
-    depth: int = attr.ib()
-    seen: Set[str] = attr.ib(init=False, factory=set)
-    queue: List[Tuple[str, int]] = attr.ib(init=False, factory=list)
-    running: Tuple[str, int] = attr.ib(init=False, default=None)
+class MemoryQueue:
+    """The in process equivalent of an automation's redis queue, pending and seen sets.
 
-    async def init(self) -> None:
+    The queue is shared by the tabs of an automation running in the same process
+    and mirrors the queue of RedisFrontier: entries with a host are queued per host,
+    entries with a priority in priority buckets and all others in a plain fifo queue.
+    Every operation is O(1) except for choosing the next host or priority bucket
+    which is O(log n) in the number of hosts or buckets.
+
+    Entries being retried after a failed navigation wait in a heap ordered by the
+    time they are due, and are returned to the head of their queue once due.
+    """
+
+    __slots__ = [
+        "__weakref__",
+        "bucket_heap",
+        "buckets",
+        "changed",
+        "crawl_depth",
+        "crawled",
+        "delayed",
+        "delayed_ids",
+        "failed",
+        "fifo",
+        "fingerprint_seen",
+        "host_active",
+        "host_heap",
+        "host_ready",
+        "host_scheduled",
+        "hosts",
+        "loop",
+        "max_retries",
+        "order",
+        "pending",
+        "politeness",
+        "retries",
+        "scope_rules",
+        "seen",
+        "size",
+    ]
+
+    def __init__(
+        self, info: Dict[str, Any], loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        """Initialize the new instance of MemoryQueue
+
+        :param info: A dictionary using the field names of the automation's info hash
+        plus the seeds and scope_rules of the automation
+        :param loop: The event loop used by the automation
+        """
+        self.loop: AbstractEventLoop = Helper.ensure_loop(loop)
+        self.crawl_depth: int = int(info.get(CRAWL_DEPTH_FIELD) or 0)
+        self.max_retries: int = int(info.get(MAX_RETRIES_FIELD) or 3)
+        self.order: CrawlOrder = crawl_order_from_info(info)
+        self.politeness: HostPoliteness = host_politeness_from_info(info)
+        self.scope_rules: List[Any] = list(info.get(SCOPE_RULES_FIELD) or [])
+        #: Any seen encoding other than plain stores fingerprints rather than URLs
+        self.fingerprint_seen: bool = (
+            info.get(SEEN_ENCODING_FIELD) or SeenSet.encoding
+        ) != SeenSet.encoding
+        self.fifo: Deque[QueueEntry] = deque()
+        self.buckets: Dict[int, Deque[QueueEntry]] = {}
+        self.bucket_heap: List[int] = []
+        self.hosts: Dict[str, Deque[QueueEntry]] = {}
+        self.host_heap: List[Tuple[float, str]] = []
+        #: host -> the time the host was scheduled for, hosts not scheduled are
+        #: either empty or parked at their maximum concurrency
+        self.host_scheduled: Dict[str, float] = {}
+        self.host_ready: Dict[str, float] = {}
+        self.host_active: CounterT[str] = Counter()
+        self.pending: Set[str] = set()
+        self.retries: CounterT[str] = Counter()
+        #: The entries returned to the queue more than max_retries times
+        self.failed: List[QueueEntry] = []
+        self.seen: Set[Union[str, int]] = set()
+        #: The seen members of the URLs of the crawled pages mapped to the claimed
+        #: URLs the pages were crawled for
+        self.crawled: Dict[Union[str, int], str] = {}
+        #: The retried entries as (due time, id, entry), ordered by due time
+        self.delayed: List[Tuple[float, int, QueueEntry]] = []
+        self.delayed_ids: Iterator[int] = count()
+        #: The number of queued entries, including the retried entries not yet due
+        self.size: int = 0
+        #: Set whenever a URL is queued or completed, used for waiting
+        self.changed: Event = Event(loop=self.loop)
+        self.admit(info.get(SEEDS_FIELD) or [], 0)
+
+    def mark_seen(self, url: str) -> bool:
+        """Adds the supplied URL to the seen set
+
+        :param url: The URL to be marked as seen
+        :return: T/F indicating if the URL was not seen before
+        """
+        member = url_fingerprint(url) if self.fingerprint_seen else url
+        if member in self.seen:
+            return False
+        self.seen.add(member)
+        return True
+
+    def is_seen(self, url: str) -> bool:
+        """Returns T/F indicating if the supplied URL has been seen
+
+        :param url: The URL to be tested
+        :return: T/F indicating if the supplied URL is seen
+        """
+        return (url_fingerprint(url) if self.fingerprint_seen else url) in self.seen
+
+    def mark_crawled(self, url: str, claimed: str) -> bool:
+        """Adds the supplied URL of a page crawled for the supplied claimed URL
+        to the seen set and crawled map
+
+        :param url: The URL to be marked as crawled
+        :param claimed: The claimed URL the page was crawled for
+        :return: T/F indicating if the URL was not crawled before for another
+        claimed URL
+        """
+        self.mark_seen(url)
+        member = url_fingerprint(url) if self.fingerprint_seen else url
+        return self.crawled.setdefault(member, claimed) == claimed
+
+    def mark_all_crawled(self, urls: Iterable[str], claimed: str) -> bool:
+        """Marks the supplied URLs of a page crawled for the supplied claimed URL
+        as crawled, see mark_crawled
+
+        :param urls: The URLs of the page
+        :param claimed: The claimed URL the page was crawled for
+        :return: T/F indicating if none of the URLs were crawled before for another
+        claimed URL
+        """
+        not_crawled = True
+        for url in urls:
+            if not self.mark_crawled(url, claimed):
+                not_crawled = False
+        return not_crawled
+
+    def admit(self, urls: Iterable[str], depth: int, page: str = "") -> List[bool]:
+        """Marks the supplied URLs as seen, queuing the URLs not seen before
+
+        :param urls: The URLs to be queued
+        :param depth: The depth the URLs are to be crawled at
+        :param page: The URL of the page the URLs were discovered on
+        :return: T/F indicating if the URL was queued, for each URL
+        """
+        added: List[bool] = []
+        for url in urls:
+            if self.mark_seen(url):
+                host = self.politeness.host(url)
+                prio = self.order.priority(url, depth, page) if host is None else None
+                self.push(QueueEntry(url, depth, page, prio, host))
+                added.append(True)
+            else:
+                added.append(False)
+        return added
+
+    def push(self, entry: QueueEntry, front: bool = False) -> None:
+        """Queues the supplied entry
+
+        :param entry: The entry to be queued
+        :param front: T/F indicating if the entry is to be queued at the front of its queue
+        """
+        host = entry.host
+        if host is not None:
+            queue = self.hosts.get(host)
+            if queue is None:
+                queue = self.hosts[host] = deque()
+                self._schedule_host(host)
+        elif entry.prio is not None:
+            queue = self.buckets.get(entry.prio)
+            if queue is None:
+                queue = self.buckets[entry.prio] = deque()
+                heappush(self.bucket_heap, entry.prio)
+        else:
+            queue = self.fifo
+        if front:
+            queue.appendleft(entry)
+        else:
+            queue.append(entry)
+        self.size += 1
+        self.changed.set()
+
+    def pop(self) -> Tuple[Optional[QueueEntry], float]:
+        """Removes and returns the next entry to be crawled adding it to the pending set.
+        Like the redis frontier's queue, entries are popped from the fifo queue, then
+        the priority buckets and then the ready hosts
+
+        :return: A tuple of the entry, or None if no entry could be claimed, and
+        -1 if the queue is empty, the number of seconds until a host becomes ready
+        or a retried entry is due if no entry could be claimed, otherwise 0
+        """
+        if self.size == 0:
+            return None, -1
+        wait = 0.0
+        now = self.loop.time()
+        self._promote_retries(now)
+        if self.fifo:
+            return self._claimed(self.fifo.popleft()), 0
+        bucket_heap = self.bucket_heap
+        if bucket_heap:
+            prio = bucket_heap[0]
+            queue = self.buckets[prio]
+            entry = queue.popleft()
+            if not queue:
+                heappop(bucket_heap)
+                del self.buckets[prio]
+            return self._claimed(entry), 0
+        host_heap = self.host_heap
+        while host_heap:
+            ready, host = host_heap[0]
+            if self.host_scheduled.get(host) != ready:
+                heappop(host_heap)
+                continue
+            if ready > now:
+                wait = ready - now
+                break
+            heappop(host_heap)
+            del self.host_scheduled[host]
+            queue = self.hosts[host]
+            entry = queue.popleft()
+            self.host_active[host] += 1
+            self.host_ready[host] = now + self.politeness.delay
+            if queue:
+                self._schedule_host(host)
+            else:
+                del self.hosts[host]
+            return self._claimed(entry), 0
+        if self.delayed:
+            retry_wait = self.delayed[0][0] - now
+            wait = min(wait, retry_wait) if wait > 0 else retry_wait
+        return None, wait
+
+    def complete(self, entry: QueueEntry) -> None:
+        """Removes the supplied entry from the pending set, scheduling its
+        host if the host was parked at its maximum concurrency
+
+        :param entry: The crawled entry
+        """
+        self.pending.discard(entry.url)
+        self.retries.pop(entry.url, None)
+        host = entry.host
+        if host is not None:
+            self.host_active[host] -= 1
+            if self.host_active[host] <= 0:
+                del self.host_active[host]
+            if host in self.hosts and host not in self.host_scheduled:
+                self._schedule_host(host)
+        self.changed.set()
+
+    def requeue(self, entry: QueueEntry) -> bool:
+        """Returns the supplied abandoned entry to the head of its queue counting a retry,
+        if the entry has been returned more than max_retries times it is failed instead
+
+        :param entry: The abandoned entry
+        :return: T/F indicating if the entry was returned to the queue
+        """
+        url = entry.url
+        retries = self.retries[url] + 1
+        self.complete(entry)
+        if retries > self.max_retries:
+            self.failed.append(entry)
+            return False
+        self.retries[url] = retries
+        self.push(entry, front=True)
+        return True
+
+    def retry(self, entry: QueueEntry, backoff: float, max_backoff: float) -> float:
+        """Completes the supplied entry, whose navigation failed, and queues it again
+        once its backoff has elapsed counting a retry, if the entry has been retried
+        more than max_retries times it is failed instead.
+        The backoff of the nth retry is min(backoff * 2 ^ (n - 1), max_backoff).
+
+        :param entry: The entry whose navigation failed
+        :param backoff: The backoff of the first retry in seconds
+        :param max_backoff: The maximum backoff in seconds
+        :return: The backoff of the entry or 0 if it was failed
+        """
+        url = entry.url
+        retries = self.retries[url] + 1
+        self.complete(entry)
+        if retries > self.max_retries:
+            self.failed.append(entry)
+            return 0
+        self.retries[url] = retries
+        delay = max(min(backoff * 2 ** (retries - 1), max_backoff), 0.001)
+        heappush(
+            self.delayed, (self.loop.time() + delay, next(self.delayed_ids), entry)
+        )
+        self.size += 1
+        return delay
+
+    def park(self, entry: QueueEntry, delay: float) -> None:
+        """Completes the supplied entry, whose host is backing off, and queues it again
+        once the supplied delay has elapsed without counting a retry
+
+        :param entry: The entry to be parked
+        :param delay: The number of seconds the entry is parked for
+        """
+        retries = self.retries.get(entry.url)
+        self.complete(entry)
+        if retries is not None:
+            self.retries[entry.url] = retries
+        heappush(
+            self.delayed,
+            (self.loop.time() + max(delay, 0.001), next(self.delayed_ids), entry),
+        )
+        self.size += 1
+
+    def _promote_retries(self, now: float) -> None:
+        """Returns the retried entries that are due to the head of their queue
+
+        :param now: The current time of the event loop
+        """
+        delayed = self.delayed
+        while delayed and delayed[0][0] <= now:
+            _, _, entry = heappop(delayed)
+            self.size -= 1
+            self.push(entry, front=True)
+
+    def _claimed(self, entry: QueueEntry) -> QueueEntry:
+        """Adds the supplied entry to the pending set
+
+        :param entry: The claimed entry
+        :return: The claimed entry
+        """
+        self.size -= 1
+        self.pending.add(entry.url)
+        return entry
+
+    def _schedule_host(self, host: str) -> None:
+        """Schedules the supplied host for when it is ready, unless
+        it is at its maximum concurrency
+
+        :param host: The host to be scheduled
+        """
+        max_concurrency = self.politeness.max_concurrency
+        if max_concurrency > 0 and self.host_active[host] >= max_concurrency:
+            return
+        ready = self.host_ready.get(host, 0.0)
+        self.host_scheduled[host] = ready
+        heappush(self.host_heap, (ready, host))
+
+    def __str__(self) -> str:
+        return f"MemoryQueue(size={self.size}, pending={len(self.pending)}, seen={len(self.seen)})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+#: The queues of the automations running in this process
+_MEMORY_QUEUES: Dict[str, MemoryQueue] = {}
+
+
+def memory_queue(config: AutomationConfig, loop: AbstractEventLoop) -> MemoryQueue:
+    """Returns the in process queue of the automation, creating it using the
+    frontier_info of the automation config if it does not exist
+
+    :param config: The automation config
+    :param loop: The event loop used by the automation
+    :return: The automation's queue
+    """
+    key = config.redis_keys.autoid
+    queue = _MEMORY_QUEUES.get(key)
+    if queue is None:
+        queue = _MEMORY_QUEUES[key] = MemoryQueue(
+            config.frontier_info or {}, loop=loop
+        )
+    return queue
+
+
+def drop_memory_queue(config: AutomationConfig) -> None:
+    """Removes the in process queue of the automation, if it exists
+
+    :param config: The automation config
+    """
+    _MEMORY_QUEUES.pop(config.redis_keys.autoid, None)
+
+
+class MemoryFrontier(Frontier):
+    """A frontier kept entirely in process, with the same semantics as RedisFrontier.
+
+    The info hash fields, seeds and scope rules of the automation are supplied
+    using the frontier_info configuration option.
+    """
+
+    __slots__ = [
+        "__weakref__",
+        "_did_wait",
+        "budget",
+        "config",
+        "crawl_depth",
+        "currently_crawling",
+        "keys",
+        "logger",
+        "loop",
+        "queue",
+        "scope",
+    ]
+
+    def __init__(
+        self,
+        redis: Any,
+        config: AutomationConfig,
+        loop: Optional[AbstractEventLoop] = None,
+    ):
+        """Initialize the new instance of MemoryFrontier
+
+        :param redis: Unused, accepted so that frontiers are created uniformly
+        :param config: The automation config
+        :param loop: The event loop used by the automation
+        """
+        self.config: AutomationConfig = config
+        self.crawl_depth: int = -1
+        self.currently_crawling: Optional[QueueEntry] = None
+        self.keys: RedisKeys = self.config.redis_keys
+        self.logger: AutoLogger = create_autologger(
+            "frontier", self.__class__.__name__
+        )
+        self.loop: AbstractEventLoop = Helper.ensure_loop(loop)
+        self.queue: Union[MemoryQueue, "SqliteQueue"] = self._open_queue()
+        #: The outlink admission budget of the currently crawled page
+        self.budget: OutlinkBudget = outlink_budget(self.config)
+        self.scope: RedisScope = RedisScope(None, self.keys)
+        self._did_wait: bool = False
+
+    @property
+    def did_wait(self) -> bool:
+        """Returns T/F indicating if the frontier has waited for the q to become
+        populated already.
+
+        :return: T/F indicating if the q population wait has been performed
+        """
+        return self._did_wait
+
+    def crawling_new_page(self, page_url: str) -> None:
+        """Indicate to both the frontier and scope instances for the crawl
+        that we are now crawling a new page.
+
+        This is used for tracking inner page links and the outlink budget
+        of the page
+        """
+        if self.budget.dropped > 0:
+            self.logger.info(
+                "crawling_new_page",
+                f"outlinks dropped by the outlink budget - {Helper.json_string(**self.budget.stats())}",
+            )
+        self.scope.crawling_new_page(page_url)
+        self.budget.crawling_new_page(page_url)
+
+    def next_depth(self) -> int:
+        """Returns the next depth by adding one to the depth of the currently crawled URLs depth
+
+        :return: The next depth
+        """
+        if self.currently_crawling is not None:
+            return self.currently_crawling.depth + 1
+        return -1
+
+    async def pop_inner_page_link(self) -> Optional[str]:
+        """Removes and returns the first discovered inner page link of the current page"""
+        return self.scope.pop_inner_page_link()
+
+    async def have_inner_page_links(self) -> bool:
+        """Returns T/F indicating if we have inner page links
+
+        :return: T/F indicating if we have inner page links
+        """
+        return len(self.scope.inner_page_links) > 0
+
+    async def remove_inner_page_links(self) -> None:
+        """Removes the inner page links of the current page"""
+        self.scope.inner_page_links.clear()
+
+    async def record_capture(self, url: str, digest: str = "") -> None:
+        """The frontier does not use a capture index, this is a no op
+
+        :param url: The captured URL
+        :param digest: The digest of the captured content, if known
+        """
         pass
 
+    async def wait_for_populated_q(
+        self, max_time: Union[int, float] = 60, poll_rate: Union[int, float] = 5
+    ) -> bool:
+        """Waits for the q to become populated or max_time is reached.
+
+        The wait is woken as soon as a URL is added to the q, poll_rate is not used.
+
+        :param max_time: The maximum amount of time to wait for the frontier to become populated.
+        Defaults to 60
+        :param poll_rate: Unused
+        :return: T/F indicating if the frontier is still exhausted or not
+        """
+        logged_method = "wait_for_populated_q"
+        self.logger.info(logged_method, f"starting wait loop [max_time={max_time}]")
+        try:
+            if max_time != -1:
+                async with timeout(max_time):
+                    await self._wait_for_populated_q(logged_method)
+            else:
+                # we wait for ever when max_time is -1
+                await self._wait_for_populated_q(logged_method)
+        except (CancelledError, TimeoutError):
+            self.logger.info(logged_method, f"timed out")
+        self._did_wait = True
+        q_len = self.queue.size
+        self.logger.info(
+            logged_method, f"done waiting we have a q populated with {q_len} URLs"
+        )
+        return q_len == 0
+
+    async def q_len(self) -> int:
+        """Returns the length of the frontier's q
+
+        :return: The length of the queue
+        """
+        return self.queue.size
+
     async def exhausted(self) -> bool:
-        return len(self.queue) == 0
-
-    async def next_url(self) -> str:
-        next_url = self.queue.pop()
-        self.running = next_url
-        return next_url[0]
-
-    async def add(self, url: str, depth: int, scope: bool = True) -> None:
-        should_add = self.scope.in_scope(url) if scope else True
-        if should_add and url not in self.seen:
-            self.queue.append((url, depth))
-            self.seen.add(url)
-
-    async def add_all(self, urls: List[str]) -> None:
-        next_depth = self.running[1] + 1
-        if next_depth > self.depth:
-            return
+        """Returns a boolean that indicates if the frontier is exhausted or not.
+
+        :return: T/F indicating if the frontier is exhausted
+        """
+        qlen = self.queue.size
+        self.logger.debug("exhausted", f"len(queue) = {qlen}")
+        return qlen == 0
+
+    async def is_seen(self, url: str) -> bool:
+        """Returns a boolean that indicates if the supplied URL has been seen or not
+
+        :return: T/F indicating if the supplied URL is seen
+        """
+        return self.queue.is_seen(url)
+
+    async def next_url(self) -> Optional[str]:
+        """Retrieve the next URL to be crawled from the frontier.
+
+        If the queued URLs all belong to hosts that are not ready to be crawled,
+        we wait until one is.
+
+        :return: The next URL to be crawled or None if the frontier is exhausted
+        """
+        queue = self.queue
+        while 1:
+            queue.changed.clear()
+            entry, wait = queue.pop()
+            if entry is not None:
+                break
+            if wait < 0:
+                self.logger.info("next_url", "the frontier is exhausted")
+                return None
+            self.logger.debug("next_url", f"no URL is ready, waiting {wait}s")
+            try:
+                # woken early when a URL is queued or a host's URL is completed
+                await wait_for(queue.changed.wait(), wait or None, loop=self.loop)
+            except TimeoutError:
+                pass
+        self.currently_crawling = entry
+        self.logger.debug("next_url", f"the next URL is {entry}")
+        return entry.url
+
+    async def remove_current_from_pending(self) -> None:
+        """If currently_crawling url is set, remove it from the pending set"""
+        if self.currently_crawling is not None:
+            self.logger.debug(
+                "next_url",
+                f"removing the previous URL {self.currently_crawling} from the pending set",
+            )
+            self.queue.complete(self.currently_crawling)
+            self.currently_crawling = None
+
+    async def retry_current(self) -> bool:
+        """Queues the currently crawled URL, whose navigation failed, again once its
+        backoff, doubled for each retry of the URL, has elapsed. URLs retried more
+        than max_retries times are failed.
+
+        :return: T/F indicating if the URL will be retried rather than failed
+        """
+        entry = self.currently_crawling
+        if entry is None:
+            return False
+        self.currently_crawling = None
+        backoff = self.queue.retry(
+            entry, self.config.retry_backoff, self.config.retry_backoff_max
+        )
+        if backoff > 0:
+            self.logger.info(
+                "retry_current", f"retrying {entry.url} in {backoff:.1f} seconds"
+            )
+        else:
+            self.logger.info(
+                "retry_current", f"{entry.url} was retried too many times, failing it"
+            )
+        return backoff > 0
+
+    async def park_current(self, delay: float) -> bool:
+        """Queues the currently crawled URL, whose host is backing off, again once
+        the supplied delay has elapsed without counting a retry
+
+        :param delay: The number of seconds the URL is parked for
+        :return: T/F indicating if the URL is not to be navigated to, as it was parked
+        """
+        entry = self.currently_crawling
+        if entry is None:
+            return False
+        self.currently_crawling = None
+        self.queue.park(entry, delay)
+        self.logger.info("park_current", f"parked {entry.url} for {delay:.1f} seconds")
+        return True
+
+    async def mark_crawled(self, url: str, aliases: Iterable[str] = ()) -> bool:
+        """Marks the page being crawled as seen and crawled under the supplied URL
+        and its aliases, so that the page is not queued or crawled again under any
+        of them
+
+        :param url: The URL of the page after any redirects
+        :param aliases: The other URLs of the page, e.g. its canonical URL
+        :return: T/F indicating if the page was not crawled before under the URL
+        or its aliases for a claimed URL other than the currently crawled URL
+        """
+        claimed = (
+            self.currently_crawling.url if self.currently_crawling is not None else url
+        )
+        return self.queue.mark_all_crawled(dict.fromkeys((url, *aliases)), claimed)
+
+    async def release(self) -> None:
+        """Returns the currently crawled URL, if it was not completed, to the queue
+        counting a retry. Nothing else is claimed ahead of time by this frontier"""
+        if self.currently_crawling is not None:
+            returned = self.queue.requeue(self.currently_crawling)
+            self.logger.info(
+                "release",
+                f"{'returned' if returned else 'failed'} the abandoned URL {self.currently_crawling}",
+            )
+            self.currently_crawling = None
+
+    async def init(self) -> bool:
+        """Initialize the frontier. Returns T/F indicating
+        if the frontier is currently exhausted
+
+        """
+        self.crawl_depth = self.queue.crawl_depth
+        self.logger.info("init", f"crawl depth = {self.crawl_depth}")
+        self.logger.info("init", f"crawl order = {self.queue.order}")
+        self.logger.info("init", f"host politeness = {self.queue.politeness}")
+        self.scope.load_rules(self.queue.scope_rules)
+        if self.config.wait_for_q is not None:
+            return await self.wait_for_populated_q(
+                self.config.wait_for_q, self.config.wait_for_q_poll_rate
+            )
+        return await self.exhausted()
+
+    async def add(self, url: str, depth: int) -> bool:
+        """Conditionally adds a URL to frontier.
+
+        The addition condition is not seen, in scope, and not an
+        inner page link.
+
+        If the supplied URL is an inner page link it is added
+        to the inner page links set.
+
+        :param url: The URL to maybe add to the frontier
+        :param depth: The depth the URL is to be crawled at
+        :return: T/F indicating if the URL @ depth was added to the frontier
+        """
+        admitted = await self.admit((url,), depth)
+        return admitted[0][1] is AdmissionResult.ADDED
+
+    async def add_all(self, urls: Iterable[str]) -> bool:
+        """Conditionally adds URLs to frontier.
+
+        The addition condition is not seen and in scope, the number of URLs added
+        is limited by the outlink budget of the currently crawled page.
+
+        :param urls: An iterable containing URLs to be added
+        to the frontier
+        :return: T/F indicating if any of the URLs @ next depth were added to the frontier
+        """
+        logged_method = "add_all"
+        next_depth = self.next_depth()
+        if next_depth > self.crawl_depth:
+            self.logger.info(
+                logged_method,
+                f"Not adding any URLs, maximum crawl depth exceeded. Max depth = {self.crawl_depth}",
+            )
+            return False
+
+        num_added = 0
+        admitted = await admit_within_budget(self.admit, self.budget, urls, next_depth)
+        for _, result in admitted:
+            if result is AdmissionResult.ADDED:
+                num_added += 1
+
+        if num_added > 0:
+            self.logger.debug(logged_method, f"Added {num_added} urls to the frontier")
+            return True
+
+        self.logger.debug(logged_method, f"No URLs added to the frontier")
+        return False
+
+    async def admit(
+        self, urls: Iterable[str], depth: int
+    ) -> List[Tuple[str, AdmissionResult]]:
+        """Offers the supplied URLs to the frontier
+
+        :param urls: An iterable containing URLs to be added to the frontier
+        :param depth: The depth the URLs are to be crawled at
+        :return: A list of (URL, AdmissionResult) in the order the URLs were supplied
+        """
+        logged_method = "add"
+        current_page = self.scope.current_page
+        in_scope = self.scope.in_scope
+        add_inner_page_link = self.scope.add_inner_page_link
+        log_info = self.logger.info
+        offered: List[Tuple[str, Optional[AdmissionResult]]] = []
+        candidates: List[str] = []
+
         for url in urls:
-            await self.add(url, depth=next_depth)
-
-    @staticmethod
-    def init_(depth: int, seed_list: List[str]) -> "Frontier":
-        frontier = Frontier(Scope.from_seeds(seed_list), depth)
-        for url in seed_list:
-            frontier.queue.append((url, 0))
-            frontier.seen.add(url)
-        return frontier
+            if not in_scope(url):
+                offered.append((url, AdmissionResult.NOT_IN_SCOPE))
+            elif add_inner_page_link(url):
+                offered.append((url, AdmissionResult.INNER_PAGE_LINK))
+            else:
+                offered.append((url, None))
+                candidates.append(url)
+        # the URLs in scope are queued by the queue in a single batch
+        added = iter(self.queue.admit(candidates, depth, current_page))
+        admitted: List[Tuple[str, AdmissionResult]] = []
+        for url, rejection in offered:
+            if rejection is not None:
+                result = rejection
+            elif next(added):
+                result = AdmissionResult.ADDED
+            else:
+                result = AdmissionResult.SEEN
+            url_info = Helper.json_string(url=url, depth=depth, page=current_page)
+            log_info(logged_method, f"{ADMISSION_MESSAGES[result]} - {url_info}")
+            admitted.append((url, result))
+        return admitted
+
+    def _open_queue(self) -> Union[MemoryQueue, "SqliteQueue"]:
+        """Returns the in process queue of the automation
+
+        :return: The automation's queue
+        """
+        return memory_queue(self.config, self.loop)
+
+    async def _wait_for_populated_q(self, logged_method: str) -> None:
+        """Waits for a URL to be added to the frontiers Q
+
+        :param logged_method: The method name that should be used rather than this one
+        """
+        queue = self.queue
+        while queue.size == 0:
+            self.logger.info(logged_method, "q still not populated waiting")
+            queue.changed.clear()
+            await queue.changed.wait()
+
+    def __str__(self) -> str:
+        return f"MemoryFrontier(queue={self.queue})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
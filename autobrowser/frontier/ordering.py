@@ -0,0 +1,159 @@
+from typing import Any, Callable, Dict, Optional, Union
+from urllib.parse import urlsplit
+
+import attr
+from aioredis import Redis
+
+from autobrowser.automation import RedisKeys
+
+__all__ = [
+    "CRAWL_ORDERS",
+    "CrawlOrder",
+    "SCORE_FUNCTIONS",
+    "ScoreFunction",
+    "crawl_order_from_info",
+    "load_crawl_order",
+    "register_score_function",
+]
+
+CRAWL_ORDER_FIELD: str = "crawl_order"
+DEPTH_WEIGHT_FIELD: str = "crawl_order_depth_weight"
+SEED_WEIGHT_FIELD: str = "crawl_order_seed_weight"
+SCORE_FUNCTION_FIELD: str = "crawl_order_score_fn"
+
+#: The available crawl orders:
+#:  - fifo: URLs are crawled in the order they were discovered
+#:  - bfs: URLs are crawled breadth first (shallowest depth first)
+#:  - dfs: URLs are crawled depth first (deepest depth first)
+#:  - scored: URLs are crawled highest score first
+CRAWL_ORDERS = ("fifo", "bfs", "dfs", "scored")
+
+#: A function receiving an URL, the depth it is to be crawled at and the URL
+#: of the page it was discovered on returning its score. Scores are on the scale
+#: of one point equals one crawl depth
+ScoreFunction = Callable[[str, int, str], float]
+
+
+def shallow_path_score(url: str, depth: int, page: str) -> float:
+    """Scores URLs with fewer path segments higher"""
+    return -float(urlsplit(url).path.strip("/").count("/"))
+
+
+def same_host_score(url: str, depth: int, page: str) -> float:
+    """Scores URLs on the same host as the page they were discovered on higher"""
+    return 1.0 if urlsplit(url).netloc == urlsplit(page).netloc else 0.0
+
+
+SCORE_FUNCTIONS: Dict[str, ScoreFunction] = {
+    "shallow_path": shallow_path_score,
+    "same_host": same_host_score,
+}
+
+
+def register_score_function(name: str, score_function: ScoreFunction) -> None:
+    """Registers the supplied score function under name making it
+    selectable by an automation's crawl_order_score_fn
+
+    :param name: The name of the score function
+    :param score_function: The score function
+    """
+    SCORE_FUNCTIONS[name] = score_function
+
+
+@attr.dataclass(slots=True)
+class CrawlOrder:
+    """The order an automation's URLs are crawled in.
+
+    Ordered URLs are placed in priority buckets, lowest bucket crawled first,
+    with the URLs in a bucket crawled in the order they were discovered.
+    """
+
+    mode: str = attr.ib(default="fifo", validator=attr.validators.in_(CRAWL_ORDERS))
+    depth_weight: float = attr.ib(default=1.0)
+    seed_weight: float = attr.ib(default=0.0)
+    score_function: Optional[ScoreFunction] = attr.ib(default=None)
+
+    @property
+    def ordered(self) -> bool:
+        """Returns T/F indicating if URLs are placed in priority buckets"""
+        return self.mode != "fifo"
+
+    def priority(self, url: str, depth: int, page: str = "") -> Optional[int]:
+        """Returns the priority bucket of the supplied URL or None if
+        the crawl order is fifo
+
+        :param url: The URL to be prioritized
+        :param depth: The depth the URL is to be crawled at
+        :param page: The URL of the page the URL was discovered on
+        :return: The priority bucket of the URL
+        """
+        if self.mode == "fifo":
+            return None
+        if self.mode == "bfs":
+            return depth
+        if self.mode == "dfs":
+            return -depth
+        score = -self.depth_weight * depth
+        if depth == 0:
+            score += self.seed_weight
+        if self.score_function is not None:
+            score += self.score_function(url, depth, page)
+        return -int(round(score))
+
+
+async def load_crawl_order(redis: Redis, keys: RedisKeys) -> CrawlOrder:
+    """Creates the crawl order using the fields of the automation's info hash
+
+    :param redis: The redis instance to be used
+    :param keys: The redis keys class containing the keys for the automation
+    :return: The automation's crawl order
+    """
+    mode, depth_weight, seed_weight, score_fn = await redis.hmget(
+        keys.info,
+        CRAWL_ORDER_FIELD,
+        DEPTH_WEIGHT_FIELD,
+        SEED_WEIGHT_FIELD,
+        SCORE_FUNCTION_FIELD,
+    )
+    return crawl_order_from_fields(mode, depth_weight, seed_weight, score_fn)
+
+
+def crawl_order_from_info(info: Dict[str, Any]) -> CrawlOrder:
+    """Creates the crawl order using the fields of the supplied automation info
+
+    :param info: A dictionary using the field names of the automation's info hash
+    :return: The automation's crawl order
+    """
+    return crawl_order_from_fields(
+        info.get(CRAWL_ORDER_FIELD),
+        info.get(DEPTH_WEIGHT_FIELD),
+        info.get(SEED_WEIGHT_FIELD),
+        info.get(SCORE_FUNCTION_FIELD),
+    )
+
+
+def crawl_order_from_fields(
+    mode: Optional[str],
+    depth_weight: Optional[Union[str, float]],
+    seed_weight: Optional[Union[str, float]],
+    score_fn: Optional[str],
+) -> CrawlOrder:
+    """Creates the crawl order using the supplied info field values
+
+    :param mode: The crawl order mode
+    :param depth_weight: The weight of a URL's depth when scoring
+    :param seed_weight: The bonus given to seed URLs when scoring
+    :param score_fn: The name of the registered score function used when scoring
+    :return: The crawl order
+    """
+    score_function = None
+    if score_fn:
+        score_function = SCORE_FUNCTIONS.get(score_fn)
+        if score_function is None:
+            raise ValueError(f"Unknown crawl order score function '{score_fn}'")
+    return CrawlOrder(
+        mode=mode or "fifo",
+        depth_weight=float(depth_weight or 1.0),
+        seed_weight=float(seed_weight or 0.0),
+        score_function=score_function,
+    )
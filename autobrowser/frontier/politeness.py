@@ -0,0 +1,80 @@
+from typing import Any, Dict, Optional, Union
+from urllib.parse import urlsplit
+
+import attr
+from aioredis import Redis
+
+from autobrowser.automation import RedisKeys
+
+__all__ = ["HostPoliteness", "host_politeness_from_info", "load_host_politeness"]
+
+#: The names of the info hash fields are also used by the frontier's lua scripts
+HOST_DELAY_FIELD: str = "host_delay"
+HOST_MAX_CONCURRENCY_FIELD: str = "host_max_concurrency"
+
+
+@attr.dataclass(slots=True)
+class HostPoliteness:
+    """The per host politeness of an automation.
+
+    When enabled URLs are queued per host and a host's URLs are only handed
+    out once the host's delay has passed since its last URL was handed out and
+    while fewer than max_concurrency of its URLs are being crawled.
+    """
+
+    delay: float = attr.ib(default=0.0)
+    max_concurrency: int = attr.ib(default=0)
+
+    @property
+    def enabled(self) -> bool:
+        """Returns T/F indicating if URLs are queued per host"""
+        return self.delay > 0 or self.max_concurrency > 0
+
+    def host(self, url: str) -> Optional[str]:
+        """Returns the host the supplied URL is queued under or None
+        if politeness is not enabled
+
+        :param url: The URL to be queued
+        :return: The host of the URL
+        """
+        if not self.enabled:
+            return None
+        return urlsplit(url).hostname
+
+
+async def load_host_politeness(redis: Redis, keys: RedisKeys) -> HostPoliteness:
+    """Creates the host politeness using the fields of the automation's info hash
+
+    :param redis: The redis instance to be used
+    :param keys: The redis keys class containing the keys for the automation
+    :return: The automation's host politeness
+    """
+    delay, max_concurrency = await redis.hmget(
+        keys.info, HOST_DELAY_FIELD, HOST_MAX_CONCURRENCY_FIELD
+    )
+    return host_politeness_from_fields(delay, max_concurrency)
+
+
+def host_politeness_from_info(info: Dict[str, Any]) -> HostPoliteness:
+    """Creates the host politeness using the fields of the supplied automation info
+
+    :param info: A dictionary using the field names of the automation's info hash
+    :return: The automation's host politeness
+    """
+    return host_politeness_from_fields(
+        info.get(HOST_DELAY_FIELD), info.get(HOST_MAX_CONCURRENCY_FIELD)
+    )
+
+
+def host_politeness_from_fields(
+    delay: Optional[Union[str, float]], max_concurrency: Optional[Union[str, int]]
+) -> HostPoliteness:
+    """Creates the host politeness using the supplied info field values
+
+    :param delay: The minimum number of seconds between handing out the URLs of a host
+    :param max_concurrency: The maximum number of a host's URLs crawled concurrently
+    :return: The host politeness
+    """
+    return HostPoliteness(
+        delay=float(delay or 0.0), max_concurrency=int(max_concurrency or 0)
+    )
@@ -0,0 +1,170 @@
+from asyncio import AbstractEventLoop, sleep
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from aioredis import Redis
+from urlcanon import parse_url
+
+from autobrowser.automation import AutomationConfig
+from autobrowser.util import AutoLogger, Helper, create_autologger
+from .scripts import TOKEN_BUCKET_SCRIPT
+
+__all__ = ["HostRateLimiter", "drop_host_rate_limiters", "host_rate_limiter"]
+
+
+class HostRateLimiter:
+    """Limits the rate at which the pages of a host, or of the URLs sharing a SURT
+    prefix, are navigated to by every crawler sharing the limiter's key.
+
+    Each host or SURT prefix has a token bucket, the hash {key}:{host or prefix},
+    refilled at the host's rate and taken from atomically by TOKEN_BUCKET_SCRIPT before
+    each navigation. A crawler that takes a token the bucket does not yet have waits
+    until it is refilled, so the rate a host is crawled at is bounded no matter how
+    many tabs or processes crawl it.
+
+    The rate of a URL is the rate of the longest SURT prefix rule it matches, then
+    the rate of its host's rule, then the default rate. A rate of 0 is unlimited.
+    """
+
+    __slots__ = [
+        "__weakref__",
+        "_surt_rules",
+        "burst",
+        "default_rate",
+        "host_rules",
+        "key",
+        "logger",
+        "loop",
+        "redis",
+    ]
+
+    def __init__(
+        self,
+        redis: Redis,
+        key: str = "ratelimit",
+        default_rate: float = 0,
+        rules: Optional[Dict[str, Union[int, float]]] = None,
+        burst: float = 1,
+        loop: Optional[AbstractEventLoop] = None,
+    ) -> None:
+        """Initialize the new instance of HostRateLimiter
+
+        :param redis: The redis instance to be used
+        :param key: The prefix of the keys of the token buckets
+        :param default_rate: The requests per second of hosts without a rule, 0 is unlimited
+        :param rules: A dictionary of host or SURT prefix to its requests per second,
+        SURT prefixes are distinguished from hosts by containing a comma or a `)`
+        :param burst: The number of requests a host can receive at once after being idle
+        :param loop: The event loop used by the automation
+        """
+        self.redis: Redis = redis
+        self.key: str = key
+        self.default_rate: float = max(float(default_rate), 0)
+        self.burst: float = max(float(burst), 1)
+        self.loop: AbstractEventLoop = Helper.ensure_loop(loop)
+        self.logger: AutoLogger = create_autologger("frontier", "HostRateLimiter")
+        self.host_rules: Dict[str, float] = {}
+        surt_rules: List[Tuple[str, float]] = []
+        for rule, rate in (rules or {}).items():
+            if "," in rule or ")" in rule:
+                surt_rules.append((rule, max(float(rate), 0)))
+            else:
+                self.host_rules[rule.lower()] = max(float(rate), 0)
+        #: The SURT prefix rules, longest prefix first
+        self._surt_rules: List[Tuple[str, float]] = sorted(
+            surt_rules, key=lambda rule: len(rule[0]), reverse=True
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Returns T/F indicating if the rate of any host is limited"""
+        return (
+            self.default_rate > 0
+            or any(rate > 0 for rate in self.host_rules.values())
+            or any(rate > 0 for _, rate in self._surt_rules)
+        )
+
+    def bucket(self, url: str) -> Optional[Tuple[str, float]]:
+        """Returns the token bucket the navigation to the supplied URL takes from
+
+        :param url: The URL to be navigated to
+        :return: A tuple of the bucket's key and rate or None if the URL's rate
+        is unlimited
+        """
+        if self._surt_rules:
+            surt = parse_url(url).surt(with_scheme=False).decode("utf-8")
+            for prefix, rate in self._surt_rules:
+                if surt.startswith(prefix):
+                    return (f"{self.key}:{prefix}", rate) if rate > 0 else None
+        host = (urlsplit(url).hostname or "").lower()
+        if not host:
+            return None
+        rate = self.host_rules.get(host, self.default_rate)
+        return (f"{self.key}:{host}", rate) if rate > 0 else None
+
+    async def acquire(self, url: str) -> float:
+        """Waits until the supplied URL can be navigated to within its host's rate
+
+        :param url: The URL to be navigated to
+        :return: The number of seconds waited for
+        """
+        bucket = self.bucket(url)
+        if bucket is None:
+            return 0
+        key, rate = bucket
+        wait = (
+            await TOKEN_BUCKET_SCRIPT(self.redis, keys=[key], args=[rate, self.burst])
+            / 1000
+        )
+        if wait > 0:
+            self.logger.debug(
+                "acquire", f"waiting {wait} seconds to navigate to {url} ({key})"
+            )
+            await sleep(wait, loop=self.loop)
+        return wait
+
+    def __str__(self) -> str:
+        return f"HostRateLimiter(key={self.key}, default_rate={self.default_rate}, burst={self.burst}, rules={len(self.host_rules) + len(self._surt_rules)})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+#: The rate limiters used by the automations running in this process, by key
+_RATE_LIMITERS: Dict[str, HostRateLimiter] = {}
+
+
+def host_rate_limiter(
+    redis: Optional[Redis],
+    config: AutomationConfig,
+    loop: Optional[AbstractEventLoop] = None,
+) -> Optional[HostRateLimiter]:
+    """Returns the host rate limiter used by the automation, shared by the tabs of
+    the process, or None if the rate of no host is limited or redis is not used
+
+    :param redis: The redis instance to be used
+    :param config: The automation config
+    :param loop: The event loop used by the automation
+    :return: The host rate limiter used by the automation
+    """
+    if redis is None:
+        return None
+    limiter = _RATE_LIMITERS.get(config.host_rate_limit_key)
+    if limiter is None:
+        limiter = HostRateLimiter(
+            redis,
+            config.host_rate_limit_key,
+            config.host_rate_limit,
+            config.host_rate_limits,
+            config.host_rate_burst,
+            loop=loop,
+        )
+        if not limiter.enabled:
+            return None
+        _RATE_LIMITERS[config.host_rate_limit_key] = limiter
+    return limiter
+
+
+def drop_host_rate_limiters() -> None:
+    """Drops the host rate limiters of the automations run by this process"""
+    _RATE_LIMITERS.clear()
@@ -1,31 +1,85 @@
-from asyncio import AbstractEventLoop, CancelledError, TimeoutError, sleep
-from typing import Any, Awaitable, Dict, Iterable, Optional, Union
+from asyncio import AbstractEventLoop, CancelledError, Task, TimeoutError, gather, sleep
+from collections import deque
+from itertools import count
+from typing import (
+    Any,
+    Awaitable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
 
 from aioredis import Redis
 from async_timeout import timeout
-from ujson import loads
 
+from autobrowser.abcs import Frontier
 from autobrowser.automation import AutomationConfig, RedisKeys
 from autobrowser.scope import RedisScope
 from autobrowser.util import AutoLogger, Helper, create_autologger
+from .admission import ADMISSION_MESSAGES, AdmissionResult
+from .cache import AdmissionCache, admission_cache, release_admission_cache
+from .budget import OutlinkBudget, admit_within_budget, outlink_budget
+from .captures import DEFERRED_PRIORITY_OFFSET, CaptureIndex, capture_index
+from .entry import QueueEntry
+from .ordering import CrawlOrder, load_crawl_order
+from .politeness import HostPoliteness, load_host_politeness
+from .scripts import (
+    ADMIT_SCRIPT,
+    CLAIM_SCRIPT,
+    LEASE_SCRIPT,
+    MARK_CRAWLED_SCRIPT,
+    PARK_SCRIPT,
+    QUEUE_LEN_SCRIPT,
+    RECOVER_SCRIPT,
+    RELEASE_SCRIPT,
+    RETRY_SCRIPT,
+)
+from .seen import load_seen_set, url_fingerprint
+from .shards import FrontierShard, ShardMap, create_frontier_shards
+from .spill import QueueSpiller
 
 __all__ = ["RedisFrontier"]
 
 CRAWL_DEPTH_FIELD: str = "crawl_depth"
+#: The maximum number of expired leases reaped each time the leases are renewed
+REAP_LIMIT: int = 100
 
+#: The ids of the frontiers created by this process, in creation order, which combined
+#: with the automation's request id identify the crawler across restarts
+_CRAWLER_IDS: Iterator[int] = count()
 
-class RedisFrontier:
+
+class RedisFrontier(Frontier):
     __slots__ = [
         "__weakref__",
         "_did_wait",
+        "_lease_task",
+        "_prefetched",
+        "_refill_task",
+        "budget",
+        "cache",
+        "captures",
         "config",
         "crawl_depth",
+        "crawler_id",
         "currently_crawling",
+        "home",
         "keys",
+        "lease_time",
         "logger",
         "loop",
+        "order",
+        "politeness",
+        "prefetch_size",
         "redis",
         "scope",
+        "shard_map",
+        "shards",
     ]
 
     def __init__(
@@ -42,13 +96,39 @@ class RedisFrontier:
         """
         self.config: AutomationConfig = config
         self.crawl_depth: int = -1
-        self.currently_crawling: Optional[Dict[str, Union[str, int]]] = None
+        self.currently_crawling: Optional[QueueEntry] = None
         self.keys: RedisKeys = self.config.redis_keys
-        self.logger: AutoLogger = create_autologger("frontier", "RedisFrontier")
+        self.logger: AutoLogger = create_autologger(
+            "frontier", self.__class__.__name__
+        )
         self.loop: AbstractEventLoop = Helper.ensure_loop(loop)
+        #: The outlink admission budget of the currently crawled page
+        self.budget: OutlinkBudget = outlink_budget(self.config)
+        self.order: CrawlOrder = CrawlOrder()
+        self.politeness: HostPoliteness = HostPoliteness()
+        self.prefetch_size: int = max(self.config.frontier_prefetch, 0)
+        #: The lease time of the claimed URLs in milliseconds
+        self.lease_time: int = max(int(self.config.frontier_lease_time * 1000), 1000)
         self.redis: Redis = redis
         self.scope: RedisScope = RedisScope(self.redis, self.keys)
+        #: The cache of the URLs known to be seen or not in scope
+        self.cache: AdmissionCache = admission_cache(self.config)
+        #: The index of the URLs captured by any automation, if used
+        self.captures: Optional[CaptureIndex] = capture_index(self.redis, self.config)
+        self.crawler_id: str = f"{self.config.reqid}:{next(_CRAWLER_IDS)}"
+        self.shard_map: ShardMap = ShardMap(self.config.num_frontier_shards)
+        #: The shards of the frontier, the first shard uses the automation's redis
+        #: instance and keys. Additional shards are created by init
+        self.shards: List[FrontierShard] = [
+            FrontierShard(0, self.redis, self.keys, self.crawler_id)
+        ]
+        #: The shard URLs are claimed from first, URLs are stolen from the other shards
+        #: once it is empty
+        self.home: FrontierShard = self.shards[0]
         self._did_wait: bool = False
+        self._prefetched: Deque[QueueEntry] = deque()
+        self._refill_task: Optional[Task] = None
+        self._lease_task: Optional[Task] = None
 
     @property
     def did_wait(self) -> bool:
@@ -63,9 +143,16 @@ class RedisFrontier:
         """Indicate to both the frontier and scope instances for the crawl
         that we are now crawling a new page.
 
-        This is used for tracking inner page links
+        This is used for tracking inner page links and the outlink budget
+        of the page
         """
+        if self.budget.dropped > 0:
+            self.logger.info(
+                "crawling_new_page",
+                f"outlinks dropped by the outlink budget - {Helper.json_string(**self.budget.stats())}",
+            )
         self.scope.crawling_new_page(page_url)
+        self.budget.crawling_new_page(page_url)
 
     def next_depth(self) -> int:
         """Returns the next depth by adding one to the depth of the currently crawled URLs depth
@@ -73,7 +160,7 @@ class RedisFrontier:
         :return: The next depth
         """
         if self.currently_crawling is not None:
-            return self.currently_crawling["depth"] + 1
+            return self.currently_crawling.depth + 1
         return -1
 
     def add_to_pending(self, url: str) -> Awaitable[Any]:
@@ -91,40 +178,54 @@ class RedisFrontier:
         """
         return self.redis.srem(self.keys.pending, url)
 
-    def pop_inner_page_link(self) -> Awaitable[Optional[str]]:
-        """Removes and returns an inner page links from the redis set"""
-        return self.redis.spop(self.keys.inner_page_links)
+    async def pop_inner_page_link(self) -> Optional[str]:
+        """Removes and returns the first discovered inner page link of the current page"""
+        return self.scope.pop_inner_page_link()
 
     async def have_inner_page_links(self) -> bool:
         """Returns T/F indicating if we have inner page links
 
         :return: T/F indicating if we have inner page links
         """
-        num_ipls = await self.redis.scard(self.keys.inner_page_links)
-        return num_ipls > 0
+        return len(self.scope.inner_page_links) > 0
 
     async def remove_inner_page_links(self) -> None:
-        """Removes the inner page links set from redis"""
-        await self.redis.delete(self.keys.inner_page_links)
+        """Removes the inner page links of the current page"""
+        self.scope.inner_page_links.clear()
+
+    async def record_capture(self, url: str, digest: str = "") -> None:
+        """Records the capture of the supplied URL in the capture index, if used
+
+        :param url: The captured URL
+        :param digest: The digest of the captured content, if known
+        """
+        if self.captures is not None:
+            await self.captures.record(url, digest)
 
     async def wait_for_populated_q(
         self, max_time: Union[int, float] = 60, poll_rate: Union[int, float] = 5
     ) -> bool:
-        """Waits for the q to become populated by polling exhausted at poll_rate intervals until the
-        frontier becomes populated or max_time is reached
+        """Waits for the q to become populated or max_time is reached.
+
+        If the frontier is configured to block, the wait is performed using a blocking
+        pop (waking as soon as a URL is added to the q), otherwise by polling exhausted
+        at poll_rate intervals.
 
         :param max_time: The maximum amount of time to wait for the frontier to become populated.
         Defaults to 60
-        :param poll_rate: The interval time in seconds for polling exhausted. Defaults to 5
+        :param poll_rate: The interval time in seconds for polling exhausted or the maximum
+        amount of time a single blocking pop will block for. Defaults to 5
         :return: T/F indicating if the frontier is still exhausted or not
         """
         logged_method = "wait_for_populated_q"
         self.logger.info(
             logged_method,
-            f"starting wait loop [max_time={max_time}, poll_rate={poll_rate}]",
+            f"starting wait loop [max_time={max_time}, poll_rate={poll_rate}, blocking={self.config.wait_for_q_blocking}]",
         )
         try:
-            if max_time != -1:
+            if self.config.wait_for_q_blocking:
+                await self._block_for_populated_q(logged_method, max_time, poll_rate)
+            elif max_time != -1:
                 async with timeout(max_time):
                     await self._wait_for_populated_q(logged_method, poll_rate)
             else:
@@ -135,25 +236,43 @@ class RedisFrontier:
         except Exception as e:
             self.logger.exception(logged_method, f"waiting for ", exc_info=e)
             raise
+        self._did_wait = True
         q_len = await self.q_len()
         self.logger.info(
-            logged_method, f"done waiting we have a q populated with {q_len} URLs"
+            logged_method,
+            f"done waiting we have a q populated with {q_len} URLs and {len(self._prefetched)} prefetched URLs",
         )
-        return q_len == 0
+        return q_len == 0 and not self._prefetched
 
     async def q_len(self) -> int:
         """Returns an Awaitable that resolves to the length of the frontier's q
 
         :return: The length of the queue
         """
-        return await self.redis.llen(self.keys.queue)
+        lengths = await gather(
+            *[
+                QUEUE_LEN_SCRIPT(shard.redis, keys=shard.queue_keys)
+                for shard in self.shards
+            ],
+            loop=self.loop,
+        )
+        return sum(lengths)
 
     async def exhausted(self) -> bool:
-        """Returns a boolean that indicates if the frontier is exhausted or not
+        """Returns a boolean that indicates if the frontier is exhausted or not.
+
+        The frontier is not exhausted while there are prefetched URLs waiting
+        to be crawled, in which case redis is not consulted.
 
         :return: T/F indicating if the frontier is exhausted
         """
-        qlen = await self.redis.llen(self.keys.queue)
+        if not self._prefetched:
+            await self._wait_for_refill()
+        num_prefetched = len(self._prefetched)
+        if num_prefetched > 0:
+            self.logger.debug("exhausted", f"len(prefetched) = {num_prefetched}")
+            return False
+        qlen = await self.q_len()
         self.logger.debug("exhausted", f"len(queue) = {qlen}")
         return qlen == 0
 
@@ -163,48 +282,271 @@ class RedisFrontier:
 
         :return: T/F indicating if the supplied URL is seen
         """
-        return await self.redis.sismember(self.keys.seen, url) == 1
+        if self.cache.get(url) is AdmissionResult.SEEN:
+            return True
+        seen = await self.shards[self.shard_map.shard_for_url(url)].seen.contains(url)
+        if seen:
+            self.cache.put(url, AdmissionResult.SEEN)
+        return seen
+
+    async def next_url(self) -> Optional[str]:
+        """Retrieve the next URL to be crawled from the frontier.
 
-    async def next_url(self) -> str:
-        """Retrieve the next URL to be crawled from the frontier and updates the pending set
+        The URL is taken from the prefetch buffer, which is refilled in the background,
+        and only when the buffer is empty is the next URL claimed from redis directly.
+        URLs are claimed from the home shard, or stolen from the other shards when the
+        home shard is empty. If the queued URLs all belong to hosts that are not ready
+        to be crawled, we wait until one is.
 
-        :return: The next URL to be crawled
+        :return: The next URL to be crawled or None if the frontier is exhausted
         """
-        self.currently_crawling = await self._pop_url()
+        if not self._prefetched:
+            await self._wait_for_refill()
+        while not self._prefetched:
+            wait = await self._claim_any(self.prefetch_size + 1)
+            if self._prefetched:
+                break
+            if wait < 0:
+                self.logger.info("next_url", "the frontier is exhausted")
+                return None
+            self.logger.debug("next_url", f"no host is ready, waiting {wait}ms")
+            await sleep(wait / 1000, loop=self.loop)
+        self.currently_crawling = self._prefetched.popleft()
         self.logger.debug(
-            "next_url", f"the next URL is {Helper.json_string(self.currently_crawling)}"
+            "next_url", f"the next URL is {self.currently_crawling}"
         )
-        cc_url: str = self.currently_crawling["url"]
-        await self.add_to_pending(cc_url)
-        return cc_url
+        if len(self._prefetched) <= self.prefetch_size // 2:
+            self._refill()
+        return self.currently_crawling.url
 
     async def remove_current_from_pending(self) -> None:
-        """If currently_crawling url is set, remove it from pending set"""
+        """If currently_crawling url is set, mark it as completed.
+
+        Completed URLs are removed from the pending set by the next claim
+        of URLs from the queue or by release
+        """
         if self.currently_crawling is not None:
             self.logger.debug(
                 "next_url",
                 f"removing the previous URL {self.currently_crawling} from the pending set",
             )
-            curl: str = self.currently_crawling["url"]
-            await self.remove_from_pending(curl)
+            self.shards[self.currently_crawling.shard].completed.append(
+                self.currently_crawling.raw
+            )
             self.currently_crawling = None
 
+    async def retry_current(self) -> bool:
+        """Moves the currently crawled URL, whose navigation failed, to the retry sorted
+        set of its shard to be crawled again once its backoff, doubled for each retry of
+        the URL, has elapsed. URLs retried more than max_retries times are failed.
+
+        :return: T/F indicating if the URL will be retried rather than failed
+        """
+        entry = self.currently_crawling
+        if entry is None:
+            return False
+        self.currently_crawling = None
+        shard = self.shards[entry.shard]
+        backoff = await RETRY_SCRIPT(
+            shard.redis,
+            keys=shard.lease_script_keys,
+            args=[
+                entry.raw,
+                max(int(self.config.retry_backoff * 1000), 1),
+                max(int(self.config.retry_backoff_max * 1000), 1),
+            ],
+        )
+        if backoff > 0:
+            self.logger.info(
+                "retry_current", f"retrying {entry.url} in {backoff / 1000:.1f} seconds"
+            )
+        elif backoff == 0:
+            self.logger.info(
+                "retry_current", f"{entry.url} was retried too many times, failing it"
+            )
+        return backoff != 0
+
+    async def park_current(self, delay: float) -> bool:
+        """Moves the currently crawled URL, whose host is backing off, to the retry
+        sorted set of its shard to be crawled once the supplied delay has elapsed
+        without counting a retry. If the lease of the URL expired it was returned to
+        the queue already and is not parked
+
+        :param delay: The number of seconds the URL is parked for
+        :return: T/F indicating if the URL is not to be navigated to, as it was parked
+        or returned to the queue already
+        """
+        entry = self.currently_crawling
+        if entry is None:
+            return False
+        self.currently_crawling = None
+        shard = self.shards[entry.shard]
+        parked = await PARK_SCRIPT(
+            shard.redis,
+            keys=shard.lease_script_keys,
+            args=[entry.raw, max(int(delay * 1000), 1)],
+        )
+        if parked:
+            self.logger.info(
+                "park_current", f"parked {entry.url} for {delay:.1f} seconds"
+            )
+        else:
+            self.logger.info(
+                "park_current",
+                f"the lease of {entry.url} expired, it was returned to the queue already",
+            )
+        return True
+
+    async def mark_crawled(self, url: str, aliases: Iterable[str] = ()) -> bool:
+        """Marks the page being crawled as seen and crawled under the supplied URL
+        and its aliases, atomically per shard, so that the page is not queued or
+        crawled again under any of them. The crawled pages are recorded in the
+        crawled hashes of the shards, mapping the members of their seen sets to
+        the fingerprint of the claimed URL the page was crawled for
+
+        :param url: The URL of the page after any redirects
+        :param aliases: The other URLs of the page, e.g. its canonical URL
+        :return: T/F indicating if the page was not crawled before under the URL
+        or its aliases for a claimed URL other than the currently crawled URL
+        """
+        claimed = url_fingerprint(
+            self.currently_crawling.url if self.currently_crawling is not None else url
+        )
+        urls: Dict[str, None] = dict.fromkeys((url, *aliases))
+        by_shard: Dict[int, List[str]] = {}
+        for page_url in urls:
+            shard = self.shard_map.shard_for_url(page_url)
+            if shard not in by_shard:
+                by_shard[shard] = []
+            by_shard[shard].append(page_url)
+        shards = list(by_shard)
+        results = await gather(
+            *[
+                self._mark_crawled_in_shard(
+                    self.shards[shard], claimed, by_shard[shard]
+                )
+                for shard in shards
+            ],
+            loop=self.loop,
+        )
+        for page_url in urls:
+            self.cache.put(page_url, AdmissionResult.SEEN)
+        return all(
+            not_crawled == 1 for shard_results in results for not_crawled in shard_results
+        )
+
+    async def release(self) -> None:
+        """Stops renewing the leases of the claimed URLs, removes the completed URLs
+        from the pending set and returns any prefetched but not crawled URLs to the
+        head of the queue.
+
+        If the currently crawled URL was not completed, it is returned to the queue
+        counting a retry.
+        """
+        await self._stop_renewing_leases()
+        await self._wait_for_refill()
+        self.logger.info("release", f"admission cache stats = {self.cache.stats()}")
+        release_admission_cache(self.config)
+        prefetched = list(self._prefetched)
+        abandoned = self.currently_crawling
+        self._prefetched.clear()
+        self.currently_crawling = None
+        await gather(
+            *[
+                self._release_shard(shard, prefetched, abandoned)
+                for shard in self.shards
+            ],
+            loop=self.loop,
+        )
+
+    async def recover(self) -> int:
+        """Returns the URLs still leased by a previous run of this crawler, one that
+        stopped without releasing them, to the queue counting a retry
+
+        :return: The number of URLs returned to the queue
+        """
+        returned = await gather(
+            *[
+                RECOVER_SCRIPT(shard.redis, keys=shard.lease_script_keys)
+                for shard in self.shards
+            ],
+            loop=self.loop,
+        )
+        num_returned = sum(returned)
+        self.logger.info(
+            "recover", f"returned {num_returned} URLs leased by a previous run to the queue"
+        )
+        return num_returned
+
+    async def renew_leases(self) -> int:
+        """Renews the leases of the currently crawled, prefetched and completed but
+        not yet released URLs and returns expired leases held by other crawlers to
+        the queue
+
+        :return: The number of expired leases returned to the queue
+        """
+        held: Dict[int, List[str]] = {
+            shard.index: list(shard.completed) for shard in self.shards
+        }
+        for entry in self._prefetched:
+            held[entry.shard].append(entry.raw)
+        if self.currently_crawling is not None:
+            held[self.currently_crawling.shard].append(self.currently_crawling.raw)
+        reaped = await gather(
+            *[
+                LEASE_SCRIPT(
+                    shard.redis,
+                    keys=shard.lease_script_keys,
+                    args=[self.lease_time, 0, REAP_LIMIT, *held[shard.index]],
+                )
+                for shard in self.shards
+            ],
+            loop=self.loop,
+        )
+        num_reaped = sum(reaped)
+        if num_reaped > 0:
+            self.logger.info(
+                "renew_leases", f"returned {num_reaped} URLs with expired leases to the queue"
+            )
+        return num_reaped
+
     async def init(self) -> bool:
         """Initialize the frontier. Returns T/F indicating
         if the frontier is currently exhausted
 
         """
-        self.crawl_depth = int(
-            await self.redis.hget(self.keys.info, CRAWL_DEPTH_FIELD) or 0
-        )
-        self.logger.info("init", f"crawl depth = {self.crawl_depth}")
-        await self.scope.init()
+        await self.load()
+        await self.recover()
+        await self.renew_leases()
+        self._lease_task = self.loop.create_task(self._renew_leases())
         if self.config.wait_for_q is not None:
             return await self.wait_for_populated_q(
                 self.config.wait_for_q, self.config.wait_for_q_poll_rate
             )
         return await self.exhausted()
 
+    async def load(self) -> None:
+        """Loads the automation's crawl depth, shards, seen sets, crawl order, host
+        politeness and scope and prepares the queues of the shards, so that URLs can
+        be admitted to the frontier. Unlike init no URLs are recovered or claimed"""
+        self.crawl_depth = int(
+            await self.redis.hget(self.keys.info, CRAWL_DEPTH_FIELD) or 0
+        )
+        self.logger.info("init", f"crawl depth = {self.crawl_depth}")
+        if self.shard_map.sharded:
+            await self._init_shards()
+        for shard in self.shards:
+            shard.seen = await load_seen_set(shard.redis, shard.keys)
+        self.logger.info("init", f"seen set = {self.home.seen}")
+        self.order = await load_crawl_order(self.redis, self.keys)
+        self.logger.info("init", f"crawl order = {self.order}")
+        self.politeness = await load_host_politeness(self.redis, self.keys)
+        self.logger.info("init", f"host politeness = {self.politeness}")
+        if self.captures is not None:
+            self.logger.info("init", f"capture index = {self.captures}")
+        await self.scope.init()
+        await self._init_queues()
+
     async def add(self, url: str, depth: int) -> bool:
         """Conditionally adds a URL to frontier.
 
@@ -218,40 +560,14 @@ class RedisFrontier:
         :param depth: The depth the URL is to be crawled at
         :return: T/F indicating if the URL @ depth was added to the frontier
         """
-        logged_method = "add"
-        url_info = Helper.json_string(url=url, depth=depth, page=self.scope.current_page)
-
-        in_scope = self.scope.in_scope(url)
-        if not in_scope:
-            self.logger.info(
-                logged_method,
-                f"Not adding URL to the frontier, not in scope - {url_info}",
-            )
-            return False
-
-        if self.scope.is_inner_page_link(url):
-            await self.redis.sadd(self.keys.inner_page_links, url)
-            self.logger.info(
-                logged_method,
-                f"Not adding URL to the frontier, inner page link - {url_info}",
-            )
-            return False
-
-        was_added = await self.redis.sadd(self.keys.seen, url)
-        if was_added == 0:
-            self.logger.info(
-                logged_method, f"Not adding URL to the frontier, seen - {url_info}"
-            )
-            return False
-
-        await self.redis.rpush(self.keys.queue, url_info)
-        self.logger.info(logged_method, f"Added URL to the frontier - {url_info}")
-        return True
+        admitted = await self.admit((url,), depth)
+        return admitted[0][1] is AdmissionResult.ADDED
 
     async def add_all(self, urls: Iterable[str]) -> bool:
         """Conditionally adds URLs to frontier.
 
-        The addition condition is not seen and in scope.
+        The addition condition is not seen and in scope, the number of URLs added
+        is limited by the outlink budget of the currently crawled page.
 
         :param urls: An iterable containing URLs to be added
         to the frontier
@@ -271,29 +587,384 @@ class RedisFrontier:
             f"The next depth is {next_depth}. Max depth = {self.crawl_depth}",
         )
 
-        add_to_frontier = self.add
         num_added = 0
-
-        for url in urls:
-            was_added = await add_to_frontier(url, next_depth)
-            if was_added:
+        admitted = await admit_within_budget(
+            self.admit, self.budget, urls, next_depth, self.probe
+        )
+        for _, result in admitted:
+            if result is AdmissionResult.ADDED:
                 num_added += 1
 
         if num_added > 0:
+            await self.balance_spilled()
             self.logger.debug(logged_method, f"Added {num_added} urls to the frontier")
             return True
 
         self.logger.debug(logged_method, f"No URLs added to the frontier")
         return False
 
-    async def _pop_url(self) -> Dict[str, Union[str, int]]:
-        """Pops (removes) the next URL to be crawled from
-        the queue and returns it
+    async def admit(
+        self, urls: Iterable[str], depth: int
+    ) -> List[Tuple[str, AdmissionResult]]:
+        """Offers the supplied URLs to the frontier in a single round trip.
+
+        The scope and inner page link checks are done locally, the seen test,
+        the queue push and the addition of the inner page links are done for the
+        entire batch atomically by a server side script.
+        URLs rejected by the admission cache, known to be seen or not in scope,
+        and the inner page links already added for the current page are not
+        sent to redis. The checks are done in the order scope, inner page link
+        and then seen, so a URL known to be seen is still an inner page link of
+        the current page.
 
-        :return: The next URL to be crawled
+        If a capture index is used, the URLs passing the local checks are looked up
+        in it using a single pipeline and the URLs captured within its freshness window
+        are either rejected or queued in a priority bucket crawled after all other URLs.
+
+        :param urls: An iterable containing URLs to be added to the frontier
+        :param depth: The depth the URLs are to be crawled at
+        :return: A list of (URL, AdmissionResult) in the order the URLs were supplied
         """
-        udict_str = await self.redis.lpop(self.keys.queue)
-        return loads(udict_str)
+        logged_method = "add"
+        current_page = self.scope.current_page
+        in_scope = self.scope.in_scope
+        add_inner_page_link = self.scope.add_inner_page_link
+        cache = self.cache
+        cached_rejection = cache.get
+        shard_of = self.shard_map.shard_for_url
+        priority = self.order.priority
+        host_of = self.politeness.host
+        url_infos: List[str] = []
+        results: List[List[Any]] = []
+        #: shard -> (seen member, entry)s and the indices of their results
+        candidates: Dict[int, List[str]] = {}
+        candidate_indices: Dict[int, List[int]] = {}
+        #: the indices of the results of the URLs that passed the local checks
+        unchecked: List[int] = []
+
+        encode_entry = QueueEntry.encode_unreferred
+
+        for url in urls:
+            url_infos.append(
+                Helper.json_string(url=url, depth=depth, page=current_page)
+            )
+            cached = cached_rejection(url)
+            if cached is AdmissionResult.NOT_IN_SCOPE:
+                results.append([url, cached])
+            elif not in_scope(url):
+                cache.put(url, AdmissionResult.NOT_IN_SCOPE)
+                results.append([url, AdmissionResult.NOT_IN_SCOPE])
+            elif add_inner_page_link(url):
+                results.append([url, AdmissionResult.INNER_PAGE_LINK])
+            elif cached is not None:
+                results.append([url, cached])
+            else:
+                unchecked.append(len(results))
+                results.append([url, AdmissionResult.SEEN])
+
+        fresh: List[bool] = [False] * len(unchecked)
+        if self.captures is not None and unchecked:
+            fresh = await self.captures.fresh([results[idx][0] for idx in unchecked])
+
+        for idx, is_fresh in zip(unchecked, fresh):
+            url = results[idx][0]
+            host = host_of(url)
+            prio = priority(url, depth, current_page) if host is None else None
+            if is_fresh:
+                if not self.captures.defers:
+                    results[idx][1] = AdmissionResult.RECENTLY_CAPTURED
+                    continue
+                if host is None:
+                    prio = (prio or 0) + DEFERRED_PRIORITY_OFFSET
+            shard = shard_of(url)
+            if shard not in candidates:
+                candidates[shard] = []
+                candidate_indices[shard] = []
+            candidate_indices[shard].append(idx)
+            candidates[shard].append(self.shards[shard].seen.member(url))
+            candidates[shard].append(encode_entry(url, depth, prio, host))
+
+        if candidates:
+            shards = list(candidates)
+            was_added = await gather(
+                *[
+                    self.admit_to_shard(
+                        self.shards[shard], current_page, candidates[shard]
+                    )
+                    for shard in shards
+                ],
+                loop=self.loop,
+            )
+            for shard, shard_was_added in zip(shards, was_added):
+                for idx, added in zip(candidate_indices[shard], shard_was_added):
+                    if added == 1:
+                        results[idx][1] = AdmissionResult.ADDED
+                    # added or not, the URL is now in the seen set
+                    cache.put(results[idx][0], AdmissionResult.SEEN)
+
+        log_info = self.logger.info
+        admitted: List[Tuple[str, AdmissionResult]] = []
+        for (url, result), url_info in zip(results, url_infos):
+            log_info(logged_method, f"{ADMISSION_MESSAGES[result]} - {url_info}")
+            admitted.append((url, result))
+        return admitted
+
+    async def probe(self, urls: List[str]) -> List[Optional[AdmissionResult]]:
+        """Returns the rejection the frontier is known to give each of the supplied
+        URLs, without offering them to the frontier, using the same checks as admit.
+
+        The scope, inner page link and admission cache checks are done locally and
+        the remaining URLs are looked up in the seen sets of their shards concurrently,
+        so that the lookups are pipelined. Inner page links are not rejected, so that
+        admit records them.
+
+        :param urls: The URLs to be probed
+        :return: A list of the rejection, or None if the URL may be added, for each URL
+        """
+        cache = self.cache
+        in_scope = self.scope.in_scope
+        inner_page_links = self.scope.inner_page_links
+        is_inner_page_link = self.scope.is_inner_page_link
+        shard_of = self.shard_map.shard_for_url
+        rejections: List[Optional[AdmissionResult]] = [None] * len(urls)
+        lookups: List[Awaitable[bool]] = []
+        looked_up: List[int] = []
+        for idx, url in enumerate(urls):
+            if not in_scope(url):
+                rejections[idx] = AdmissionResult.NOT_IN_SCOPE
+            elif url in inner_page_links or is_inner_page_link(url):
+                continue
+            elif url in cache:
+                rejections[idx] = AdmissionResult.SEEN
+            else:
+                looked_up.append(idx)
+                lookups.append(self.shards[shard_of(url)].seen.contains(url))
+        if lookups:
+            seen = await gather(*lookups, loop=self.loop)
+            for idx, is_seen in zip(looked_up, seen):
+                if is_seen:
+                    rejections[idx] = AdmissionResult.SEEN
+                    cache.put(urls[idx], AdmissionResult.SEEN)
+        return rejections
+
+    async def admit_to_shard(
+        self, shard: FrontierShard, page: str, candidates: List[str]
+    ) -> List[int]:
+        """Adds the not seen candidates to the supplied shard in a single round trip.
+        Used by admit and the seed import, which call balance_spilled once done
+
+        :param shard: The shard the candidates belong to
+        :param page: The URL of the page the candidates were discovered on
+        :param candidates: The (seen member, entry)s of the candidates
+        :return: A list of 1 (added) or 0 (seen) for each candidate
+        """
+        return await ADMIT_SCRIPT(
+            shard.redis,
+            keys=[
+                *shard.queue_keys,
+                shard.seen.key,
+                shard.keys.referrers,
+                shard.keys.referrer_ids,
+            ],
+            args=[shard.seen.encoding, page, *candidates],
+        )
+
+    async def balance_spilled(self) -> None:
+        """Spills the tails of the shards' queues that have grown too large to disk"""
+        spillers = [shard.spiller for shard in self.shards if shard.spiller is not None]
+        if spillers:
+            await gather(*[spiller.balance() for spiller in spillers], loop=self.loop)
+
+    def _mark_crawled_in_shard(
+        self, shard: FrontierShard, claimed: int, urls: List[str]
+    ) -> Awaitable[List[int]]:
+        """Marks the supplied URLs of the page being crawled as seen and crawled, for
+        the supplied claimed URL, in the supplied shard
+
+        :param shard: The shard the URLs belong to
+        :param claimed: The fingerprint of the claimed URL the page is crawled for
+        :param urls: The URLs of the page
+        :return: An awaitable resolving to a list of 1 (not crawled before or crawled
+        for the claimed URL) or 0 (crawled for another URL) for each URL
+        """
+        return MARK_CRAWLED_SCRIPT(
+            shard.redis,
+            keys=[shard.seen.key, shard.keys.crawled],
+            args=[
+                shard.seen.encoding,
+                claimed,
+                *[shard.seen.member(url) for url in urls],
+            ],
+        )
+
+    async def _claim(self, shard: FrontierShard, count: int) -> int:
+        """Claims up to count URLs from the queue of the supplied shard, adding them
+        to the prefetch buffer, while removing the completed URLs from the pending set
+
+        :param shard: The shard to claim from
+        :param count: The maximum number of URLs to be claimed
+        :return: -1 if the queue is empty, the number of milliseconds until a host
+        becomes ready if no URLs could be claimed, otherwise 0
+        """
+        if count > 0 and shard.spiller is not None:
+            await shard.spiller.balance()
+        completed = shard.completed
+        shard.completed = []
+        wait, *claimed = await CLAIM_SCRIPT(
+            shard.redis,
+            keys=shard.lease_script_keys,
+            args=[count, self.lease_time, *completed],
+        )
+        for raw in claimed:
+            entry = QueueEntry.decode(raw)
+            entry.shard = shard.index
+            self._prefetched.append(entry)
+        self.logger.debug(
+            "_claim",
+            f"claimed {len(claimed)} URLs from shard {shard.index}, requested {count} URLs",
+        )
+        return wait
+
+    async def _claim_any(self, count: int) -> int:
+        """Claims up to count URLs from the home shard or, if none could be claimed from it,
+        steals them from the other shards. The completed URLs of the shards not claimed
+        from are removed from the pending set.
+
+        :param count: The maximum number of URLs to be claimed
+        :return: -1 if the queues of all shards are empty, the number of milliseconds until
+        a host becomes ready if no URLs could be claimed, otherwise 0
+        """
+        wait = -1
+        num_prefetched = len(self._prefetched)
+        for shard in self._shards_by_preference():
+            if len(self._prefetched) > num_prefetched:
+                if shard.completed:
+                    await self._claim(shard, 0)
+                continue
+            shard_wait = await self._claim(shard, count)
+            if len(self._prefetched) > num_prefetched:
+                wait = 0
+                if shard is not self.home:
+                    self.logger.debug(
+                        "_claim_any", f"stole URLs from shard {shard.index}"
+                    )
+            elif shard_wait >= 0 and (wait < 0 or shard_wait < wait):
+                wait = shard_wait
+        return wait
+
+    def _shards_by_preference(self) -> List[FrontierShard]:
+        """Returns the shards in the order URLs are claimed from them,
+        the home shard followed by the shards after it
+
+        :return: The ordered shards
+        """
+        home = self.home.index
+        return self.shards[home:] + self.shards[:home]
+
+    async def _init_shards(self) -> None:
+        """Creates the additional shards of the frontier, choosing the home shard
+        of the crawler, and copies the automation's info hash to the shards, as
+        it is used by the frontier's scripts"""
+        self.shards = await create_frontier_shards(
+            self.redis, self.config, self.crawler_id, loop=self.loop
+        )
+        self.home = self.shards[self.shard_map.shard_for(self.crawler_id)]
+        self.logger.info(
+            "init",
+            f"sharded over {len(self.shards)} shards, home shard = {self.home.index}",
+        )
+        info = await self.redis.hgetall(self.keys.info)
+        if info:
+            await gather(
+                *[
+                    shard.redis.hmset_dict(shard.keys.info, info)
+                    for shard in self.shards[1:]
+                ],
+                loop=self.loop,
+            )
+
+    async def _init_queues(self) -> None:
+        """Prepares the queues of the shards for use by the crawler"""
+        if self.config.frontier_spill_dir:
+            await self._init_spillers()
+
+    async def _init_spillers(self) -> None:
+        """Creates the queue spillers of the shards and returns the entries and
+        segments a previous run of this crawler was spilling or refilling"""
+        for shard in self.shards:
+            shard.spiller = QueueSpiller(
+                shard.redis,
+                shard.keys,
+                self.config.frontier_spill_dir,
+                self.crawler_id,
+                hot_size=self.config.frontier_hot_size,
+                segment_size=self.config.frontier_spill_segment_size,
+                loop=self.loop,
+            )
+            await shard.spiller.recover()
+        self.logger.info("init", f"queue spiller = {self.home.spiller}")
+
+    async def _release_shard(
+        self,
+        shard: FrontierShard,
+        prefetched: List[QueueEntry],
+        abandoned: Optional[QueueEntry],
+    ) -> None:
+        """Releases the URLs claimed from the supplied shard
+
+        :param shard: The shard to release the URLs of
+        :param prefetched: The prefetched URLs of all shards
+        :param abandoned: The URL being crawled when the crawler stopped, if any
+        """
+        completed = shard.completed
+        shard.completed = []
+        shard_prefetched = [
+            entry.raw for entry in prefetched if entry.shard == shard.index
+        ]
+        shard_abandoned = []
+        if abandoned is not None and abandoned.shard == shard.index:
+            shard_abandoned.append(abandoned.raw)
+        if not shard_prefetched and not completed and not shard_abandoned:
+            return
+        num_returned = await RELEASE_SCRIPT(
+            shard.redis,
+            keys=shard.lease_script_keys,
+            args=[
+                len(completed),
+                len(shard_abandoned),
+                *completed,
+                *shard_abandoned,
+                *shard_prefetched,
+            ],
+        )
+        self.logger.info(
+            "release",
+            f"released {len(completed)} completed URLs and returned {num_returned} abandoned or prefetched URLs to the queue of shard {shard.index}",
+        )
+
+    def _refill(self) -> None:
+        """Refills the prefetch buffer in the background if the frontier
+        is configured to prefetch and a refill is not already in progress"""
+        if self.prefetch_size == 0:
+            return
+        if self._refill_task is not None and not self._refill_task.done():
+            return
+        self._refill_task = self.loop.create_task(
+            self._claim_any(self.prefetch_size - len(self._prefetched))
+        )
+
+    async def _wait_for_refill(self) -> None:
+        """Waits for the in progress background refill of the prefetch buffer, if any"""
+        refill_task = self._refill_task
+        if refill_task is None:
+            return
+        self._refill_task = None
+        try:
+            await refill_task
+        except Exception as e:
+            self.logger.exception(
+                "_wait_for_refill", "refilling the prefetch buffer failed", exc_info=e
+            )
 
     async def _wait_for_populated_q(
         self, logged_method: str, poll_rate: Union[int, float] = 5
@@ -314,6 +985,82 @@ class RedisFrontier:
             await sleep(poll_rate, loop=eloop)
             frontier_exhausted = await is_frontier_exhausted()
 
+    async def _block_for_populated_q(
+        self,
+        logged_method: str,
+        max_time: Union[int, float] = 60,
+        block_time: Union[int, float] = 5,
+    ) -> None:
+        """Performs the blocking wait for the frontiers Q to become populated.
+
+        The Q's doorbell list, rung by the scripts adding URLs to the Q, is waited on
+        using BLPOP, so that the wait neither reorders the Q nor takes a host or
+        priority bucket out of its index. Each blocking pop blocks for at most
+        block_time seconds, so that the connection used is returned to the pool
+        regularly, and never past max_time. The Q is checked once woken and each time
+        a blocking pop times out, as rings may be stale and not every addition to the
+        Q, e.g. importing a snapshot, rings the doorbell.
+        When the frontier is sharded the home shard's doorbell is waited on, with the
+        other shards checked each time the Q is.
+
+        :param logged_method: The method name that should be used rather than this one
+        :param max_time: The maximum amount of time to wait for, -1 waits forever
+        :param block_time: The maximum amount of time a single blocking pop blocks for
+        """
+        if not await self.exhausted():
+            return
+        eloop = self.loop
+        deadline = eloop.time() + max_time if max_time != -1 else None
+        home = self.home
+        redis = home.redis
+        doorbell_key = home.keys.queue_doorbell
+        self_logger_info = self.logger.info
+
+        while 1:
+            wait_time = block_time
+            if deadline is not None:
+                remaining = deadline - eloop.time()
+                if remaining <= 0:
+                    self_logger_info(logged_method, "timed out")
+                    return
+                wait_time = min(wait_time, remaining)
+            wait_time = max(int(wait_time), 1)
+            # the blocking pop uses a connection of its own, as the commands sent using
+            # the pool share its connections and would wait for the pop
+            with await redis as conn:
+                await conn.blpop(doorbell_key, timeout=wait_time)
+            if not await self.exhausted():
+                return
+            self_logger_info(logged_method, "q still not populated waiting")
+
+    async def _renew_leases(self) -> None:
+        """Renews the leases of the claimed URLs every third of the lease time
+        until cancelled by release"""
+        renew_interval = self.lease_time / 3000
+        while 1:
+            await sleep(renew_interval, loop=self.loop)
+            try:
+                await self.renew_leases()
+            except CancelledError:
+                raise
+            except Exception as e:
+                self.logger.exception(
+                    "_renew_leases", "renewing the leases failed", exc_info=e
+                )
+
+    async def _stop_renewing_leases(self) -> None:
+        """Cancels the renewal of the leases of the claimed URLs, if running"""
+        lease_task = self._lease_task
+        if lease_task is None:
+            return
+        self._lease_task = None
+        if not lease_task.done():
+            lease_task.cancel()
+        try:
+            await lease_task
+        except CancelledError:
+            pass
+
     def __str__(self) -> str:
         return f"RedisFrontier()"
 
@@ -0,0 +1,330 @@
+import re
+from asyncio import AbstractEventLoop, Future
+from typing import Dict, List, Optional, Pattern, Tuple, Union
+from urllib.parse import urlsplit
+
+import attr
+from aiohttp import ClientSession, ClientTimeout
+from aioredis import Redis
+
+from autobrowser.automation import AutomationConfig
+from autobrowser.util import AutoLogger, Helper, create_autologger
+
+__all__ = [
+    "RobotsRules",
+    "RobotsStore",
+    "drop_robots_stores",
+    "parse_robots",
+    "robots_store",
+    "url_origin",
+]
+
+#: The maximum number of bytes of a robots.txt that are parsed
+ROBOTS_MAX_BYTES: int = 500 * 1024
+
+#: The robots.txt used for hosts whose robots.txt could not be fetched due to a
+#: server or network error, disallowing everything until it is fetched again
+DISALLOW_ALL: str = "User-agent: *\nDisallow: /\n"
+
+#: How long, in seconds, the robots.txt of a host that could not be fetched is cached for
+ROBOTS_ERROR_TTL: int = 10 * 60
+
+#: A rule of a robots.txt group: (length of the path pattern, allow, path prefix, regex
+#: if the pattern uses wildcards)
+RobotsRule = Tuple[int, bool, str, Optional[Pattern]]
+
+
+def url_origin(url: str) -> str:
+    """Returns the origin, scheme://host[:port], of the supplied URL
+
+    :param url: The URL
+    :return: The URL's origin
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+def _compile_rule(pattern: str, allow: bool) -> RobotsRule:
+    """Compiles the supplied path pattern of an allow or disallow line
+
+    :param pattern: The path pattern, may use the `*` and `$` wildcards
+    :param allow: T/F indicating if the line was an allow line
+    :return: The compiled rule
+    """
+    if "*" not in pattern and not pattern.endswith("$"):
+        return len(pattern), allow, pattern, None
+    anchored = pattern.endswith("$")
+    body = pattern[:-1] if anchored else pattern
+    regex = ".*".join(re.escape(part) for part in body.split("*"))
+    return len(pattern), allow, "", re.compile(regex + ("$" if anchored else ""))
+
+
+@attr.dataclass(slots=True)
+class RobotsRules:
+    """The rules of a host's robots.txt that apply to the crawler"""
+
+    #: The allow and disallow rules of the group matching the crawler, longest first
+    rules: List[RobotsRule] = attr.ib(factory=list)
+    #: The crawl delay of the group matching the crawler, if any
+    crawl_delay: Optional[float] = attr.ib(default=None)
+    #: The sitemaps listed by the robots.txt
+    sitemaps: List[str] = attr.ib(factory=list)
+
+    def allowed(self, url: str) -> bool:
+        """Returns T/F indicating if the crawler is allowed to crawl the supplied URL.
+        The longest matching rule applies, allow rules winning ties, and URLs no rule
+        matches are allowed
+
+        :param url: The URL to be tested
+        :return: T/F indicating if the URL is allowed
+        """
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path = f"{path}?{parts.query}"
+        if path == "/robots.txt":
+            return True
+        for _, allow, prefix, regex in self.rules:
+            if (regex.match(path) if regex is not None else path.startswith(prefix)):
+                # rules are sorted longest first with allow rules first on ties
+                return allow
+        return True
+
+
+def parse_robots(text: str, user_agent: str) -> RobotsRules:
+    """Parses the supplied robots.txt, keeping the rules of the group of the
+    user agent token most specifically matching the supplied user agent, or
+    of the `*` group if there is none
+
+    :param text: The contents of the robots.txt
+    :param user_agent: The user agent token of the crawler
+    :return: The rules that apply to the crawler
+    """
+    agent = user_agent.lower()
+    #: user agent token -> the lines of its groups
+    groups: Dict[str, List[Tuple[str, str]]] = {}
+    sitemaps: List[str] = []
+    current: List[List[Tuple[str, str]]] = []
+    in_rules = False
+    for line in text[:ROBOTS_MAX_BYTES].splitlines():
+        line = line.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        field, value = line.split(":", 1)
+        field = field.strip().lower()
+        value = value.strip()
+        if field == "sitemap":
+            if value:
+                sitemaps.append(value)
+        elif field == "user-agent":
+            if in_rules:
+                current = []
+                in_rules = False
+            current.append(groups.setdefault(value.lower(), []))
+        elif field in ("allow", "disallow", "crawl-delay"):
+            in_rules = True
+            for lines in current:
+                lines.append((field, value))
+    matching = [token for token in groups if token not in ("", "*") and token in agent]
+    lines = groups[max(matching, key=len)] if matching else groups.get("*", [])
+    rules: List[RobotsRule] = []
+    crawl_delay: Optional[float] = None
+    for field, value in lines:
+        if field == "crawl-delay":
+            try:
+                crawl_delay = float(value)
+            except ValueError:
+                pass
+        elif value:
+            rules.append(_compile_rule(value, field == "allow"))
+    rules.sort(key=lambda rule: (-rule[0], not rule[1]))
+    return RobotsRules(rules, crawl_delay, sitemaps)
+
+
+class RobotsStore:
+    """The parsed robots.txt rules of the hosts, shared by the tabs of the process and
+    cached, as fetched, in redis for every crawler sharing the store's key.
+
+    The robots.txt of each origin is kept in the key {key}:{origin} for ttl seconds,
+    so each is fetched once per ttl no matter how many crawlers need it. The parsed
+    rules are cached in process, so checking a URL against its host's rules is a
+    dictionary lookup once the rules have been loaded. A robots.txt that does not exist
+    allows everything and one that could not be fetched disallows everything until it
+    is fetched again, ROBOTS_ERROR_TTL seconds later.
+    """
+
+    __slots__ = [
+        "__weakref__",
+        "_fetching",
+        "cache",
+        "key",
+        "logger",
+        "loop",
+        "redis",
+        "session",
+        "ttl",
+        "user_agent",
+    ]
+
+    def __init__(
+        self,
+        redis: Redis,
+        session: ClientSession,
+        key: str = "robots",
+        ttl: int = 24 * 60 * 60,
+        user_agent: str = "autobrowser",
+        loop: Optional[AbstractEventLoop] = None,
+    ) -> None:
+        """Initialize the new instance of RobotsStore
+
+        :param redis: The redis instance to be used
+        :param session: The HTTP session robots.txt are fetched using
+        :param key: The prefix of the keys robots.txt are cached in
+        :param ttl: How long, in seconds, a robots.txt is cached for
+        :param user_agent: The user agent token of the crawler
+        :param loop: The event loop used by the automation
+        """
+        self.redis: Redis = redis
+        self.session: ClientSession = session
+        self.key: str = key
+        self.ttl: int = max(int(ttl), 1)
+        self.user_agent: str = user_agent
+        self.loop: AbstractEventLoop = Helper.ensure_loop(loop)
+        self.logger: AutoLogger = create_autologger("frontier", "RobotsStore")
+        #: origin -> (the time of the event loop the rules expire at, the rules)
+        self.cache: Dict[str, Tuple[float, RobotsRules]] = {}
+        #: origin -> the rules being loaded, so concurrent loads share a fetch
+        self._fetching: Dict[str, Future] = {}
+
+    def cached(self, url: str) -> Optional[RobotsRules]:
+        """Returns the cached rules of the supplied URL's origin, if they are loaded
+
+        :param url: The URL
+        :return: The rules of the URL's origin or None
+        """
+        cached = self.cache.get(url_origin(url))
+        if cached is None or cached[0] < self.loop.time():
+            return None
+        return cached[1]
+
+    def allowed(self, url: str) -> Optional[bool]:
+        """Returns T/F indicating if the supplied URL is allowed by the cached rules
+        of its origin or None if the rules are not loaded
+
+        :param url: The URL to be tested
+        :return: T/F indicating if the URL is allowed or None
+        """
+        rules = self.cached(url)
+        return rules.allowed(url) if rules is not None else None
+
+    async def rules(self, url: str) -> RobotsRules:
+        """Returns the rules of the supplied URL's origin, loading them from redis or
+        fetching its robots.txt if they are not cached
+
+        :param url: The URL
+        :return: The rules of the URL's origin
+        """
+        rules = self.cached(url)
+        if rules is not None:
+            return rules
+        origin = url_origin(url)
+        loading = self._fetching.get(origin)
+        if loading is None:
+            loading = self._fetching[origin] = self.loop.create_task(
+                self._load(origin)
+            )
+            loading.add_done_callback(lambda _: self._fetching.pop(origin, None))
+        return await loading
+
+    async def _load(self, origin: str) -> RobotsRules:
+        """Loads the rules of the supplied origin from redis, fetching and caching
+        its robots.txt if it is not cached
+
+        :param origin: The origin
+        :return: The rules of the origin
+        """
+        key = f"{self.key}:{origin}"
+        text = await self.redis.get(key)
+        ttl: Union[int, float] = self.ttl
+        if text is None:
+            text, ttl = await self._fetch(origin)
+            await self.redis.set(key, text, expire=int(ttl))
+        else:
+            ttl = max(await self.redis.ttl(key), 1)
+        rules = parse_robots(text, self.user_agent)
+        self.cache[origin] = (self.loop.time() + ttl, rules)
+        return rules
+
+    async def _fetch(self, origin: str) -> Tuple[str, int]:
+        """Fetches the robots.txt of the supplied origin
+
+        :param origin: The origin
+        :return: A tuple of the robots.txt to be used and how long it is cached for
+        """
+        url = f"{origin}/robots.txt"
+        try:
+            async with self.session.get(
+                url, timeout=ClientTimeout(total=30)
+            ) as response:
+                if response.status >= 500:
+                    self.logger.info(
+                        "_fetch",
+                        f"fetching {url} failed with status {response.status}, disallowing the origin",
+                    )
+                    return DISALLOW_ALL, ROBOTS_ERROR_TTL
+                if response.status >= 400:
+                    return "", self.ttl
+                body = await response.content.read(ROBOTS_MAX_BYTES)
+                return body.decode("utf-8", errors="replace"), self.ttl
+        except Exception as e:
+            self.logger.exception(
+                "_fetch", f"fetching {url} failed, disallowing the origin", exc_info=e
+            )
+        return DISALLOW_ALL, ROBOTS_ERROR_TTL
+
+    def __str__(self) -> str:
+        return f"RobotsStore(key={self.key}, ttl={self.ttl}, user_agent={self.user_agent}, cached={len(self.cache)})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+#: The robots stores used by the automations running in this process, by key
+_ROBOTS_STORES: Dict[str, RobotsStore] = {}
+
+
+def robots_store(
+    redis: Redis,
+    session: ClientSession,
+    config: AutomationConfig,
+    loop: Optional[AbstractEventLoop] = None,
+) -> RobotsStore:
+    """Returns the robots store used by the automation, shared by the tabs of the process
+
+    :param redis: The redis instance to be used
+    :param session: The HTTP session robots.txt are fetched using
+    :param config: The automation config
+    :param loop: The event loop used by the automation
+    :return: The robots store used by the automation
+    """
+    store = _ROBOTS_STORES.get(config.robots_key)
+    if store is None:
+        store = _ROBOTS_STORES[config.robots_key] = RobotsStore(
+            redis,
+            session,
+            config.robots_key,
+            config.robots_ttl,
+            config.robots_user_agent,
+            loop=loop,
+        )
+    return store
+
+
+def drop_robots_stores() -> None:
+    """Drops the robots stores of the automations run by this process, cancelling
+    the robots.txt fetches in flight, as the stores use the process's HTTP session"""
+    stores = list(_ROBOTS_STORES.values())
+    _ROBOTS_STORES.clear()
+    for store in stores:
+        for loading in list(store._fetching.values()):
+            loading.cancel()
@@ -0,0 +1,1132 @@
+"""The server side lua scripts used by RedisFrontier"""
+from autobrowser.util import RedisScript
+
+__all__ = [
+    "ADMIT_SCRIPT",
+    "CLAIM_SCRIPT",
+    "HOST_HEALTH_ACQUIRE_SCRIPT",
+    "HOST_HEALTH_RECORD_SCRIPT",
+    "LEASE_SCRIPT",
+    "MARK_CRAWLED_SCRIPT",
+    "PARK_SCRIPT",
+    "QUEUE_LEN_SCRIPT",
+    "RECOVER_SCRIPT",
+    "REFILL_COMMIT_SCRIPT",
+    "REFILL_SCRIPT",
+    "RELEASE_SCRIPT",
+    "RETRY_SCRIPT",
+    "SPILL_COMMIT_SCRIPT",
+    "SPILL_RECOVER_SCRIPT",
+    "SPILL_SCRIPT",
+    "STREAM_ADMIT_SCRIPT",
+    "STREAM_CLAIM_SCRIPT",
+    "STREAM_LEN_SCRIPT",
+    "STREAM_REAP_SCRIPT",
+    "STREAM_RECOVER_SCRIPT",
+    "STREAM_RELEASE_SCRIPT",
+    "STREAM_RENEW_SCRIPT",
+    "STREAM_RETRY_SCRIPT",
+    "TOKEN_BUCKET_SCRIPT",
+]
+
+#: Functions shared by the scripts for operating on the frontier's queue.
+#: The first five KEYS of every script are the queue's keys
+#: [queue, queue buckets, queue hosts, queue host state, info].
+#:
+#: Entries are tab separated records (referrer id, depth, priority, host, url), see
+#: QueueEntry, or the JSON objects used by earlier versions.
+#:
+#: Entries are routed by the fields of the entry:
+#:  - host: the entry is kept in the list queue:h:host with the hosts that have entries
+#:    kept in the queue hosts sorted set scored by the time (ms) the host is ready to be
+#:    crawled again, or +inf if the host is at its maximum concurrency.
+#:  - prio: the entry is kept in the list queue:prio with the priorities that have entries
+#:    kept in the queue buckets sorted set.
+#:  - otherwise: the entry is kept in the queue list.
+#: Entries are popped from the queue list, then the buckets, then the ready hosts.
+#:
+#: Entries being retried after a failed navigation wait in the sorted set queue:retry,
+#: scored by the time (ms) they are due, and are returned to the head of their queue
+#: once due.
+#:
+#: The entries of the queue list spilled to disk, see QueueSpiller, are counted as
+#: queued using the list queue:spilled of (number of entries, segment file) records.
+#:
+#: So that the length of the queue is not computed by scanning every bucket, host and
+#: spilled segment, the entries of the priority bucket and per host lists are counted
+#: by queue:queued and the spilled entries by queue:spilled:count. Both counters are
+#: initialized by a single scan if they do not exist.
+#:
+#: The scripts adding entries to the queue ring the list queue:doorbell, pushing one
+#: item per entry added up to 16, which the crawlers blocking until the queue is
+#: populated wait on (BLPOP) rather than on the queue itself. The doorbell expires
+#: after a minute so that the rings nobody waited for do not accumulate.
+QUEUE_FUNCTIONS = """
+local QUEUE = {
+  list = KEYS[1],
+  buckets = KEYS[2],
+  hosts = KEYS[3],
+  host_state = KEYS[4],
+  info = KEYS[5],
+}
+
+local function decode_entry(entry)
+  if string.sub(entry, 1, 1) == '{' then
+    return cjson.decode(entry)
+  end
+  local _, depth, prio, host, url = string.match(
+    entry, '^([^\t]*)\t([^\t]*)\t([^\t]*)\t([^\t]*)\t(.*)$'
+  )
+  local info = {url = url, depth = tonumber(depth)}
+  if prio ~= '' then
+    info['prio'] = prio
+  end
+  if host ~= '' then
+    info['host'] = host
+  end
+  return info
+end
+
+local function queue_counter()
+  local counter = QUEUE.list .. ':queued'
+  if redis.call('EXISTS', counter) == 0 then
+    local len = 0
+    for _, priority in ipairs(redis.call('ZRANGE', QUEUE.buckets, 0, -1)) do
+      len = len + redis.call('LLEN', QUEUE.list .. ':' .. priority)
+    end
+    for _, host in ipairs(redis.call('ZRANGE', QUEUE.hosts, 0, -1)) do
+      len = len + redis.call('LLEN', QUEUE.list .. ':h:' .. host)
+    end
+    redis.call('SET', counter, len)
+  end
+  return counter
+end
+
+local function host_limits()
+  local limits = redis.call('HMGET', QUEUE.info, 'host_delay', 'host_max_concurrency')
+  return math.floor((tonumber(limits[1]) or 0) * 1000), tonumber(limits[2]) or 0
+end
+
+local function host_score(host, max_active)
+  local state = redis.call('HMGET', QUEUE.host_state, 'ready:' .. host, 'active:' .. host)
+  if max_active > 0 and (tonumber(state[2]) or 0) >= max_active then
+    return '+inf'
+  end
+  return tonumber(state[1]) or 0
+end
+
+local function queue_push(entry, front)
+  local info = decode_entry(entry)
+  local push = 'RPUSH'
+  if front then
+    push = 'LPUSH'
+  end
+  if info['host'] ~= nil or info['prio'] ~= nil then
+    redis.call('INCR', queue_counter())
+  end
+  if info['host'] ~= nil then
+    redis.call(push, QUEUE.list .. ':h:' .. info['host'], entry)
+    if not redis.call('ZSCORE', QUEUE.hosts, info['host']) then
+      local _, max_active = host_limits()
+      redis.call('ZADD', QUEUE.hosts, host_score(info['host'], max_active), info['host'])
+    end
+  elseif info['prio'] ~= nil then
+    redis.call(push, QUEUE.list .. ':' .. info['prio'], entry)
+    redis.call('ZADD', QUEUE.buckets, 'NX', info['prio'], info['prio'])
+  else
+    redis.call(push, QUEUE.list, entry)
+  end
+end
+
+local function queue_ring(count)
+  if count <= 0 then
+    return
+  end
+  local doorbell = QUEUE.list .. ':doorbell'
+  local rings = {}
+  for i = 1, math.min(count, 16) do
+    rings[i] = '1'
+  end
+  redis.call('LPUSH', doorbell, unpack(rings))
+  redis.call('LTRIM', doorbell, 0, 15)
+  redis.call('PEXPIRE', doorbell, 60000)
+end
+
+local function queue_promote_retries(now)
+  local retry_key = QUEUE.list .. ':retry'
+  local due = redis.call('ZRANGEBYSCORE', retry_key, '-inf', now, 'LIMIT', 0, 100)
+  for _, entry in ipairs(due) do
+    redis.call('ZREM', retry_key, entry)
+    queue_push(entry, true)
+  end
+end
+
+local function queue_pop(now)
+  queue_promote_retries(now)
+  local entry = redis.call('LPOP', QUEUE.list)
+  if entry then
+    return entry
+  end
+  local counter = queue_counter()
+  local head = redis.call('ZRANGE', QUEUE.buckets, 0, 0)
+  while #head > 0 do
+    local bucket_key = QUEUE.list .. ':' .. head[1]
+    entry = redis.call('LPOP', bucket_key)
+    if redis.call('LLEN', bucket_key) == 0 then
+      redis.call('ZREM', QUEUE.buckets, head[1])
+    end
+    if entry then
+      redis.call('DECR', counter)
+      return entry
+    end
+    head = redis.call('ZRANGE', QUEUE.buckets, 0, 0)
+  end
+  local ready = redis.call('ZRANGEBYSCORE', QUEUE.hosts, '-inf', now, 'LIMIT', 0, 1)
+  while #ready > 0 do
+    local host = ready[1]
+    local host_key = QUEUE.list .. ':h:' .. host
+    entry = redis.call('LPOP', host_key)
+    if entry then
+      redis.call('DECR', counter)
+      local delay, max_active = host_limits()
+      redis.call('HINCRBY', QUEUE.host_state, 'active:' .. host, 1)
+      redis.call('HSET', QUEUE.host_state, 'ready:' .. host, now + delay)
+      if redis.call('LLEN', host_key) == 0 then
+        redis.call('ZREM', QUEUE.hosts, host)
+      else
+        redis.call('ZADD', QUEUE.hosts, host_score(host, max_active), host)
+      end
+      return entry
+    end
+    redis.call('ZREM', QUEUE.hosts, host)
+    ready = redis.call('ZRANGEBYSCORE', QUEUE.hosts, '-inf', now, 'LIMIT', 0, 1)
+  end
+  return false
+end
+
+local function queue_complete(pending_key, entry)
+  local info = decode_entry(entry)
+  redis.call('SREM', pending_key, info['url'])
+  if info['host'] ~= nil then
+    local host = info['host']
+    if redis.call('HINCRBY', QUEUE.host_state, 'active:' .. host, -1) <= 0 then
+      redis.call('HDEL', QUEUE.host_state, 'active:' .. host)
+    end
+    if redis.call('ZSCORE', QUEUE.hosts, host) == 'inf' then
+      local _, max_active = host_limits()
+      redis.call('ZADD', QUEUE.hosts, host_score(host, max_active), host)
+    end
+  end
+end
+
+local function queue_len()
+  local len = redis.call('LLEN', QUEUE.list) + redis.call('ZCARD', QUEUE.list .. ':retry')
+  len = len + tonumber(redis.call('GET', queue_counter()))
+  local spilled = redis.call('GET', QUEUE.list .. ':spilled:count')
+  if spilled then
+    return len + tonumber(spilled)
+  end
+  for _, segment in ipairs(redis.call('LRANGE', QUEUE.list .. ':spilled', 0, -1)) do
+    len = len + tonumber(string.match(segment, '^(%d+)\t'))
+  end
+  return len
+end
+
+local function redis_time_ms()
+  local time = redis.call('TIME')
+  return tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+end
+"""
+
+#: Functions shared by the scripts for leasing claimed entries, to be used
+#: with the QUEUE_FUNCTIONS. KEYS 6 to 10 of the scripts using them are the lease keys
+#: [pending, leases, leased, retries, failed].
+#:
+#: A claimed entry's URL is added to the pending set and the entry to the leases sorted
+#: set, scored by the time (ms) the lease expires, and the set of entries leased by the
+#: crawler. Leases are renewed by the crawler while it holds the entry, expired leases
+#: are reaped by any live crawler returning the entry to the head of its queue.
+#: Completing or returning an entry whose lease was reaped does nothing, as the
+#: entry is queued again.
+#: Once an entry has been returned more than max_retries times (info hash field,
+#: default 3) it is moved to the failed list instead.
+LEASE_FUNCTIONS = """
+local LEASE = {
+  pending = KEYS[6],
+  leases = KEYS[7],
+  leased = KEYS[8],
+  retries = KEYS[9],
+  failed = KEYS[10],
+}
+
+local function lease_acquire(entry, expires, lease_ms)
+  redis.call('SADD', LEASE.pending, decode_entry(entry)['url'])
+  redis.call('ZADD', LEASE.leases, expires, entry)
+  redis.call('SADD', LEASE.leased, entry)
+  redis.call('PEXPIRE', LEASE.leased, lease_ms * 2)
+end
+
+local function lease_renew(entry, expires)
+  return redis.call('ZADD', LEASE.leases, 'XX', 'CH', expires, entry)
+end
+
+local function lease_complete(entry)
+  redis.call('SREM', LEASE.leased, entry)
+  if redis.call('ZREM', LEASE.leases, entry) == 1 then
+    queue_complete(LEASE.pending, entry)
+    redis.call('HDEL', LEASE.retries, decode_entry(entry)['url'])
+  end
+end
+
+local function lease_return(entry)
+  redis.call('SREM', LEASE.leased, entry)
+  if redis.call('ZREM', LEASE.leases, entry) == 0 then
+    return 0
+  end
+  queue_complete(LEASE.pending, entry)
+  queue_push(entry, true)
+  return 1
+end
+
+local function lease_requeue(entry)
+  redis.call('SREM', LEASE.leased, entry)
+  if redis.call('ZREM', LEASE.leases, entry) == 0 then
+    return 0
+  end
+  queue_complete(LEASE.pending, entry)
+  local url = decode_entry(entry)['url']
+  local max_retries = tonumber(redis.call('HGET', QUEUE.info, 'max_retries')) or 3
+  if redis.call('HINCRBY', LEASE.retries, url, 1) > max_retries then
+    redis.call('HDEL', LEASE.retries, url)
+    redis.call('RPUSH', LEASE.failed, entry)
+    return 0
+  end
+  queue_push(entry, true)
+  return 1
+end
+
+local function lease_reap(now, limit)
+  local requeued = 0
+  local expired = redis.call('ZRANGEBYSCORE', LEASE.leases, '-inf', now, 'LIMIT', 0, limit)
+  for _, entry in ipairs(expired) do
+    requeued = requeued + lease_requeue(entry)
+  end
+  queue_ring(requeued)
+  return requeued
+end
+"""
+
+#: Functions shared by the scripts admitting URLs to the frontier.
+#: How a URL is marked as seen depends on the seen encoding, the page a URL
+#: was discovered on is interned as a referrer id.
+ADMIT_FUNCTIONS = """
+local function mark_seen(encoding, seen_key, member)
+  if encoding == 'fingerprint' then
+    local sep = string.find(member, ':', 1, true)
+    local bucket_key = seen_key .. ':' .. string.sub(member, 1, sep - 1)
+    return redis.call('SADD', bucket_key, string.sub(member, sep + 1))
+  elseif encoding == 'bloom' then
+    return redis.call('BF.ADD', seen_key, member)
+  end
+  return redis.call('SADD', seen_key, member)
+end
+
+local function intern_referrer(referrers_key, referrer_ids_key, page)
+  if page == '' then
+    return ''
+  end
+  local id = redis.call('HGET', referrer_ids_key, page)
+  if not id then
+    id = tostring(redis.call('HLEN', referrers_key) + 1)
+    redis.call('HSET', referrers_key, id, page)
+    redis.call('HSET', referrer_ids_key, page, id)
+  end
+  return id
+end
+"""
+
+#: For each (seen member, entry) pushes the entry onto the queue if the URL was not
+#: seen. The entries are supplied without the referrer id, the page is interned by
+#: the script when the first URL is added.
+#: KEYS = [*queue keys, seen, referrers, referrer ids]
+#: ARGV = [seen encoding, page, *(seen member, entry)]
+#: Returns a list of 1 (added) or 0 (seen) for each (seen member, entry)
+ADMIT_SCRIPT = RedisScript(
+    QUEUE_FUNCTIONS
+    + ADMIT_FUNCTIONS
+    + """
+local encoding = ARGV[1]
+local referrer = nil
+local added = {}
+local num_added = 0
+for i = 3, #ARGV, 2 do
+  local was_added = mark_seen(encoding, KEYS[6], ARGV[i])
+  if was_added == 1 then
+    if referrer == nil then
+      referrer = intern_referrer(KEYS[7], KEYS[8], ARGV[2])
+    end
+    queue_push(referrer .. '\t' .. ARGV[i + 1], false)
+    num_added = num_added + 1
+  end
+  added[#added + 1] = was_added
+end
+queue_ring(num_added)
+return added
+"""
+)
+
+#: Marks each seen member as seen and as crawled for the supplied claimed URL, the
+#: members are those of the URLs of the page being crawled. The crawled hash maps the
+#: members of the crawled pages to the 64bit fingerprint of the claimed URL they were
+#: crawled for, so that a claimed URL crawled again, e.g. recovered from its lease, is
+#: not its own duplicate.
+#: KEYS = [seen, crawled]
+#: ARGV = [seen encoding, fingerprint of the claimed URL, *seen members]
+#: Returns a list of 1 (not crawled before or crawled for the claimed URL) or
+#: 0 (crawled for another URL) for each seen member
+MARK_CRAWLED_SCRIPT = RedisScript(
+    ADMIT_FUNCTIONS
+    + """
+local crawled = {}
+for i = 3, #ARGV do
+  mark_seen(ARGV[1], KEYS[1], ARGV[i])
+  if redis.call('HSETNX', KEYS[2], ARGV[i], ARGV[2]) == 1
+    or redis.call('HGET', KEYS[2], ARGV[i]) == ARGV[2] then
+    crawled[#crawled + 1] = 1
+  else
+    crawled[#crawled + 1] = 0
+  end
+end
+return crawled
+"""
+)
+
+#: Completes the previously claimed entries, reaps up to count expired leases
+#: and then claims up to count entries from the queue leasing them.
+#: KEYS = [*queue keys, *lease keys]
+#: ARGV = [count, lease time (ms), *completed entries]
+#: Returns [wait, *claimed entries] where wait is -1 if the queue is empty, the number
+#: of milliseconds until a host becomes ready if no entries could be claimed, otherwise 0
+CLAIM_SCRIPT = RedisScript(
+    "redis.replicate_commands()\n"
+    + QUEUE_FUNCTIONS
+    + LEASE_FUNCTIONS
+    + """
+for i = 3, #ARGV do
+  lease_complete(ARGV[i])
+end
+local now = redis_time_ms()
+local lease_ms = tonumber(ARGV[2])
+local count = tonumber(ARGV[1])
+lease_reap(now, count)
+local claimed = {0}
+for i = 1, count do
+  local entry = queue_pop(now)
+  if not entry then
+    break
+  end
+  lease_acquire(entry, now + lease_ms, lease_ms)
+  claimed[#claimed + 1] = entry
+end
+if #claimed == 1 then
+  if queue_len() == 0 then
+    claimed[1] = -1
+  else
+    local ready = nil
+    local next_host = redis.call('ZRANGE', QUEUE.hosts, 0, 0, 'WITHSCORES')
+    if #next_host > 0 and next_host[2] ~= 'inf' then
+      ready = tonumber(next_host[2])
+    end
+    local next_retry = redis.call('ZRANGE', QUEUE.list .. ':retry', 0, 0, 'WITHSCORES')
+    if #next_retry > 0 and (ready == nil or tonumber(next_retry[2]) < ready) then
+      ready = tonumber(next_retry[2])
+    end
+    if ready ~= nil then
+      claimed[1] = math.max(ready - now, 1)
+    else
+      claimed[1] = 1000
+    end
+  end
+end
+return claimed
+"""
+)
+
+#: Completes the completed entries, returns the abandoned entries, those claimed
+#: and being crawled when the crawler stopped, to the queue counting a retry and
+#: returns the claimed but not crawled entries to the head of the queue in their
+#: original order.
+#: KEYS = [*queue keys, *lease keys]
+#: ARGV = [number of completed entries, number of abandoned entries, *completed entries,
+#: *abandoned entries, *claimed entries]
+#: Returns the number of entries returned to the queue
+RELEASE_SCRIPT = RedisScript(
+    QUEUE_FUNCTIONS
+    + LEASE_FUNCTIONS
+    + """
+local abandoned_start = tonumber(ARGV[1]) + 3
+local claimed_start = abandoned_start + tonumber(ARGV[2])
+local returned = 0
+for i = 3, abandoned_start - 1 do
+  lease_complete(ARGV[i])
+end
+for i = abandoned_start, claimed_start - 1 do
+  returned = returned + lease_requeue(ARGV[i])
+end
+for i = #ARGV, claimed_start, -1 do
+  returned = returned + lease_return(ARGV[i])
+end
+queue_ring(returned)
+return returned
+"""
+)
+
+#: Leases or renews the leases of the supplied entries and then reaps up to
+#: limit expired leases.
+#: KEYS = [*queue keys, *lease keys]
+#: ARGV = [lease time (ms), acquire (1) or renew (0), reap limit, *entries]
+#: Returns the number of expired leases returned to the queue
+LEASE_SCRIPT = RedisScript(
+    "redis.replicate_commands()\n"
+    + QUEUE_FUNCTIONS
+    + LEASE_FUNCTIONS
+    + """
+local now = redis_time_ms()
+local lease_ms = tonumber(ARGV[1])
+for i = 4, #ARGV do
+  if ARGV[2] == '1' then
+    lease_acquire(ARGV[i], now + lease_ms, lease_ms)
+  elseif lease_renew(ARGV[i], now + lease_ms) == 1 then
+    redis.call('PEXPIRE', LEASE.leased, lease_ms * 2)
+  end
+end
+return lease_reap(now, tonumber(ARGV[3]))
+"""
+)
+
+#: Returns the entries still leased by a crawler that stopped without releasing
+#: them, for example due to a crash, to the queue counting a retry.
+#: KEYS = [*queue keys, *lease keys]
+#: Returns the number of entries returned to the queue
+RECOVER_SCRIPT = RedisScript(
+    QUEUE_FUNCTIONS
+    + LEASE_FUNCTIONS
+    + """
+local returned = 0
+for _, entry in ipairs(redis.call('SMEMBERS', LEASE.leased)) do
+  returned = returned + lease_requeue(entry)
+end
+redis.call('DEL', LEASE.leased)
+queue_ring(returned)
+return returned
+"""
+)
+
+#: Completes the lease of the supplied entry, whose navigation failed, and adds it to
+#: the retry sorted set due after an exponential backoff counting a retry, if the entry
+#: has been retried more than max_retries times it is moved to the failed list instead.
+#: The backoff of the nth retry is min(backoff * 2 ^ (n - 1), max backoff).
+#: KEYS = [*queue keys, *lease keys]
+#: ARGV = [entry, backoff (ms), max backoff (ms)]
+#: Returns the backoff (ms) if the entry will be retried, 0 if it failed or -1 if
+#: its lease expired and it was returned to the queue already
+RETRY_SCRIPT = RedisScript(
+    "redis.replicate_commands()\n"
+    + QUEUE_FUNCTIONS
+    + LEASE_FUNCTIONS
+    + """
+local entry = ARGV[1]
+redis.call('SREM', LEASE.leased, entry)
+if redis.call('ZREM', LEASE.leases, entry) == 0 then
+  return -1
+end
+queue_complete(LEASE.pending, entry)
+local url = decode_entry(entry)['url']
+local max_retries = tonumber(redis.call('HGET', QUEUE.info, 'max_retries')) or 3
+local retries = redis.call('HINCRBY', LEASE.retries, url, 1)
+if retries > max_retries then
+  redis.call('HDEL', LEASE.retries, url)
+  redis.call('RPUSH', LEASE.failed, entry)
+  return 0
+end
+local backoff = math.min(tonumber(ARGV[2]) * 2 ^ (retries - 1), tonumber(ARGV[3]))
+backoff = math.max(math.floor(backoff), 1)
+redis.call('ZADD', QUEUE.list .. ':retry', redis_time_ms() + backoff, entry)
+return backoff
+"""
+)
+
+#: Completes the lease of the supplied entry, whose host is backing off, and adds it to
+#: the retry sorted set due after the supplied delay without counting a retry
+#: KEYS = [*queue keys, *lease keys]
+#: ARGV = [entry, delay (ms)]
+#: Returns 1 if the entry was parked or 0 if its lease expired and it was returned
+#: to the queue already
+PARK_SCRIPT = RedisScript(
+    "redis.replicate_commands()\n"
+    + QUEUE_FUNCTIONS
+    + LEASE_FUNCTIONS
+    + """
+local entry = ARGV[1]
+redis.call('SREM', LEASE.leased, entry)
+if redis.call('ZREM', LEASE.leases, entry) == 0 then
+  return 0
+end
+queue_complete(LEASE.pending, entry)
+redis.call('ZADD', QUEUE.list .. ':retry', redis_time_ms() + tonumber(ARGV[2]), entry)
+return 1
+"""
+)
+
+#: Returns the number of entries in the queue
+#: KEYS = [*queue keys]
+QUEUE_LEN_SCRIPT = RedisScript(
+    QUEUE_FUNCTIONS
+    + """
+return queue_len()
+"""
+)
+
+#: Functions shared by the scripts spilling the queue list to disk, see QueueSpiller.
+#:
+#: The entries being spilled and the segments being refilled are kept in per crawler
+#: spilling and refilling lists leased, in the spill leases sorted set scored by the time
+#: (ms) the lease expires, so that any live crawler returns them if the crawler stops.
+SPILL_FUNCTIONS = """
+local function spill_counter(spilled)
+  local counter = spilled .. ':count'
+  if redis.call('EXISTS', counter) == 0 then
+    local len = 0
+    for _, segment in ipairs(redis.call('LRANGE', spilled, 0, -1)) do
+      len = len + tonumber(string.match(segment, '^(%d+)\t'))
+    end
+    redis.call('SET', counter, len)
+  end
+  return counter
+end
+
+local function spill_time_ms()
+  local time = redis.call('TIME')
+  return tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+end
+
+local function spill_return(queue, spilled, leases, key)
+  local entries = redis.call('LRANGE', key, 0, -1)
+  if string.find(key, ':spilling:', 1, true) then
+    for i = 1, #entries, 1000 do
+      redis.call('RPUSH', queue, unpack(entries, i, math.min(i + 999, #entries)))
+    end
+  else
+    local counter = spill_counter(spilled)
+    for _, segment in ipairs(entries) do
+      redis.call('LPUSH', spilled, segment)
+      redis.call('INCRBY', counter, tonumber(string.match(segment, '^(%d+)\t')))
+    end
+  end
+  redis.call('DEL', key)
+  redis.call('ZREM', leases, key)
+  return #entries
+end
+"""
+
+#: Moves up to count entries from the tail of the queue list, keeping at least keep
+#: entries in the queue list, to the crawler's spilling list and leases the list
+#: KEYS = [queue, spilling, spill leases]
+#: ARGV = [count, keep, lease time (ms)]
+#: Returns the moved entries, oldest first
+SPILL_SCRIPT = RedisScript(
+    "redis.replicate_commands()\n"
+    + SPILL_FUNCTIONS
+    + """
+local num = math.min(tonumber(ARGV[1]), redis.call('LLEN', KEYS[1]) - tonumber(ARGV[2]))
+if num <= 0 then
+  return {}
+end
+local entries = redis.call('LRANGE', KEYS[1], -num, -1)
+redis.call('LTRIM', KEYS[1], 0, -num - 1)
+for i = 1, #entries, 1000 do
+  redis.call('RPUSH', KEYS[2], unpack(entries, i, math.min(i + 999, #entries)))
+end
+redis.call('ZADD', KEYS[3], spill_time_ms() + tonumber(ARGV[3]), KEYS[2])
+return entries
+"""
+)
+
+#: Records the segment file the entries of the crawler's spilling list were written to,
+#: unless the lease of the list expired and its entries were returned to the queue
+#: KEYS = [spilling, spilled, spill leases]
+#: ARGV = [segment record]
+#: Returns 1 if the segment was recorded, otherwise 0
+SPILL_COMMIT_SCRIPT = RedisScript(
+    SPILL_FUNCTIONS
+    + """
+redis.call('ZREM', KEYS[3], KEYS[1])
+if redis.call('DEL', KEYS[1]) == 0 then
+  return 0
+end
+local counter = spill_counter(KEYS[2])
+redis.call('RPUSH', KEYS[2], ARGV[1])
+redis.call('INCRBY', counter, tonumber(string.match(ARGV[1], '^(%d+)\t')))
+return 1
+"""
+)
+
+#: Claims the oldest spilled segment for refilling the queue list and leases the
+#: crawler's refilling list
+#: KEYS = [spilled, refilling, spill leases]
+#: ARGV = [lease time (ms)]
+#: Returns the segment record or false if there are no spilled segments
+REFILL_SCRIPT = RedisScript(
+    "redis.replicate_commands()\n"
+    + SPILL_FUNCTIONS
+    + """
+local counter = spill_counter(KEYS[1])
+local segment = redis.call('LPOP', KEYS[1])
+if segment then
+  redis.call('DECRBY', counter, tonumber(string.match(segment, '^(%d+)\t')))
+  redis.call('RPUSH', KEYS[2], segment)
+  redis.call('ZADD', KEYS[3], spill_time_ms() + tonumber(ARGV[1]), KEYS[2])
+end
+return segment
+"""
+)
+
+#: Appends the entries of the refilled segment to the queue list, unless the lease of
+#: the crawler's refilling list expired and the segment was returned to the spilled
+#: segments
+#: KEYS = [queue, refilling, spill leases]
+#: ARGV = [segment record, *entries]
+#: Returns 1 if the entries were appended, otherwise 0
+REFILL_COMMIT_SCRIPT = RedisScript(
+    """
+if redis.call('LREM', KEYS[2], 0, ARGV[1]) == 0 then
+  return 0
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+  redis.call('ZREM', KEYS[3], KEYS[2])
+end
+for i = 2, #ARGV, 1000 do
+  redis.call('RPUSH', KEYS[1], unpack(ARGV, i, math.min(i + 999, #ARGV)))
+end
+return 1
+"""
+)
+
+#: Returns the entries being spilled, and the segments being refilled, of the supplied
+#: spilling and refilling lists, those of a crawler that stopped part way through, and
+#: then of up to limit lists whose lease expired
+#: KEYS = [queue, spilled, spill leases]
+#: ARGV = [limit, *spilling or refilling lists]
+#: Returns the number of entries and segments returned
+SPILL_RECOVER_SCRIPT = RedisScript(
+    "redis.replicate_commands()\n"
+    + SPILL_FUNCTIONS
+    + """
+local returned = 0
+for i = 2, #ARGV do
+  returned = returned + spill_return(KEYS[1], KEYS[2], KEYS[3], ARGV[i])
+end
+local expired = redis.call('ZRANGEBYSCORE', KEYS[3], '-inf', spill_time_ms(), 'LIMIT', 0, tonumber(ARGV[1]))
+for _, key in ipairs(expired) do
+  returned = returned + spill_return(KEYS[1], KEYS[2], KEYS[3], key)
+end
+return returned
+"""
+)
+
+#: Functions shared by the scripts operating on the queue stream of the stream frontier.
+#: The first four KEYS of the scripts using them are [stream, queue, info, failed]
+#: and the first two ARGV are [consumer group, consumer].
+#:
+#: Entries are queued as the field e of the stream's messages and claimed by the
+#: crawlers, the group's consumers, using XREADGROUP. Completed entries are acknowledged
+#: and deleted from the stream. Entries whose consumer has not renewed them for the
+#: lease time are reclaimed by any live crawler using XAUTOCLAIM. Once an entry has been
+#: delivered more than max_retries + 1 times (info hash field, default 3) it is moved to
+#: the failed list instead. Entries pushed onto the queue list, e.g. seeds, are moved
+#: to the stream when the stream has no entries to deliver.
+STREAM_FUNCTIONS = """
+local STREAM = {
+  stream = KEYS[1],
+  list = KEYS[2],
+  info = KEYS[3],
+  failed = KEYS[4],
+  group = ARGV[1],
+  consumer = ARGV[2],
+}
+
+local function stream_ack(id)
+  redis.call('XACK', STREAM.stream, STREAM.group, id)
+  redis.call('XDEL', STREAM.stream, id)
+end
+
+local function stream_expire(id, idle_ms)
+  redis.call('XCLAIM', STREAM.stream, STREAM.group, STREAM.consumer, 0, id, 'IDLE', idle_ms, 'JUSTID')
+end
+
+local function stream_adopt(limit)
+  local adopted = 0
+  for i = 1, limit do
+    local entry = redis.call('LPOP', STREAM.list)
+    if not entry then
+      break
+    end
+    redis.call('XADD', STREAM.stream, '*', 'e', entry)
+    adopted = adopted + 1
+  end
+  return adopted
+end
+
+local function stream_read(count, claimed)
+  local read = redis.call('XREADGROUP', 'GROUP', STREAM.group, STREAM.consumer, 'COUNT', count, 'STREAMS', STREAM.stream, '>')
+  if not read then
+    return 0
+  end
+  for _, message in ipairs(read[1][2]) do
+    claimed[#claimed + 1] = message[1]
+    claimed[#claimed + 1] = message[2][2]
+  end
+  return #read[1][2]
+end
+
+local function stream_time_ms()
+  local time = redis.call('TIME')
+  return tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+end
+
+local function stream_promote_retries()
+  local retry_key = STREAM.list .. ':retry'
+  local now = stream_time_ms()
+  local due = redis.call('ZRANGEBYSCORE', retry_key, '-inf', now, 'LIMIT', 0, 100)
+  for _, member in ipairs(due) do
+    redis.call('ZREM', retry_key, member)
+    local retries, entry = string.match(member, '^(%d+)\t(.*)$')
+    redis.call('XADD', STREAM.stream, '*', 'e', entry, 'r', retries)
+  end
+  local next_retry = redis.call('ZRANGE', retry_key, 0, 0, 'WITHSCORES')
+  if #next_retry == 0 then
+    return -1
+  end
+  return math.max(tonumber(next_retry[2]) - now, 1)
+end
+"""
+
+#: Adds the not seen URLs to the queue stream, see ADMIT_SCRIPT
+#: KEYS = [stream, seen, referrers, referrer ids]
+#: ARGV = [seen encoding, page, *(seen member, entry)]
+#: Returns a list of 1 (added) or 0 (seen) for each (seen member, entry)
+STREAM_ADMIT_SCRIPT = RedisScript(
+    "redis.replicate_commands()\n"
+    + ADMIT_FUNCTIONS
+    + """
+local encoding = ARGV[1]
+local referrer = nil
+local added = {}
+for i = 3, #ARGV, 2 do
+  local was_added = mark_seen(encoding, KEYS[2], ARGV[i])
+  if was_added == 1 then
+    if referrer == nil then
+      referrer = intern_referrer(KEYS[3], KEYS[4], ARGV[2])
+    end
+    redis.call('XADD', KEYS[1], '*', 'e', referrer .. '\t' .. ARGV[i + 1])
+  end
+  added[#added + 1] = was_added
+end
+return added
+"""
+)
+
+#: Acknowledges the completed entries, then claims up to count entries, first reclaiming
+#: the entries not renewed for the lease time and then reading new entries. The due
+#: entries of the retry sorted set are added back to the stream before claiming
+#: KEYS = [*stream keys]
+#: ARGV = [group, consumer, count, lease time (ms), *completed entry ids]
+#: Returns [wait, *(entry id, entry)] where wait is -1 if no entries could be claimed,
+#: the number of milliseconds until the next retry is due if only retries are waiting,
+#: otherwise 0
+STREAM_CLAIM_SCRIPT = RedisScript(
+    "redis.replicate_commands()\n"
+    + STREAM_FUNCTIONS
+    + """
+for i = 5, #ARGV do
+  stream_ack(ARGV[i])
+end
+local count = tonumber(ARGV[3])
+local claimed = {}
+local retry_wait = -1
+if count > 0 then
+  retry_wait = stream_promote_retries()
+  local max_retries = tonumber(redis.call('HGET', STREAM.info, 'max_retries')) or 3
+  local reclaimed = redis.call('XAUTOCLAIM', STREAM.stream, STREAM.group, STREAM.consumer, ARGV[4], '0-0', 'COUNT', count)
+  for _, message in ipairs(reclaimed[2]) do
+    local id = message[1]
+    if not message[2] then
+      stream_ack(id)
+    else
+      local pending = redis.call('XPENDING', STREAM.stream, STREAM.group, id, id, 1)
+      local deliveries = pending[1] and tonumber(pending[1][4]) or 1
+      if deliveries > max_retries + 1 then
+        redis.call('RPUSH', STREAM.failed, message[2][2])
+        stream_ack(id)
+      else
+        claimed[#claimed + 1] = id
+        claimed[#claimed + 1] = message[2][2]
+      end
+    end
+  end
+  local remaining = count - #claimed / 2
+  if remaining > 0 then
+    remaining = remaining - stream_read(remaining, claimed)
+  end
+  if remaining > 0 and stream_adopt(remaining) > 0 then
+    stream_read(remaining, claimed)
+  end
+end
+if #claimed == 0 then
+  return {retry_wait}
+end
+table.insert(claimed, 1, 0)
+return claimed
+"""
+)
+
+#: Acknowledges the completed entries and makes the returned entries immediately
+#: reclaimable by any crawler
+#: KEYS = [*stream keys]
+#: ARGV = [group, consumer, lease time (ms), number of completed entries, *completed entry ids, *returned entry ids]
+#: Returns the number of entries returned
+STREAM_RELEASE_SCRIPT = RedisScript(
+    STREAM_FUNCTIONS
+    + """
+local num_completed = tonumber(ARGV[4])
+for i = 5, num_completed + 4 do
+  stream_ack(ARGV[i])
+end
+for i = num_completed + 5, #ARGV do
+  stream_expire(ARGV[i], ARGV[3])
+end
+return #ARGV - num_completed - 4
+"""
+)
+
+#: Acknowledges the supplied entry, whose navigation failed, and adds it to the retry
+#: sorted set, as (retries, entry), due after an exponential backoff counting a retry in
+#: the r field of the entry added back to the stream once due, see RETRY_SCRIPT. If the
+#: entry has been retried more than max_retries times it is moved to the failed list instead
+#: KEYS = [*stream keys]
+#: ARGV = [group, consumer, entry id, backoff (ms), max backoff (ms)]
+#: Returns the backoff (ms) if the entry will be retried, 0 if it failed or -1 if
+#: it was reclaimed by another crawler already
+STREAM_RETRY_SCRIPT = RedisScript(
+    "redis.replicate_commands()\n"
+    + STREAM_FUNCTIONS
+    + """
+local id = ARGV[3]
+local pending = redis.call('XPENDING', STREAM.stream, STREAM.group, id, id, 1)
+if not pending[1] or pending[1][2] ~= STREAM.consumer then
+  return -1
+end
+local message = redis.call('XRANGE', STREAM.stream, id, id)[1]
+stream_ack(id)
+if not message then
+  return -1
+end
+local entry = message[2][2]
+local retries = (tonumber(message[2][4]) or 0) + 1
+local max_retries = tonumber(redis.call('HGET', STREAM.info, 'max_retries')) or 3
+if retries > max_retries then
+  redis.call('RPUSH', STREAM.failed, entry)
+  return 0
+end
+local backoff = math.min(tonumber(ARGV[4]) * 2 ^ (retries - 1), tonumber(ARGV[5]))
+backoff = math.max(math.floor(backoff), 1)
+redis.call('ZADD', STREAM.list .. ':retry', stream_time_ms() + backoff, retries .. '\t' .. entry)
+return backoff
+"""
+)
+
+#: Makes the entries still claimed by the consumer, from a previous run of the crawler
+#: that did not release them, immediately reclaimable by any crawler
+#: KEYS = [*stream keys]
+#: ARGV = [group, consumer, lease time (ms)]
+#: Returns the number of entries returned
+STREAM_RECOVER_SCRIPT = RedisScript(
+    STREAM_FUNCTIONS
+    + """
+local returned = 0
+local start = '-'
+while true do
+  local pending = redis.call('XPENDING', STREAM.stream, STREAM.group, start, '+', 1000, STREAM.consumer)
+  for _, info in ipairs(pending) do
+    stream_expire(info[1], ARGV[3])
+  end
+  returned = returned + #pending
+  if #pending < 1000 then
+    break
+  end
+  start = '(' .. pending[#pending][1]
+end
+return returned
+"""
+)
+
+#: Renews the entries held by the consumer, resetting their idle time, unless
+#: they were reclaimed by another crawler
+#: KEYS = [*stream keys]
+#: ARGV = [group, consumer, *entry ids]
+#: Returns the number of entries renewed
+STREAM_RENEW_SCRIPT = RedisScript(
+    STREAM_FUNCTIONS
+    + """
+local renewed = 0
+for i = 3, #ARGV do
+  local pending = redis.call('XPENDING', STREAM.stream, STREAM.group, ARGV[i], ARGV[i], 1)
+  if pending[1] and pending[1][2] == STREAM.consumer then
+    redis.call('XCLAIM', STREAM.stream, STREAM.group, STREAM.consumer, 0, ARGV[i], 'JUSTID')
+    renewed = renewed + 1
+  end
+end
+return renewed
+"""
+)
+
+#: Deletes the consumers of other crawlers that hold no entries and have been idle for
+#: the lease time, the consumers of crawlers that stopped once their entries were
+#: reclaimed. A live crawler whose consumer is deleted is added back by its next read
+#: KEYS = [*stream keys]
+#: ARGV = [group, consumer, lease time (ms)]
+#: Returns the number of consumers deleted
+STREAM_REAP_SCRIPT = RedisScript(
+    STREAM_FUNCTIONS
+    + """
+local lease_time = tonumber(ARGV[3])
+local reaped = 0
+for _, consumer in ipairs(redis.call('XINFO', 'CONSUMERS', STREAM.stream, STREAM.group)) do
+  local info = {}
+  for i = 1, #consumer, 2 do
+    info[consumer[i]] = consumer[i + 1]
+  end
+  if info.name ~= STREAM.consumer and tonumber(info.pending) == 0 and tonumber(info.idle) >= lease_time then
+    redis.call('XGROUP', 'DELCONSUMER', STREAM.stream, STREAM.group, info.name)
+    reaped = reaped + 1
+  end
+end
+return reaped
+"""
+)
+
+#: Returns the number of entries of the queue stream not yet claimed plus the entries
+#: of the queue list waiting to be moved to the stream and the entries being retried
+#: KEYS = [*stream keys]
+#: ARGV = [group]
+STREAM_LEN_SCRIPT = RedisScript(
+    """
+local pending = redis.call('XPENDING', KEYS[1], ARGV[1])
+return redis.call('XLEN', KEYS[1]) - pending[1] + redis.call('LLEN', KEYS[2])
+  + redis.call('ZCARD', KEYS[2] .. ':retry')
+"""
+)
+
+#: Takes a token from a token bucket, the hash of the bucket's tokens and the time (ms)
+#: they were counted at, refilled at rate tokens per second up to burst tokens.
+#: When the bucket is empty the token is reserved, the bucket going into debt, so that
+#: concurrent takers wait for consecutive tokens and use them at the bucket's rate.
+#: KEYS = [bucket]
+#: ARGV = [rate (tokens per second), burst (maximum tokens)]
+#: Returns the time (ms) to wait before the token can be used, 0 if it can be used now
+TOKEN_BUCKET_SCRIPT = RedisScript(
+    """
+redis.replicate_commands()
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local counted_at = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(now - counted_at, 0) * rate / 1000) - 1
+redis.call('HMSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+local wait = 0
+if tokens < 0 then
+  wait = math.ceil(-tokens * 1000 / rate)
+end
+redis.call('PEXPIRE', KEYS[1], wait + math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+)
+
+#: Reserves the next navigation of a host backing off, the hash of the host's adaptive
+#: delay (ms), the time (ms) it is parked until, the time (ms) its next navigation may
+#: start at and its average latency (ms). When a navigation of the host is already
+#: waiting for its turn the host is treated as parked until the next turn, so that
+#: crawlers park its URLs rather than queue up behind it.
+#: KEYS = [host health]
+#: Returns the time (ms) to wait before navigating, 0 if the host can be navigated to
+#: now, or minus the time (ms) the host is parked for
+HOST_HEALTH_ACQUIRE_SCRIPT = RedisScript(
+    """
+redis.replicate_commands()
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local health = redis.call('HMGET', KEYS[1], 'delay', 'parked', 'next')
+local parked = tonumber(health[2]) or 0
+if parked > now then
+  return now - parked
+end
+local delay = tonumber(health[1]) or 0
+if delay <= 0 then
+  return 0
+end
+local start = math.max(now, tonumber(health[3]) or 0)
+if start - now > delay then
+  return now - start
+end
+redis.call('HSET', KEYS[1], 'next', start + delay)
+return start - now
+"""
+)
+
+#: Records the outcome of a navigation of a host, doubling the host's delay, from at
+#: least the base delay, and parking the host for the larger of its delay and the
+#: response's Retry-After when it was throttled, increasing its delay by half when its
+#: average latency exceeds the slow latency, otherwise decreasing its delay by a
+#: quarter, clearing it once below the base delay.
+#: KEYS = [host health]
+#: ARGV = [throttled (1 or 0), latency (ms, 0 if unknown), retry after (ms), base
+#:         delay (ms), max delay (ms), slow latency (ms), state ttl (ms)]
+#: Returns the host's delay (ms)
+HOST_HEALTH_RECORD_SCRIPT = RedisScript(
+    """
+redis.replicate_commands()
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local base, max_delay = tonumber(ARGV[4]), tonumber(ARGV[5])
+local health = redis.call('HMGET', KEYS[1], 'delay', 'latency')
+local delay = tonumber(health[1]) or 0
+local latency = tonumber(health[2])
+local sample = tonumber(ARGV[2])
+if sample > 0 then
+  if latency then
+    latency = math.floor(latency * 0.7 + sample * 0.3)
+  else
+    latency = sample
+  end
+  redis.call('HSET', KEYS[1], 'latency', latency)
+end
+if ARGV[1] == '1' then
+  delay = math.min(math.max(delay * 2, base), max_delay)
+  local park = math.min(math.max(tonumber(ARGV[3]), delay), max_delay)
+  redis.call('HSET', KEYS[1], 'parked', now + park)
+elseif latency and latency > tonumber(ARGV[6]) then
+  delay = math.min(math.max(math.floor(delay * 1.5), base), max_delay)
+else
+  delay = math.floor(delay * 0.75)
+  if delay < base then
+    delay = 0
+  end
+end
+redis.call('HSET', KEYS[1], 'delay', delay)
+redis.call('PEXPIRE', KEYS[1], ARGV[7])
+return delay
+"""
+)
@@ -0,0 +1,216 @@
+import gzip
+import io
+import sys
+from asyncio import FIRST_COMPLETED, Future, gather, wait
+from itertools import islice
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Set, cast
+
+import attr
+
+from autobrowser.util import AutoLogger, Helper, create_autologger
+from .captures import canonical_url
+from .entry import QueueEntry
+from .redis import RedisFrontier
+
+__all__ = ["SeedImportStats", "admit_seed_batch", "import_seeds", "read_seed_urls"]
+
+#: The first bytes of a gzip compressed file
+GZIP_MAGIC: bytes = b"\x1f\x8b"
+
+
+def read_seed_urls(path: str) -> Iterator[str]:
+    """Yields the URLs of the supplied seed file, one URL per line, skipping blank
+    lines and lines starting with `#`. The file is read from stdin if the path is `-`
+    and is decompressed if it is gzip compressed.
+
+    :param path: The path of the seed file or `-`
+    :return: An iterator of the file's URLs
+    """
+    raw: io.BufferedReader
+    if path == "-":
+        raw = cast(io.BufferedReader, sys.stdin.buffer)
+    else:
+        raw = open(path, "rb")
+    try:
+        binary: BinaryIO = raw
+        if raw.peek(2)[:2] == GZIP_MAGIC:
+            binary = cast(BinaryIO, gzip.GzipFile(fileobj=raw, mode="rb"))
+        for line in io.TextIOWrapper(binary, encoding="utf-8", errors="replace"):
+            url = line.strip()
+            if url and not url.startswith("#"):
+                yield url
+    finally:
+        if raw is not sys.stdin.buffer:
+            raw.close()
+
+
+@attr.dataclass(slots=True)
+class SeedImportStats:
+    """The counters of a seed import"""
+
+    #: The number of URLs read
+    read: int = attr.ib(default=0)
+    #: The number of URLs added to the frontier
+    added: int = attr.ib(default=0)
+    #: The number of URLs already seen, including duplicates of the same batch
+    seen: int = attr.ib(default=0)
+    #: The number of URLs not in the automation's scope
+    not_in_scope: int = attr.ib(default=0)
+    #: The number of URLs that are not http(s) URLs once canonicalized
+    invalid: int = attr.ib(default=0)
+    #: The number of URLs disallowed by their host's robots.txt, see SitemapFeeder
+    disallowed: int = attr.ib(default=0)
+
+    def rate(self, elapsed: float) -> float:
+        """Returns the number of URLs read per second
+
+        :param elapsed: The number of seconds the import has run for
+        :return: The import rate
+        """
+        return self.read / elapsed if elapsed > 0 else 0.0
+
+    def progress(self, elapsed: float) -> str:
+        """Returns the import's progress as a JSON string
+
+        :param elapsed: The number of seconds the import has run for
+        :return: The import's progress
+        """
+        return Helper.json_string(
+            read=self.read,
+            added=self.added,
+            seen=self.seen,
+            not_in_scope=self.not_in_scope,
+            invalid=self.invalid,
+            disallowed=self.disallowed,
+            elapsed=round(elapsed, 2),
+            rate=round(self.rate(elapsed), 2),
+        )
+
+
+def _batches(urls: Iterable[str], batch_size: int) -> Iterator[List[str]]:
+    """Yields the supplied URLs in lists of at most batch_size URLs
+
+    :param urls: The URLs to be batched
+    :param batch_size: The maximum number of URLs per batch
+    :return: An iterator of the batches
+    """
+    it = iter(urls)
+    while 1:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+async def admit_seed_batch(
+    frontier: RedisFrontier,
+    batch: List[str],
+    stats: SeedImportStats,
+    canonicalize: bool = True,
+    depth: int = 0,
+) -> None:
+    """Admits the supplied batch of seeds to the frontier, sending the seeds of each
+    shard in a single round trip
+
+    :param frontier: The loaded frontier of the automation
+    :param batch: The seeds
+    :param stats: The counters of the import
+    :param canonicalize: Should the seeds be canonicalized
+    :param depth: The depth the seeds are to be crawled at
+    """
+    in_scope = frontier.scope.in_scope
+    shard_of = frontier.shard_map.shard_for_url
+    priority = frontier.order.priority
+    host_of = frontier.politeness.host
+    encode_entry = QueueEntry.encode_unreferred
+    candidates: Dict[int, List[str]] = {}
+    unique: Dict[str, None] = {}
+    for url in batch:
+        if canonicalize:
+            url = canonical_url(url)
+        if not url.startswith(("http://", "https://")):
+            stats.invalid += 1
+        elif url in unique:
+            stats.seen += 1
+        else:
+            unique[url] = None
+    for url in unique:
+        if not in_scope(url):
+            stats.not_in_scope += 1
+            continue
+        host = host_of(url)
+        shard = shard_of(url)
+        if shard not in candidates:
+            candidates[shard] = []
+        candidates[shard].append(frontier.shards[shard].seen.member(url))
+        candidates[shard].append(
+            encode_entry(
+                url, depth, priority(url, depth) if host is None else None, host
+            )
+        )
+    if not candidates:
+        return
+    shards = list(candidates)
+    was_added = await gather(
+        *[
+            frontier.admit_to_shard(frontier.shards[shard], "", candidates[shard])
+            for shard in shards
+        ],
+        loop=frontier.loop,
+    )
+    for shard_was_added in was_added:
+        num_added = sum(1 for added in shard_was_added if added == 1)
+        stats.added += num_added
+        stats.seen += len(shard_was_added) - num_added
+    await frontier.balance_spilled()
+
+
+async def import_seeds(
+    frontier: RedisFrontier,
+    urls: Iterable[str],
+    batch_size: int = 10_000,
+    concurrency: int = 4,
+    progress_interval: float = 10,
+    canonicalize: bool = True,
+) -> SeedImportStats:
+    """Imports the supplied seeds into the automation's frontier at depth 0.
+
+    The seeds are canonicalized, deduplicated and checked against the automation's
+    scope locally and then added to the queues and seen sets of the frontier's shards
+    in batches of batch_size seeds, each batch a single round trip per shard, with up
+    to concurrency batches in flight. The seen test and queue push are done by the
+    frontier's admission script, so seeds already seen are not queued again.
+
+    :param frontier: The frontier of the automation, loaded using RedisFrontier.load
+    :param urls: The seeds to be imported, see read_seed_urls
+    :param batch_size: The number of seeds per batch
+    :param concurrency: The maximum number of batches in flight
+    :param progress_interval: How often, in seconds, the progress is logged
+    :param canonicalize: Should the seeds be canonicalized before being imported
+    :return: The counters of the import
+    """
+    logger: AutoLogger = create_autologger("frontier", "import_seeds")
+    loop = frontier.loop
+    stats = SeedImportStats()
+    started = loop.time()
+    next_progress = started + progress_interval
+    in_flight: Set[Future] = set()
+    for batch in _batches(urls, max(batch_size, 1)):
+        stats.read += len(batch)
+        if len(in_flight) >= max(concurrency, 1):
+            done, in_flight = await wait(
+                in_flight, loop=loop, return_when=FIRST_COMPLETED
+            )
+            for task in done:
+                task.result()
+        in_flight.add(
+            loop.create_task(admit_seed_batch(frontier, batch, stats, canonicalize))
+        )
+        now = loop.time()
+        if now >= next_progress:
+            logger.info("import_seeds", f"progress - {stats.progress(now - started)}")
+            next_progress = now + progress_interval
+    if in_flight:
+        await gather(*in_flight, loop=loop)
+    logger.info("import_seeds", f"finished - {stats.progress(loop.time() - started)}")
+    return stats
@@ -0,0 +1,269 @@
+from hashlib import blake2b
+from typing import Any, Awaitable, Dict, Type
+
+from aioredis import Redis, ReplyError
+
+from autobrowser.automation import RedisKeys
+from autobrowser.util import AutoLogger, create_autologger
+
+__all__ = [
+    "BloomSeenSet",
+    "FingerprintSeenSet",
+    "SEEN_ENCODINGS",
+    "SeenSet",
+    "load_seen_set",
+    "migrate_seen_set",
+]
+
+SEEN_ENCODING_FIELD: str = "seen_encoding"
+BLOOM_ERROR_RATE_FIELD: str = "seen_bloom_error_rate"
+BLOOM_CAPACITY_FIELD: str = "seen_bloom_capacity"
+
+#: The number of sets the fingerprints are distributed over. Keeping the number
+#: of fingerprints per set below set-max-intset-entries (512 by default) allows
+#: redis to store each fingerprint as a 64bit integer rather than a string
+FINGERPRINT_BUCKETS: int = 1 << 16
+
+
+def url_fingerprint(url: str) -> int:
+    """Returns the signed 64bit fingerprint of the supplied URL
+
+    :param url: The URL to be fingerprinted
+    :return: The URL's fingerprint
+    """
+    return int.from_bytes(
+        blake2b(url.encode("utf-8"), digest_size=8).digest(), "big", signed=True
+    )
+
+
+class SeenSet:
+    """The seen set of an automation, stored as a redis set of full URLs.
+
+    Subclasses change how seen URLs are encoded, the encoding of the seen set
+    is used by the frontier's admission script via encoding, key and member.
+    """
+
+    __slots__ = ["__weakref__", "key", "logger", "redis"]
+
+    encoding: str = "plain"
+
+    def __init__(self, redis: Redis, keys: RedisKeys, **options: Any) -> None:
+        """Initialize the new instance of SeenSet
+
+        :param redis: The redis instance to be used
+        :param keys: The redis keys class containing the keys for the automation
+        :param options: Encoding specific options
+        """
+        self.redis: Redis = redis
+        self.key: str = self.key_for(keys)
+        self.logger: AutoLogger = create_autologger("frontier", self.__class__.__name__)
+
+    @classmethod
+    def key_for(cls, keys: RedisKeys) -> str:
+        """Returns the key of the seen set for the automation
+
+        :param keys: The redis keys class containing the keys for the automation
+        :return: The key of the seen set
+        """
+        return keys.seen
+
+    async def init(self) -> None:
+        """Initialize the seen set"""
+        pass
+
+    def member(self, url: str) -> str:
+        """Returns the value recorded in the seen set for the supplied URL
+
+        :param url: The URL to be recorded
+        :return: The encoded URL
+        """
+        return url
+
+    async def add(self, url: str) -> bool:
+        """Marks the supplied URL as seen
+
+        :param url: The URL to be marked as seen
+        :return: T/F indicating if the URL was not seen before
+        """
+        return await self.add_to(self.redis, url) == 1
+
+    def add_to(self, redis: Any, url: str) -> Awaitable[Any]:
+        """Issues the command that marks the supplied URL as seen using
+        the supplied redis instance, pipeline or transaction
+
+        :param redis: The redis instance, pipeline or transaction to use
+        :param url: The URL to be marked as seen
+        :return: An awaitable resolving to 1 if the URL was not seen before otherwise 0
+        """
+        return redis.sadd(self.key, url)
+
+    async def contains(self, url: str) -> bool:
+        """Returns T/F indicating if the supplied URL has been seen
+
+        :param url: The URL to be tested
+        :return: T/F indicating if the URL was seen
+        """
+        return await self.redis.sismember(self.key, url) == 1
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}(key={self.key})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class FingerprintSeenSet(SeenSet):
+    """Seen set storing exact 64bit URL fingerprints distributed
+    over FINGERPRINT_BUCKETS integer sets"""
+
+    __slots__ = []
+
+    encoding: str = "fingerprint"
+
+    @classmethod
+    def key_for(cls, keys: RedisKeys) -> str:
+        return keys.seen_fingerprints
+
+    def member(self, url: str) -> str:
+        """Returns the fingerprint bucket and fingerprint of the supplied URL
+        as `bucket:fingerprint`
+
+        :param url: The URL to be recorded
+        :return: The encoded URL
+        """
+        fingerprint = url_fingerprint(url)
+        return f"{fingerprint % FINGERPRINT_BUCKETS}:{fingerprint}"
+
+    def add_to(self, redis: Any, url: str) -> Awaitable[Any]:
+        fingerprint = url_fingerprint(url)
+        return redis.sadd(f"{self.key}:{fingerprint % FINGERPRINT_BUCKETS}", fingerprint)
+
+    async def contains(self, url: str) -> bool:
+        fingerprint = url_fingerprint(url)
+        is_member = await self.redis.sismember(
+            f"{self.key}:{fingerprint % FINGERPRINT_BUCKETS}", fingerprint
+        )
+        return is_member == 1
+
+
+class BloomSeenSet(SeenSet):
+    """Seen set using a scalable bloom filter (requires the RedisBloom module).
+
+    Options:
+      - error_rate: the false positive rate of the filter, defaults to 0.001
+      - capacity: the number of URLs the first sub-filter is sized for, defaults to 1,000,000
+    """
+
+    __slots__ = ["capacity", "error_rate"]
+
+    encoding: str = "bloom"
+
+    def __init__(self, redis: Redis, keys: RedisKeys, **options: Any) -> None:
+        super().__init__(redis, keys)
+        self.error_rate: float = float(options.get("error_rate") or 0.001)
+        self.capacity: int = int(options.get("capacity") or 1_000_000)
+
+    @classmethod
+    def key_for(cls, keys: RedisKeys) -> str:
+        return keys.seen_bloom
+
+    async def init(self) -> None:
+        """Creates the bloom filter if it does not exist"""
+        try:
+            await self.redis.execute(
+                "BF.RESERVE", self.key, self.error_rate, self.capacity
+            )
+        except ReplyError as e:
+            if "exists" not in str(e):
+                raise
+        self.logger.info(
+            "init",
+            f"initialized <error_rate={self.error_rate}, capacity={self.capacity}>",
+        )
+
+    def add_to(self, redis: Any, url: str) -> Awaitable[Any]:
+        return redis.execute("BF.ADD", self.key, url)
+
+    async def contains(self, url: str) -> bool:
+        return await self.redis.execute("BF.EXISTS", self.key, url) == 1
+
+
+SEEN_ENCODINGS: Dict[str, Type[SeenSet]] = {
+    SeenSet.encoding: SeenSet,
+    FingerprintSeenSet.encoding: FingerprintSeenSet,
+    BloomSeenSet.encoding: BloomSeenSet,
+}
+
+
+async def load_seen_set(redis: Redis, keys: RedisKeys) -> SeenSet:
+    """Creates and initializes the seen set for the automation using
+    the encoding set in the automation's info hash (defaults to plain)
+
+    :param redis: The redis instance to be used
+    :param keys: The redis keys class containing the keys for the automation
+    :return: The initialized seen set
+    """
+    encoding, error_rate, capacity = await redis.hmget(
+        keys.info, SEEN_ENCODING_FIELD, BLOOM_ERROR_RATE_FIELD, BLOOM_CAPACITY_FIELD
+    )
+    seen_set_class = SEEN_ENCODINGS.get(encoding or SeenSet.encoding)
+    if seen_set_class is None:
+        raise ValueError(f"Unknown seen set encoding '{encoding}'")
+    seen_set = seen_set_class(redis, keys, error_rate=error_rate, capacity=capacity)
+    await seen_set.init()
+    return seen_set
+
+
+async def migrate_seen_set(
+    redis: Redis,
+    keys: RedisKeys,
+    encoding: str,
+    batch_size: int = 10_000,
+    delete_plain: bool = False,
+    **options: Any,
+) -> int:
+    """Converts the automation's plain seen set to the supplied encoding and
+    sets the automation's seen encoding to it.
+
+    The plain seen set is scanned in batches of batch_size with each batch added
+    to the new seen set using a single pipeline. This should be done while the
+    automation is not running.
+
+    :param redis: The redis instance to be used
+    :param keys: The redis keys class containing the keys for the automation
+    :param encoding: The encoding the seen set is to be converted to
+    :param batch_size: The number of URLs to be converted per round trip
+    :param delete_plain: Should the plain seen set be deleted once converted
+    :param options: Encoding specific options
+    :return: The number of URLs converted
+    """
+    seen_set_class = SEEN_ENCODINGS.get(encoding)
+    if seen_set_class is None:
+        raise ValueError(f"Unknown seen set encoding '{encoding}'")
+    seen_set = seen_set_class(redis, keys, **options)
+    await seen_set.init()
+    num_converted = 0
+    if seen_set.key != keys.seen:
+        add_to = seen_set.add_to
+        cursor = 0
+        while 1:
+            cursor, urls = await redis.sscan(keys.seen, cursor=cursor, count=batch_size)
+            if urls:
+                pipeline = redis.pipeline()
+                for url in urls:
+                    add_to(pipeline, url)
+                await pipeline.execute()
+                num_converted += len(urls)
+                seen_set.logger.info(
+                    "migrate_seen_set", f"converted {num_converted} URLs"
+                )
+            if not cursor:
+                break
+    info: Dict[str, Any] = {SEEN_ENCODING_FIELD: encoding}
+    if isinstance(seen_set, BloomSeenSet):
+        info[BLOOM_ERROR_RATE_FIELD] = seen_set.error_rate
+        info[BLOOM_CAPACITY_FIELD] = seen_set.capacity
+    await redis.hmset_dict(keys.info, info)
+    if delete_plain and seen_set.key != keys.seen:
+        await redis.delete(keys.seen)
+    return num_converted
@@ -0,0 +1,188 @@
+from asyncio import AbstractEventLoop
+from hashlib import blake2b
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import attr
+from aioredis import Redis, create_redis_pool
+
+from autobrowser.automation import AutomationConfig, RedisKeys
+from autobrowser.util import Helper
+from .seen import SeenSet
+from .spill import QueueSpiller
+
+__all__ = [
+    "FrontierShard",
+    "ShardMap",
+    "close_shard_pools",
+    "create_frontier_shards",
+]
+
+
+def _shard_weight(shard: int, value: str) -> bytes:
+    """Returns the rendezvous hashing weight of the supplied value for the supplied shard
+
+    :param shard: The index of the shard
+    :param value: The value being mapped to a shard
+    :return: The weight of the value for the shard
+    """
+    return blake2b(f"{shard}\t{value}".encode("utf-8"), digest_size=8).digest()
+
+
+@attr.dataclass(slots=True)
+class ShardMap:
+    """Maps the hosts of URLs and crawlers to frontier shards.
+
+    Rendezvous hashing is used so that the mapping is consistent, when a shard
+    is appended only the hosts now mapped to it move.
+    """
+
+    num_shards: int = attr.ib(default=1)
+    _hosts: Dict[str, int] = attr.ib(init=False, factory=dict, repr=False)
+
+    @property
+    def sharded(self) -> bool:
+        """Returns T/F indicating if there is more than one shard"""
+        return self.num_shards > 1
+
+    def shard_for(self, value: str) -> int:
+        """Returns the shard the supplied value, a host or crawler id, maps to
+
+        :param value: The value being mapped to a shard
+        :return: The index of the shard
+        """
+        if self.num_shards == 1:
+            return 0
+        return max(
+            range(self.num_shards), key=lambda shard: _shard_weight(shard, value)
+        )
+
+    def shard_for_url(self, url: str) -> int:
+        """Returns the shard the supplied URL is queued and seen in, which is
+        the shard of its host
+
+        :param url: The URL being mapped to a shard
+        :return: The index of the shard
+        """
+        if self.num_shards == 1:
+            return 0
+        host = urlsplit(url).hostname or ""
+        shard = self._hosts.get(host)
+        if shard is None:
+            shard = self._hosts[host] = self.shard_for(host)
+        return shard
+
+
+class FrontierShard:
+    """The redis instance, keys and seen set of one shard of an automation's frontier"""
+
+    __slots__ = [
+        "__weakref__",
+        "completed",
+        "index",
+        "keys",
+        "lease_script_keys",
+        "queue_keys",
+        "redis",
+        "seen",
+        "spiller",
+    ]
+
+    def __init__(
+        self, index: int, redis: Redis, keys: RedisKeys, crawler_id: str
+    ) -> None:
+        """Initialize the new instance of FrontierShard
+
+        :param index: The index of the shard
+        :param redis: The redis instance of the shard
+        :param keys: The redis keys of the shard
+        :param crawler_id: The id of the crawler using the shard
+        """
+        self.index: int = index
+        self.redis: Redis = redis
+        self.keys: RedisKeys = keys
+        self.seen: SeenSet = SeenSet(self.redis, self.keys)
+        #: The completed but not yet removed from the pending set entries claimed from the shard
+        self.completed: List[str] = []
+        #: The spiller of the shard's queue, if the frontier spills its queues to disk
+        self.spiller: Optional[QueueSpiller] = None
+        self.queue_keys: List[str] = [
+            keys.queue,
+            keys.queue_buckets,
+            keys.queue_hosts,
+            keys.queue_host_state,
+            keys.info,
+        ]
+        #: The keys of the frontier's scripts using leases, the queue keys and lease keys
+        self.lease_script_keys: List[str] = [
+            *self.queue_keys,
+            keys.pending,
+            keys.pending_leases,
+            keys.leased_by(crawler_id),
+            keys.pending_retries,
+            keys.failed,
+        ]
+
+    def __str__(self) -> str:
+        return f"FrontierShard(index={self.index}, prefix={self.keys.autoid})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+#: The redis instances of the additional frontier shards, by URL, shared by the tabs of the process
+_SHARD_POOLS: Dict[str, Redis] = {}
+
+
+async def shard_redis(url: str, loop: AbstractEventLoop) -> Redis:
+    """Returns the redis instance for the supplied shard URL, creating it
+    if it does not exist
+
+    :param url: The redis URL of the shard
+    :param loop: The event loop used by the automation
+    :return: The redis instance of the shard
+    """
+    redis = _SHARD_POOLS.get(url)
+    if redis is None:
+        redis = _SHARD_POOLS[url] = await create_redis_pool(
+            url, loop=loop, encoding="utf-8"
+        )
+    return redis
+
+
+async def create_frontier_shards(
+    redis: Redis,
+    config: AutomationConfig,
+    crawler_id: str,
+    loop: Optional[AbstractEventLoop] = None,
+) -> List[FrontierShard]:
+    """Creates the shards of the automation's frontier, the first shard
+    uses the supplied redis instance
+
+    :param redis: The redis instance of the first shard
+    :param config: The automation config
+    :param crawler_id: The id of the crawler using the shards
+    :param loop: The event loop used by the automation
+    :return: The list of the frontier's shards
+    """
+    loop = Helper.ensure_loop(loop)
+    shards = [FrontierShard(0, redis, config.redis_keys, crawler_id)]
+    for index in range(1, config.num_frontier_shards):
+        shards.append(
+            FrontierShard(
+                index,
+                await shard_redis(config.frontier_shard_url(index), loop),
+                RedisKeys(config, shard=index),
+                crawler_id,
+            )
+        )
+    return shards
+
+
+async def close_shard_pools() -> None:
+    """Closes the redis instances of the additional frontier shards"""
+    pools = list(_SHARD_POOLS.values())
+    _SHARD_POOLS.clear()
+    for redis in pools:
+        redis.close()
+        await Helper.no_raise_await(redis.wait_closed())
@@ -0,0 +1,377 @@
+import math
+import time
+import zlib
+from asyncio import AbstractEventLoop
+from collections import deque
+from typing import AsyncIterator, Deque, Dict, List, Optional, Set, Tuple
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+from aiohttp import ClientResponse, ClientSession, ClientTimeout
+from aioredis import Redis
+
+from autobrowser.automation import AutomationConfig
+from autobrowser.util import AutoLogger, Helper, create_autologger
+from .redis import RedisFrontier
+from .robots import RobotsStore, robots_store, url_origin
+from .seeding import SeedImportStats, admit_seed_batch
+
+__all__ = ["SitemapFeeder", "iter_sitemap", "sitemap_feeder"]
+
+#: The maximum number of bytes of a sitemap, once decompressed, that are parsed
+SITEMAP_MAX_BYTES: int = 50 * 1024 * 1024
+#: The maximum nesting of sitemap indexes followed
+SITEMAP_MAX_NESTING: int = 3
+#: The maximum number of sitemaps fetched per origin
+SITEMAP_MAX_FILES: int = 1000
+#: The number of URLs of a sitemap admitted to the frontier per batch
+SITEMAP_BATCH_SIZE: int = 1000
+#: The number of bytes read from a sitemap response at a time
+SITEMAP_CHUNK_SIZE: int = 64 * 1024
+#: How long, in seconds, a crawler feeding an origin holds it, which is also how long
+#: feeding an origin whose sitemaps could not be fetched is backed off for
+SITEMAP_FEED_LEASE: int = 30 * 60
+
+_GZIP_MAGIC: bytes = b"\x1f\x8b"
+_UTF8_BOM: bytes = b"\xef\xbb\xbf"
+#: Sitemaps declaring entities or a doctype are not parsed, guarding against entity
+#: expansion attacks
+_FORBIDDEN_XML: Tuple[bytes, ...] = (b"<!ENTITY", b"<!DOCTYPE")
+
+
+def _local_name(tag: str) -> str:
+    """Returns the supplied element tag without its namespace
+
+    :param tag: The element tag
+    :return: The local name of the tag
+    """
+    return tag.rsplit("}", 1)[-1]
+
+
+async def _iter_data(
+    response: ClientResponse, url: str, logger: AutoLogger
+) -> AsyncIterator[bytes]:
+    """Reads the body of the supplied sitemap response, decompressing it if it is
+    gzip compressed and removing any UTF-8 byte order mark, until it ends or
+    SITEMAP_MAX_BYTES were read
+
+    :param response: The response of the sitemap
+    :param url: The URL of the sitemap
+    :param logger: The logger used to log a sitemap that is too large
+    :return: An async iterator of the chunks of the decompressed body
+    """
+    decompressor = None
+    num_bytes = 0
+    async for chunk in response.content.iter_chunked(SITEMAP_CHUNK_SIZE):
+        if decompressor is None and num_bytes == 0 and chunk[:2] == _GZIP_MAGIC:
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data = decompressor.decompress(chunk) if decompressor is not None else chunk
+        if num_bytes == 0 and data.startswith(_UTF8_BOM):
+            data = data[len(_UTF8_BOM) :]
+        num_bytes += len(data)
+        if num_bytes > SITEMAP_MAX_BYTES:
+            logger.info("iter_sitemap", f"{url} is too large, parsed it partially")
+            return
+        yield data
+
+
+async def _prepend(first: bytes, rest: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Yields the supplied chunk followed by the chunks of the supplied iterator
+
+    :param first: The first chunk
+    :param rest: The remaining chunks
+    :return: An async iterator of the chunks
+    """
+    yield first
+    async for data in rest:
+        yield data
+
+
+async def _iter_text_locations(
+    chunks: AsyncIterator[bytes]
+) -> AsyncIterator[Tuple[str, bool]]:
+    """Parses the locations of a plain text sitemap, one per line
+
+    :param chunks: The chunks of the sitemap
+    :return: An async iterator of (location, False)
+    """
+    partial_line = b""
+    async for data in chunks:
+        lines = (partial_line + data).split(b"\n")
+        partial_line = lines.pop()
+        for line in lines:
+            location = line.strip().decode("utf-8", errors="replace")
+            if location:
+                yield location, False
+    if partial_line.strip():
+        yield partial_line.strip().decode("utf-8", errors="replace"), False
+
+
+async def _iter_xml_locations(
+    chunks: AsyncIterator[bytes], url: str, logger: AutoLogger
+) -> AsyncIterator[Tuple[str, bool]]:
+    """Incrementally parses the locations of an XML sitemap or sitemap index,
+    refusing sitemaps that declare entities or a doctype
+
+    :param chunks: The chunks of the sitemap
+    :param url: The URL of the sitemap
+    :param logger: The logger used to log parse failures
+    :return: An async iterator of (location, T/F indicating if the location is a sitemap)
+    """
+    logged_method = "iter_sitemap"
+    parser = XMLPullParser(events=("start", "end"))
+    root: Optional[Element] = None
+    container: Optional[str] = None
+    tail = b""
+    async for data in chunks:
+        if any(forbidden in tail + data for forbidden in _FORBIDDEN_XML):
+            logger.info(logged_method, f"{url} declares entities, not parsing it")
+            return
+        tail = data[-16:]
+        try:
+            parser.feed(data)
+            for event, element in parser.read_events():
+                name = _local_name(element.tag)
+                if event == "start":
+                    if root is None:
+                        root = element
+                    elif name in ("url", "sitemap"):
+                        container = name
+                elif name == "loc" and container is not None:
+                    location = (element.text or "").strip()
+                    if location:
+                        yield location, container == "sitemap"
+                elif name in ("url", "sitemap"):
+                    container = None
+                    # drop the parsed entries so memory use stays constant
+                    root.clear()
+        except ParseError as e:
+            logger.info(logged_method, f"parsing {url} failed - {e}")
+            return
+
+
+async def iter_sitemap(
+    session: ClientSession, url: str, logger: AutoLogger
+) -> AsyncIterator[Tuple[str, bool]]:
+    """Fetches and incrementally parses the supplied sitemap, yielding its locations
+    as they are parsed. XML sitemaps and sitemap indexes, plain text sitemaps and gzip
+    compressed sitemaps are supported.
+
+    :param session: The HTTP session the sitemap is fetched using
+    :param url: The URL of the sitemap
+    :param logger: The logger used to log fetch and parse failures
+    :return: An async iterator of (location, T/F indicating if the location is a sitemap)
+    :raises ClientResponseError: If the sitemap could not be fetched due to a server error
+    """
+    async with session.get(url, timeout=ClientTimeout(total=300)) as response:
+        if response.status >= 500:
+            response.raise_for_status()
+        if response.status != 200:
+            logger.info(
+                "iter_sitemap", f"fetching {url} failed with status {response.status}"
+            )
+            return
+        chunks = _iter_data(response, url, logger)
+        async for data in chunks:
+            if data.lstrip():
+                break
+        else:
+            return
+        if data.lstrip().startswith(b"<"):
+            locations = _iter_xml_locations(_prepend(data, chunks), url, logger)
+        else:
+            locations = _iter_text_locations(_prepend(data, chunks))
+        async for location in locations:
+            yield location
+
+
+class SitemapFeeder:
+    """Feeds the URLs listed by the sitemaps of the origins crawled by an automation
+    to its frontier, so that sites publishing sitemaps are discovered without
+    rendering their hub pages.
+
+    The sitemaps of an origin are those listed by its robots.txt, or /sitemap.xml if
+    it lists none, and the sitemaps of the sitemap indexes among them. Each sitemap is
+    fetched and parsed incrementally and its URLs of the same origin allowed by the
+    origin's robots.txt are admitted to the frontier in batches, through the frontier's
+    scope and seen set. Each origin is fed once per automation: the crawler feeding an
+    origin holds it by the key a:{autoid}:sitemaps:feeding:{origin}, which expires
+    after SITEMAP_FEED_LEASE seconds, and the origins fed are recorded in the hash
+    a:{autoid}:sitemaps once their sitemaps were fetched, so that an origin whose
+    sitemaps could not be fetched, or whose crawler died feeding it, is fed again
+    once the key expired.
+    """
+
+    __slots__ = [
+        "__weakref__",
+        "_fed",
+        "frontier",
+        "key",
+        "logger",
+        "loop",
+        "max_urls",
+        "redis",
+        "robots",
+        "session",
+    ]
+
+    def __init__(
+        self,
+        frontier: RedisFrontier,
+        session: ClientSession,
+        robots: RobotsStore,
+        max_urls: int = 100_000,
+        loop: Optional[AbstractEventLoop] = None,
+    ) -> None:
+        """Initialize the new instance of SitemapFeeder
+
+        :param frontier: The frontier of the automation
+        :param session: The HTTP session sitemaps are fetched using
+        :param robots: The robots store of the automation
+        :param max_urls: The maximum number of URLs read from the sitemaps of an origin
+        :param loop: The event loop used by the automation
+        """
+        self.frontier: RedisFrontier = frontier
+        self.redis: Redis = frontier.redis
+        self.key: str = frontier.keys.sitemaps
+        self.session: ClientSession = session
+        self.robots: RobotsStore = robots
+        self.max_urls: int = max(max_urls, 0)
+        self.loop: AbstractEventLoop = Helper.ensure_loop(loop)
+        self.logger: AutoLogger = create_autologger("frontier", "SitemapFeeder")
+        #: origin -> the time of the event loop the origin is not fed before, infinite
+        #: for the origins that were fed
+        self._fed: Dict[str, float] = {}
+
+    def should_feed(self, url: str) -> bool:
+        """Returns T/F indicating if the origin of the supplied URL has not been fed
+        by this feeder
+
+        :param url: The URL of a crawled page
+        :return: T/F indicating if the URL's origin may need to be fed
+        """
+        return (
+            url.startswith(("http://", "https://"))
+            and self._fed.get(url_origin(url), 0) <= self.loop.time()
+        )
+
+    async def feed(self, url: str, depth: int) -> Optional[SeedImportStats]:
+        """Feeds the URLs of the sitemaps of the supplied URL's origin to the frontier,
+        unless the origin has been fed by any crawler of the automation
+
+        :param url: The URL of a crawled page
+        :param depth: The depth the URLs are to be crawled at
+        :return: The counters of the URLs fed or None if the origin was fed already
+        or is being fed
+        """
+        origin = url_origin(url)
+        if not self.should_feed(origin):
+            return None
+        self._fed[origin] = self.loop.time() + SITEMAP_FEED_LEASE
+        if await self.redis.hexists(self.key, origin):
+            self._fed[origin] = math.inf
+            return None
+        feeding_key = f"{self.key}:feeding:{origin}"
+        if not await self.redis.set(
+            feeding_key,
+            int(time.time()),
+            expire=SITEMAP_FEED_LEASE,
+            exist=Redis.SET_IF_NOT_EXIST,
+        ):
+            return None
+        stats = await self._feed_origin(origin, depth)
+        if stats is not None:
+            await self.redis.hset(self.key, origin, int(time.time()))
+            await self.redis.delete(feeding_key)
+            self._fed[origin] = math.inf
+        return stats
+
+    async def _feed_origin(self, origin: str, depth: int) -> Optional[SeedImportStats]:
+        """Feeds the URLs of the sitemaps of the supplied origin to the frontier
+
+        :param origin: The origin
+        :param depth: The depth the URLs are to be crawled at
+        :return: The counters of the URLs fed or None if none of the origin's
+        sitemaps could be fetched
+        """
+        logged_method = "feed"
+        started = self.loop.time()
+        rules = await self.robots.rules(origin)
+        sitemaps: Deque[Tuple[str, int]] = deque(
+            (sitemap, 0) for sitemap in rules.sitemaps or [f"{origin}/sitemap.xml"]
+        )
+        known: Set[str] = {sitemap for sitemap, _ in sitemaps}
+        stats = SeedImportStats()
+        batch: List[str] = []
+        num_fetched = 0
+        num_failed = 0
+        while sitemaps and num_fetched < SITEMAP_MAX_FILES:
+            if stats.read >= self.max_urls:
+                break
+            sitemap, nesting = sitemaps.popleft()
+            num_fetched += 1
+            try:
+                async for location, is_sitemap in iter_sitemap(
+                    self.session, sitemap, self.logger
+                ):
+                    if is_sitemap:
+                        if nesting < SITEMAP_MAX_NESTING and location not in known:
+                            known.add(location)
+                            sitemaps.append((location, nesting + 1))
+                        continue
+                    stats.read += 1
+                    if url_origin(location) != origin:
+                        stats.invalid += 1
+                    elif not rules.allowed(location):
+                        stats.disallowed += 1
+                    else:
+                        batch.append(location)
+                        if len(batch) >= SITEMAP_BATCH_SIZE:
+                            await admit_seed_batch(
+                                self.frontier, batch, stats, depth=depth
+                            )
+                            batch = []
+                    if stats.read >= self.max_urls:
+                        break
+            except Exception as e:
+                num_failed += 1
+                self.logger.exception(
+                    logged_method, f"feeding the sitemap {sitemap} failed", exc_info=e
+                )
+        if batch:
+            await admit_seed_batch(self.frontier, batch, stats, depth=depth)
+        self.logger.info(
+            logged_method,
+            f"fed {num_fetched - num_failed} of {num_fetched} sitemaps of {origin} - {stats.progress(self.loop.time() - started)}",
+        )
+        if num_failed == num_fetched:
+            return None
+        return stats
+
+    def __str__(self) -> str:
+        return f"SitemapFeeder(key={self.key}, max_urls={self.max_urls}, fed={sum(math.isinf(t) for t in self._fed.values())})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+def sitemap_feeder(
+    frontier: RedisFrontier,
+    session: ClientSession,
+    config: AutomationConfig,
+    loop: Optional[AbstractEventLoop] = None,
+) -> SitemapFeeder:
+    """Creates the sitemap feeder of a crawler's frontier
+
+    :param frontier: The frontier of the crawler
+    :param session: The HTTP session sitemaps and robots.txt are fetched using
+    :param config: The automation config
+    :param loop: The event loop used by the automation
+    :return: The sitemap feeder
+    """
+    return SitemapFeeder(
+        frontier,
+        session,
+        robots_store(frontier.redis, session, config, loop=loop),
+        config.sitemap_max_urls,
+        loop=loop,
+    )
@@ -0,0 +1,407 @@
+import gzip
+from base64 import b64decode, b64encode
+from typing import Any, AsyncIterator, Callable, Dict, IO, List, Set
+
+from aioredis import Redis
+from ujson import dumps, loads
+
+from autobrowser.util import AutoLogger, create_autologger
+from .shards import FrontierShard
+from .spill import parse_segment_record, read_segment
+
+__all__ = ["export_frontier", "import_frontier"]
+
+SNAPSHOT_FORMAT: str = "autobrowser-frontier"
+SNAPSHOT_VERSION: int = 1
+#: The number of batches read or written per pipeline
+PIPELINE_BATCHES: int = 8
+
+logger: AutoLogger = create_autologger("frontier", "snapshot")
+
+#: A function called with each batch of items of an exported key
+Emitter = Callable[[List[Any]], None]
+
+
+def _write_record(out: IO[str], record: Any) -> None:
+    """Writes the supplied record to the snapshot as a single JSON line
+
+    :param out: The snapshot being written
+    :param record: The record
+    """
+    out.write(dumps(record))
+    out.write("\n")
+
+
+async def _scan_keys(
+    shard: FrontierShard, batch_size: int
+) -> AsyncIterator[List[str]]:
+    """Scans the keys of the supplied shard
+
+    :param shard: The shard
+    :param batch_size: The number of keys scanned per batch
+    :return: An async iterator yielding the batches of the shard's keys
+    """
+    cursor = 0
+    while 1:
+        cursor, keys = await shard.redis.scan(
+            cursor=cursor, match=f"{shard.keys.autoid}:*", count=batch_size
+        )
+        if keys:
+            yield keys
+        if not cursor:
+            break
+
+
+async def _export_list(
+    redis: Redis, key: str, emit: Emitter, batch_size: int
+) -> int:
+    """Exports the list at the supplied key reading PIPELINE_BATCHES batches
+    of it per round trip
+
+    :param redis: The redis instance of the key
+    :param key: The key of the list
+    :param emit: The function called with each batch of the list
+    :param batch_size: The number of items per batch
+    :return: The number of items exported
+    """
+    length = await redis.llen(key)
+    window = batch_size * PIPELINE_BATCHES
+    for start in range(0, length, window):
+        pipeline = redis.pipeline()
+        for batch_start in range(start, min(start + window, length), batch_size):
+            pipeline.lrange(key, batch_start, batch_start + batch_size - 1)
+        for items in await pipeline.execute():
+            if items:
+                emit(items)
+    return length
+
+
+async def _export_zset(
+    redis: Redis, key: str, emit: Emitter, batch_size: int
+) -> int:
+    """Exports the sorted set at the supplied key, with its scores, reading
+    PIPELINE_BATCHES batches of it per round trip
+
+    :param redis: The redis instance of the key
+    :param key: The key of the sorted set
+    :param emit: The function called with each batch of the sorted set
+    :param batch_size: The number of items per batch
+    :return: The number of items exported
+    """
+    length = await redis.zcard(key)
+    window = batch_size * PIPELINE_BATCHES
+    for start in range(0, length, window):
+        pipeline = redis.pipeline()
+        for batch_start in range(start, min(start + window, length), batch_size):
+            pipeline.zrange(
+                key, batch_start, batch_start + batch_size - 1, withscores=True
+            )
+        for items in await pipeline.execute():
+            if items:
+                emit([value for pair in items for value in pair])
+    return length
+
+
+async def _export_scanned(
+    redis: Redis, key: str, type_: str, emit: Emitter, batch_size: int
+) -> int:
+    """Exports the set or hash at the supplied key using SSCAN or HSCAN
+
+    :param redis: The redis instance of the key
+    :param key: The key of the set or hash
+    :param type_: The type of the key, set or hash
+    :param emit: The function called with each batch of the set or hash
+    :param batch_size: The number of items per batch
+    :return: The number of items exported
+    """
+    scan = redis.sscan if type_ == "set" else redis.hscan
+    num_items = 0
+    cursor = 0
+    while 1:
+        cursor, items = await scan(key, cursor=cursor, count=batch_size)
+        if items:
+            if type_ == "hash":
+                items = [value for pair in items for value in pair]
+            emit(items)
+            num_items += len(items)
+        if not cursor:
+            break
+    return num_items
+
+
+async def _export_spilled(
+    shard: FrontierShard, spilled: List[str], emit: Emitter
+) -> int:
+    """Exports the entries of the shard's queue spilled to disk, as entries of
+    its queue list, in the order they are refilled
+
+    :param shard: The shard
+    :param spilled: The keys of the shard's spilled segment and spilling lists
+    :param emit: The function called with each batch of the queue list
+    :return: The number of entries exported
+    """
+    redis = shard.redis
+    refilling = sorted(key for key in spilled if ":refilling:" in key)
+    spilling = sorted(key for key in spilled if ":spilling:" in key)
+    segments = []
+    for key in refilling:
+        segments.extend(await redis.lrange(key, 0, -1))
+    if shard.keys.queue_spilled in spilled:
+        segments.extend(await redis.lrange(shard.keys.queue_spilled, 0, -1))
+    num_entries = 0
+    for segment in segments:
+        expected, path = parse_segment_record(segment)
+        try:
+            entries = read_segment(path)
+        except OSError as e:
+            logger.exception(
+                "export_frontier",
+                f"reading the spilled segment {path} failed, skipping its {expected} entries",
+                exc_info=e,
+            )
+            continue
+        if entries:
+            emit(entries)
+            num_entries += len(entries)
+    for key in spilling:
+        entries = await redis.lrange(key, 0, -1)
+        if entries:
+            emit(entries)
+            num_entries += len(entries)
+    return num_entries
+
+
+async def _export_shard(shard: FrontierShard, out: IO[str], batch_size: int) -> int:
+    """Exports the keys of the supplied shard to the snapshot, except for the keys
+    with a TTL, which are leases held by running crawlers, e.g. the crawlers' leased
+    sets and the sitemap feeding leases, that would not expire once imported
+
+    :param shard: The shard being exported
+    :param out: The snapshot being written
+    :param batch_size: The number of keys scanned and items read per batch
+    :return: The number of keys exported
+    """
+    redis = shard.redis
+    prefix = f"{shard.keys.autoid}:"
+    spilled_prefix = shard.keys.queue_spilled
+    spilled: List[str] = []
+    num_transient = 0
+    #: SCAN may return a key more than once, the keys are exported once
+    exported: Set[str] = set()
+
+    def emitter(type_: str, suffix: str) -> Emitter:
+        return lambda items: _write_record(out, [shard.index, type_, suffix, items])
+
+    async for keys in _scan_keys(shard, batch_size):
+        pipeline = redis.pipeline()
+        for key in keys:
+            pipeline.type(key)
+            pipeline.pttl(key)
+        types_and_ttls = await pipeline.execute()
+        strings = []
+        for key, type_, ttl in zip(keys, types_and_ttls[::2], types_and_ttls[1::2]):
+            if key in exported:
+                continue
+            exported.add(key)
+            if ttl >= 0:
+                num_transient += 1
+                continue
+            suffix = key[len(prefix) :]
+            if key.startswith(spilled_prefix):
+                spilled.append(key)
+                continue
+            if type_ == "list":
+                await _export_list(redis, key, emitter(type_, suffix), batch_size)
+            elif type_ == "zset":
+                await _export_zset(redis, key, emitter(type_, suffix), batch_size)
+            elif type_ in ("set", "hash"):
+                await _export_scanned(
+                    redis, key, type_, emitter(type_, suffix), batch_size
+                )
+            elif type_ == "string":
+                strings.append(key)
+            elif type_ != "none":
+                # module types, e.g. the bloom filter seen set, are exported serialized
+                dumped = await redis.execute(b"DUMP", key, encoding=None)
+                if dumped is not None:
+                    _write_record(
+                        out, [shard.index, "dump", suffix, b64encode(dumped).decode()]
+                    )
+        if strings:
+            values = await redis.mget(*strings)
+            for key, value in zip(strings, values):
+                if value is not None:
+                    _write_record(
+                        out, [shard.index, "string", key[len(prefix) :], value]
+                    )
+    if spilled:
+        await _export_spilled(
+            shard, spilled, emitter("list", shard.keys.queue[len(prefix) :])
+        )
+    return len(exported) - len(spilled) - num_transient
+
+
+async def export_frontier(
+    shards: List[FrontierShard], path: str, batch_size: int = 10_000
+) -> int:
+    """Exports the frontier of an automation, all keys of its shards, to a
+    gzip compressed snapshot file.
+
+    The keys with a TTL, leases held by running crawlers, are not exported.
+    The keys of each shard are scanned, and read, in batches of batch_size items
+    using pipelines. The entries of queues spilled to disk are exported as entries
+    of the queue list. The snapshot is not atomic and should be taken while the
+    automation is not running.
+
+    :param shards: The shards of the automation's frontier
+    :param path: The path of the snapshot file
+    :param batch_size: The number of keys scanned and items read per batch
+    :return: The number of keys exported
+    """
+    num_keys = 0
+    with gzip.open(path, "wt", encoding="utf-8", compresslevel=6) as out:
+        _write_record(
+            out,
+            dict(
+                format=SNAPSHOT_FORMAT,
+                version=SNAPSHOT_VERSION,
+                autoid=shards[0].keys.autoid,
+                shards=len(shards),
+            ),
+        )
+        for shard in shards:
+            shard_keys = await _export_shard(shard, out, batch_size)
+            logger.info(
+                "export_frontier", f"exported {shard_keys} keys of shard {shard.index}"
+            )
+            num_keys += shard_keys
+    return num_keys
+
+
+async def _delete_shard_keys(shard: FrontierShard, batch_size: int) -> int:
+    """Deletes the keys of the supplied shard
+
+    :param shard: The shard
+    :param batch_size: The number of keys scanned per batch
+    :return: The number of keys deleted
+    """
+    num_deleted = 0
+    async for keys in _scan_keys(shard, batch_size):
+        num_deleted += await shard.redis.delete(*keys)
+    return num_deleted
+
+
+def _add_record(pipeline: Any, key: str, type_: str, items: Any) -> int:
+    """Adds the write of the supplied snapshot record to the pipeline
+
+    :param pipeline: The pipeline
+    :param key: The key the record is restored to
+    :param type_: The type of the record
+    :param items: The items of the record
+    :return: The number of items written
+    """
+    if type_ == "list":
+        pipeline.rpush(key, *items)
+    elif type_ == "set":
+        pipeline.sadd(key, *items)
+    elif type_ == "zset":
+        pairs: List[Any] = []
+        for i in range(0, len(items), 2):
+            pairs.append(items[i + 1])
+            pairs.append(items[i])
+        pipeline.zadd(key, *pairs)
+    elif type_ == "hash":
+        pipeline.hmset(key, *items)
+    elif type_ == "string":
+        pipeline.set(key, items)
+        return 1
+    elif type_ == "dump":
+        pipeline.restore(key, 0, b64decode(items))
+        return 1
+    else:
+        raise ValueError(f"Unknown snapshot record type '{type_}'")
+    return len(items)
+
+
+async def import_frontier(
+    shards: List[FrontierShard],
+    path: str,
+    batch_size: int = 10_000,
+    replace: bool = False,
+) -> int:
+    """Imports a snapshot file, written by export_frontier, into the frontier of
+    an automation which may differ from the automation the snapshot was taken of.
+
+    The records of the snapshot are written PIPELINE_BATCHES batches per pipeline.
+    As URLs are mapped to shards by their host, the automation must have the same
+    number of shards as the automation the snapshot was taken of.
+
+    :param shards: The shards of the automation's frontier
+    :param path: The path of the snapshot file
+    :param batch_size: The number of items written per batch
+    :param replace: Should the existing keys of the automation be deleted first,
+    otherwise the automation must not have any keys
+    :return: The number of items imported
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as snapshot_in:
+        header: Dict[str, Any] = loads(snapshot_in.readline() or "{}")
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"'{path}' is not a frontier snapshot")
+        if header.get("version", 0) > SNAPSHOT_VERSION:
+            raise ValueError(
+                f"'{path}' is a version {header['version']} snapshot, the newest supported version is {SNAPSHOT_VERSION}"
+            )
+        if header.get("shards") != len(shards):
+            raise ValueError(
+                f"'{path}' is a snapshot of a frontier with {header.get('shards')} shards, the frontier has {len(shards)} shards"
+            )
+        for shard in shards:
+            if replace:
+                num_deleted = await _delete_shard_keys(shard, batch_size)
+                logger.info(
+                    "import_frontier",
+                    f"deleted {num_deleted} existing keys of shard {shard.index}",
+                )
+            elif await _has_keys(shard, batch_size):
+                raise ValueError(
+                    f"the frontier already has keys in shard {shard.index}, use replace to delete them"
+                )
+        #: The pipelines of the shards and the number of items written by them
+        pipelines: Dict[int, Any] = {}
+        pending: Dict[int, int] = {}
+        window = batch_size * PIPELINE_BATCHES
+        num_items = 0
+        for line in snapshot_in:
+            if line == "\n":
+                continue
+            index, type_, suffix, items = loads(line)
+            shard = shards[index]
+            pipeline = pipelines.get(index)
+            if pipeline is None:
+                pipeline = pipelines[index] = shard.redis.pipeline()
+                pending[index] = 0
+            num_written = _add_record(
+                pipeline, f"{shard.keys.autoid}:{suffix}", type_, items
+            )
+            pending[index] += num_written
+            num_items += num_written
+            if pending[index] >= window:
+                del pipelines[index]
+                await pipeline.execute()
+                logger.info("import_frontier", f"imported {num_items} items")
+        for pipeline in pipelines.values():
+            await pipeline.execute()
+    logger.info("import_frontier", f"imported {num_items} items from {path}")
+    return num_items
+
+
+async def _has_keys(shard: FrontierShard, batch_size: int) -> bool:
+    """Returns T/F indicating if the supplied shard has any keys
+
+    :param shard: The shard
+    :param batch_size: The number of keys scanned per batch
+    :return: T/F indicating if the shard has any keys
+    """
+    async for _ in _scan_keys(shard, batch_size):
+        return True
+    return False
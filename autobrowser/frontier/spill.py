@@ -0,0 +1,292 @@
+import gzip
+import os
+from asyncio import AbstractEventLoop
+from pathlib import Path
+from typing import List, Optional, Tuple
+from uuid import uuid4
+
+from aioredis import Redis
+
+from autobrowser.automation import RedisKeys
+from autobrowser.util import AutoLogger, Helper, create_autologger
+from .scripts import (
+    REFILL_COMMIT_SCRIPT,
+    REFILL_SCRIPT,
+    SPILL_COMMIT_SCRIPT,
+    SPILL_RECOVER_SCRIPT,
+    SPILL_SCRIPT,
+)
+
+__all__ = ["QueueSpiller", "parse_segment_record", "read_segment"]
+
+#: How long a crawler's spilling and refilling lists are leased to it (seconds), once
+#: the lease expires any live crawler returns their entries and segments
+SPILL_LEASE_TIME: float = 600
+
+#: The maximum number of expired spilling and refilling lists returned per reap
+SPILL_REAP_LIMIT: int = 10
+
+
+def write_segment(path: Path, entries: List[str]) -> None:
+    """Writes the supplied entries to the segment file at the supplied path,
+    the segment is written to a temporary file that is then renamed so that
+    segment files are always complete
+
+    :param path: The path of the segment file
+    :param entries: The entries of the segment
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f"{path.name}.tmp")
+    with gzip.open(str(tmp_path), "wt", encoding="utf-8", compresslevel=6) as out:
+        for entry in entries:
+            out.write(entry)
+            out.write("\n")
+    os.replace(str(tmp_path), str(path))
+
+
+def read_segment(path: Path) -> List[str]:
+    """Reads the entries of the segment file at the supplied path
+
+    :param path: The path of the segment file
+    :return: The entries of the segment
+    """
+    with gzip.open(str(path), "rt", encoding="utf-8") as seg_in:
+        return [line.rstrip("\n") for line in seg_in if line != "\n"]
+
+
+def parse_segment_record(segment: str) -> Tuple[int, Path]:
+    """Parses the supplied spilled segment record
+
+    :param segment: The segment record
+    :return: The number of entries of the segment and the path to its file
+    """
+    num_entries, path = segment.split("\t", 1)
+    return int(num_entries), Path(path)
+
+
+class QueueSpiller:
+    """Keeps only a hot window of a frontier's queue list in redis.
+
+    When the queue list grows past hot_size + segment_size entries, the entries at
+    its tail are spilled, segment_size entries at a time, to gzip compressed segment
+    files. The segments are recorded, oldest first, in the queue:spilled list and are
+    counted as queued by the frontier. Once the queue list drains below half of hot_size,
+    the oldest segment is read back and appended to the queue list.
+
+    Entries being spilled and segments being refilled are tracked per crawler in
+    redis, in lists leased to the crawler in queue:spilled:leases, so that they are
+    returned when the crawler restarts or, if it does not, by any live crawler once
+    the lease expires. When the automation runs on multiple machines the spill
+    directory must be a shared volume.
+    Only the plain queue list is spilled, priority bucket and host queues are not.
+    """
+
+    __slots__ = [
+        "__weakref__",
+        "_busy",
+        "_next_reap",
+        "directory",
+        "hot_size",
+        "keys",
+        "leases_key",
+        "logger",
+        "loop",
+        "redis",
+        "refilling_key",
+        "segment_size",
+        "spilling_key",
+    ]
+
+    def __init__(
+        self,
+        redis: Redis,
+        keys: RedisKeys,
+        directory: str,
+        crawler_id: str,
+        hot_size: int = 100_000,
+        segment_size: int = 10_000,
+        loop: Optional[AbstractEventLoop] = None,
+    ) -> None:
+        """Initialize the new instance of QueueSpiller
+
+        :param redis: The redis instance to be used
+        :param keys: The redis keys class containing the keys for the automation
+        :param directory: The directory the segment files are written to
+        :param crawler_id: The id of the crawler using the spiller
+        :param hot_size: The number of entries kept in the queue list
+        :param segment_size: The number of entries per segment file
+        :param loop: The event loop used by the automation
+        """
+        self.redis: Redis = redis
+        self.keys: RedisKeys = keys
+        self.directory: Path = Path(directory) / keys.autoid.replace(":", "_")
+        self.hot_size: int = max(hot_size, 1)
+        self.segment_size: int = max(segment_size, 1)
+        self.spilling_key: str = f"{keys.queue_spilled}:spilling:{crawler_id}"
+        self.refilling_key: str = f"{keys.queue_spilled}:refilling:{crawler_id}"
+        self.leases_key: str = f"{keys.queue_spilled}:leases"
+        self.logger: AutoLogger = create_autologger("frontier", "QueueSpiller")
+        self.loop: AbstractEventLoop = Helper.ensure_loop(loop)
+        self._busy: bool = False
+        self._next_reap: float = 0.0
+
+    async def recover(self) -> int:
+        """Returns the entries this crawler was spilling, and the segments it was
+        refilling from, when it last stopped, along with those of any crawler
+        whose lease expired
+
+        :return: The number of entries and segments returned
+        """
+        return await self._return_spilled(
+            "recover", self.spilling_key, self.refilling_key
+        )
+
+    async def reap(self) -> int:
+        """Returns the entries being spilled, and the segments being refilled, by
+        crawlers whose lease expired, e.g. crawlers that crashed and did not restart
+
+        :return: The number of entries and segments returned
+        """
+        self._next_reap = self.loop.time() + SPILL_LEASE_TIME / 2
+        return await self._return_spilled("reap")
+
+    async def balance(self) -> None:
+        """Spills the tail of the queue list if it has grown too large or refills
+        it from the oldest spilled segment if it has drained"""
+        if self._busy:
+            return
+        self._busy = True
+        try:
+            if self.loop.time() >= self._next_reap:
+                await self.reap()
+            length = await self.redis.llen(self.keys.queue)
+            if length > self.hot_size + self.segment_size:
+                while length > self.hot_size + self.segment_size:
+                    num_spilled = await self.spill()
+                    if num_spilled == 0:
+                        break
+                    length -= num_spilled
+            elif length < self.hot_size // 2:
+                await self.refill()
+        finally:
+            self._busy = False
+
+    async def spill(self) -> int:
+        """Spills one segment from the tail of the queue list to disk
+
+        :return: The number of entries spilled
+        """
+        entries = await SPILL_SCRIPT(
+            self.redis,
+            keys=[self.keys.queue, self.spilling_key, self.leases_key],
+            args=[self.segment_size, self.hot_size, int(SPILL_LEASE_TIME * 1000)],
+        )
+        if not entries:
+            return 0
+        path = self.directory / f"{uuid4().hex}.seg.gz"
+        try:
+            await self.loop.run_in_executor(None, write_segment, path, entries)
+        except OSError as e:
+            self.logger.exception(
+                "spill",
+                f"writing the segment {path} failed, returning its entries to the queue",
+                exc_info=e,
+            )
+            await self.recover()
+            return 0
+        committed = await SPILL_COMMIT_SCRIPT(
+            self.redis,
+            keys=[self.spilling_key, self.keys.queue_spilled, self.leases_key],
+            args=[f"{len(entries)}\t{path}"],
+        )
+        if committed == 0:
+            self.logger.warning(
+                "spill",
+                f"the lease of the spilled entries expired and they were returned to the queue, removing {path}",
+            )
+            await self.loop.run_in_executor(None, self._remove_segment, path)
+            return 0
+        self.logger.info("spill", f"spilled {len(entries)} entries to {path}")
+        return len(entries)
+
+    async def refill(self) -> int:
+        """Appends the entries of the oldest spilled segment to the queue list
+
+        :return: The number of entries refilled
+        """
+        segment = await REFILL_SCRIPT(
+            self.redis,
+            keys=[self.keys.queue_spilled, self.refilling_key, self.leases_key],
+            args=[int(SPILL_LEASE_TIME * 1000)],
+        )
+        if not segment:
+            return 0
+        num_entries, path = parse_segment_record(segment)
+        try:
+            entries = await self.loop.run_in_executor(None, read_segment, path)
+        except FileNotFoundError:
+            self.logger.critical(
+                "refill",
+                f"the segment {path} does not exist, dropping its {num_entries} entries",
+            )
+            await self.redis.lrem(self.refilling_key, 0, segment)
+            return 0
+        except OSError as e:
+            self.logger.exception(
+                "refill",
+                f"reading the segment {path} failed, returning it to the spilled segments",
+                exc_info=e,
+            )
+            await self.recover()
+            return 0
+        committed = await REFILL_COMMIT_SCRIPT(
+            self.redis,
+            keys=[self.keys.queue, self.refilling_key, self.leases_key],
+            args=[segment, *entries],
+        )
+        if committed == 0:
+            self.logger.warning(
+                "refill",
+                f"the lease of the refilled segment {path} expired and it was returned to the spilled segments",
+            )
+            return 0
+        await self.loop.run_in_executor(None, self._remove_segment, path)
+        self.logger.info("refill", f"refilled {len(entries)} entries from {path}")
+        return len(entries)
+
+    async def _return_spilled(self, logged_method: str, *keys: str) -> int:
+        """Returns the entries and segments of the supplied spilling and refilling
+        lists and of the lists whose lease expired
+
+        :param logged_method: The name of the method logged
+        :param keys: The spilling and refilling lists returned regardless of their lease
+        :return: The number of entries and segments returned
+        """
+        num_returned = await SPILL_RECOVER_SCRIPT(
+            self.redis,
+            keys=[self.keys.queue, self.keys.queue_spilled, self.leases_key],
+            args=[SPILL_REAP_LIMIT, *keys],
+        )
+        if num_returned > 0:
+            self.logger.info(
+                logged_method,
+                f"returned {num_returned} spilling entries or refilling segments",
+            )
+        return num_returned
+
+    @staticmethod
+    def _remove_segment(path: Path) -> None:
+        """Removes the segment file at the supplied path, if it exists
+
+        :param path: The path of the segment file
+        """
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __str__(self) -> str:
+        return f"QueueSpiller(directory={self.directory}, hot_size={self.hot_size}, segment_size={self.segment_size})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
@@ -0,0 +1,508 @@
+import sqlite3
+import time
+from asyncio import AbstractEventLoop, Event
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ujson import dumps
+
+from autobrowser.automation import AutomationConfig
+from autobrowser.util import AutoLogger, Helper, create_autologger
+from .entry import QueueEntry
+from .memory import (
+    CRAWL_DEPTH_FIELD,
+    MAX_RETRIES_FIELD,
+    SCOPE_RULES_FIELD,
+    SEEDS_FIELD,
+    MemoryFrontier,
+)
+from .ordering import CrawlOrder, crawl_order_from_info
+from .politeness import HostPoliteness, host_politeness_from_info
+from .seen import SEEN_ENCODING_FIELD, SeenSet, url_fingerprint
+
+__all__ = [
+    "SqliteFrontier",
+    "SqliteQueue",
+    "close_sqlite_queues",
+    "sqlite_queue",
+]
+
+SCHEMA: str = """
+CREATE TABLE IF NOT EXISTS info (field TEXT PRIMARY KEY, value TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scope (rule TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS seen (member PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS crawled (member PRIMARY KEY, url TEXT NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS queue (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  prio INTEGER,
+  url TEXT NOT NULL,
+  depth INTEGER NOT NULL,
+  referrer TEXT NOT NULL,
+  claimed INTEGER NOT NULL DEFAULT 0,
+  retries INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS queue_ready ON queue (prio, id) WHERE claimed = 0;
+CREATE TABLE IF NOT EXISTS delayed (id INTEGER PRIMARY KEY, ready_at REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS delayed_ready ON delayed (ready_at);
+CREATE TABLE IF NOT EXISTS failed (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  url TEXT NOT NULL,
+  depth INTEGER NOT NULL,
+  referrer TEXT NOT NULL
+);
+"""
+
+
+class SqliteQueue:
+    """An automation's queue, pending and seen sets, info and scope rules kept in an
+    SQLite database in WAL mode, the embedded equivalent of the redis frontier's keys.
+
+    The queue has the same interface as MemoryQueue and is shared by the tabs of the
+    automation running in the same process. The queue's rows are claimed, rather
+    than removed, so the URLs being crawled when the process stopped are returned to
+    the queue, counting a retry, when the database is next opened. Writes made while
+    admitting a page's outlinks are batched in a single transaction. Rows being
+    retried after a failed navigation are delayed, with the time they are due kept
+    in the delayed table.
+
+    The info fields and scope rules of the frontier_info configuration option are
+    stored in the database when it is opened, and its seeds admitted, so a database
+    can be reopened without it. URLs are crawled in the configured crawl order, host
+    politeness is not supported.
+    """
+
+    __slots__ = [
+        "__weakref__",
+        "_transaction_depth",
+        "changed",
+        "connection",
+        "crawl_depth",
+        "fingerprint_seen",
+        "logger",
+        "loop",
+        "max_retries",
+        "order",
+        "path",
+        "politeness",
+        "scope_rules",
+        "size",
+    ]
+
+    def __init__(
+        self, path: str, info: Dict[str, Any], loop: Optional[AbstractEventLoop] = None
+    ) -> None:
+        """Initialize the new instance of SqliteQueue
+
+        :param path: The path of the database
+        :param info: A dictionary using the field names of the automation's info hash
+        plus the seeds and scope_rules of the automation
+        :param loop: The event loop used by the automation
+        """
+        self.path: str = path
+        self.loop: AbstractEventLoop = Helper.ensure_loop(loop)
+        self.logger: AutoLogger = create_autologger("frontier", "SqliteQueue")
+        self.connection: sqlite3.Connection = sqlite3.connect(
+            path, isolation_level=None
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._transaction_depth: int = 0
+        self.size: int = 0
+        with self.transaction():
+            self._store_info(info)
+        stored = dict(self.connection.execute("SELECT field, value FROM info"))
+        self.crawl_depth: int = int(stored.get(CRAWL_DEPTH_FIELD) or 0)
+        self.max_retries: int = int(stored.get(MAX_RETRIES_FIELD) or 3)
+        self.order: CrawlOrder = crawl_order_from_info(stored)
+        self.politeness: HostPoliteness = HostPoliteness()
+        if host_politeness_from_info(stored).enabled:
+            self.logger.warning(
+                "init", "host politeness is not supported by the sqlite frontier"
+            )
+        self.scope_rules: List[str] = [
+            rule for rule, in self.connection.execute("SELECT rule FROM scope")
+        ]
+        #: Any seen encoding other than plain stores fingerprints rather than URLs
+        self.fingerprint_seen: bool = (
+            stored.get(SEEN_ENCODING_FIELD) or SeenSet.encoding
+        ) != SeenSet.encoding
+        #: Set whenever a URL is queued or completed, used for waiting
+        self.changed: Event = Event(loop=self.loop)
+        with self.transaction():
+            num_recovered = self._recover()
+        if num_recovered > 0:
+            self.logger.info(
+                "init", f"returned {num_recovered} URLs claimed by the previous run"
+            )
+        self.size = self._count_queued()
+        self.admit(info.get(SEEDS_FIELD) or [], 0)
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Returns a context manager that performs the queue operations made within
+        it in a single transaction, nested transactions join the outer transaction"""
+        if self._transaction_depth > 0:
+            self._transaction_depth += 1
+            try:
+                yield
+            finally:
+                self._transaction_depth -= 1
+            return
+        self.connection.execute("BEGIN")
+        self._transaction_depth = 1
+        try:
+            yield
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            self.size = self._count_queued()
+            raise
+        else:
+            self.connection.execute("COMMIT")
+        finally:
+            self._transaction_depth = 0
+
+    def mark_seen(self, url: str) -> bool:
+        """Adds the supplied URL to the seen set
+
+        :param url: The URL to be marked as seen
+        :return: T/F indicating if the URL was not seen before
+        """
+        cursor = self.connection.execute(
+            "INSERT OR IGNORE INTO seen (member) VALUES (?)", (self._member(url),)
+        )
+        return cursor.rowcount == 1
+
+    def is_seen(self, url: str) -> bool:
+        """Returns T/F indicating if the supplied URL has been seen
+
+        :param url: The URL to be tested
+        :return: T/F indicating if the supplied URL is seen
+        """
+        cursor = self.connection.execute(
+            "SELECT 1 FROM seen WHERE member = ?", (self._member(url),)
+        )
+        return cursor.fetchone() is not None
+
+    def mark_crawled(self, url: str, claimed: str) -> bool:
+        """Adds the supplied URL of a page crawled for the supplied claimed URL
+        to the seen and crawled tables
+
+        :param url: The URL to be marked as crawled
+        :param claimed: The claimed URL the page was crawled for
+        :return: T/F indicating if the URL was not crawled before for another
+        claimed URL
+        """
+        self.mark_seen(url)
+        member = self._member(url)
+        self.connection.execute(
+            "INSERT OR IGNORE INTO crawled (member, url) VALUES (?, ?)",
+            (member, claimed),
+        )
+        cursor = self.connection.execute(
+            "SELECT url FROM crawled WHERE member = ?", (member,)
+        )
+        return cursor.fetchone()[0] == claimed
+
+    def mark_all_crawled(self, urls: Iterable[str], claimed: str) -> bool:
+        """Marks the supplied URLs of a page crawled for the supplied claimed URL
+        as crawled, see mark_crawled, in a single transaction
+
+        :param urls: The URLs of the page
+        :param claimed: The claimed URL the page was crawled for
+        :return: T/F indicating if none of the URLs were crawled before for another
+        claimed URL
+        """
+        not_crawled = True
+        with self.transaction():
+            for url in urls:
+                if not self.mark_crawled(url, claimed):
+                    not_crawled = False
+        return not_crawled
+
+    def admit(self, urls: Iterable[str], depth: int, page: str = "") -> List[bool]:
+        """Marks the supplied URLs as seen, queuing the URLs not seen before,
+        in a single transaction
+
+        :param urls: The URLs to be queued
+        :param depth: The depth the URLs are to be crawled at
+        :param page: The URL of the page the URLs were discovered on
+        :return: T/F indicating if the URL was queued, for each URL
+        """
+        added: List[bool] = []
+        with self.transaction():
+            for url in urls:
+                if self.mark_seen(url):
+                    prio = self.order.priority(url, depth, page)
+                    self.push(QueueEntry(url, depth, page, prio))
+                    added.append(True)
+                else:
+                    added.append(False)
+        return added
+
+    def push(self, entry: QueueEntry, front: bool = False) -> None:
+        """Queues the supplied entry
+
+        :param entry: The entry to be queued
+        :param front: Unused, entries are ordered by their priority and when they were
+        first queued, so returned entries are crawled before the entries queued after them
+        """
+        self.connection.execute(
+            "INSERT INTO queue (prio, url, depth, referrer) VALUES (?, ?, ?, ?)",
+            (entry.prio, entry.url, entry.depth, entry.referrer),
+        )
+        self.size += 1
+        self.changed.set()
+
+    def pop(self) -> Tuple[Optional[QueueEntry], float]:
+        """Claims and returns the next entry to be crawled
+
+        :return: A tuple of the entry, or None if no entry could be claimed, and
+        -1 if the queue is empty, the number of seconds until a retried entry is
+        due if no entry could be claimed, otherwise 0
+        """
+        if self.size == 0:
+            return None, -1
+        now = time.time()
+        with self.transaction():
+            self._promote_retries(now)
+            row = self.connection.execute(
+                "SELECT id, url, depth, referrer, prio FROM queue WHERE claimed = 0 ORDER BY prio, id LIMIT 1"
+            ).fetchone()
+            if row is None:
+                next_retry = self.connection.execute(
+                    "SELECT MIN(ready_at) FROM delayed"
+                ).fetchone()[0]
+                if next_retry is None:
+                    self.size = 0
+                    return None, -1
+                return None, max(next_retry - now, 0.001)
+            self.connection.execute("UPDATE queue SET claimed = 1 WHERE id = ?", row[:1])
+        self.size -= 1
+        row_id, url, depth, referrer, prio = row
+        return QueueEntry(url, depth, referrer, prio, raw=str(row_id)), 0
+
+    def complete(self, entry: QueueEntry) -> None:
+        """Removes the supplied crawled entry from the queue
+
+        :param entry: The crawled entry
+        """
+        self.connection.execute("DELETE FROM queue WHERE id = ?", (int(entry.raw),))
+        self.changed.set()
+
+    def requeue(self, entry: QueueEntry) -> bool:
+        """Returns the supplied abandoned entry to the queue counting a retry, if the
+        entry has been returned more than max_retries times it is failed instead
+
+        :param entry: The abandoned entry
+        :return: T/F indicating if the entry was returned to the queue
+        """
+        row_id = int(entry.raw)
+        with self.transaction():
+            row = self.connection.execute(
+                "SELECT retries FROM queue WHERE id = ? AND claimed = 1", (row_id,)
+            ).fetchone()
+            if row is None:
+                return False
+            if row[0] + 1 > self.max_retries:
+                self.connection.execute(
+                    "INSERT INTO failed (url, depth, referrer) SELECT url, depth, referrer FROM queue WHERE id = ?",
+                    (row_id,),
+                )
+                self.connection.execute("DELETE FROM queue WHERE id = ?", (row_id,))
+                return False
+            self.connection.execute(
+                "UPDATE queue SET claimed = 0, retries = retries + 1 WHERE id = ?",
+                (row_id,),
+            )
+        self.size += 1
+        self.changed.set()
+        return True
+
+    def retry(self, entry: QueueEntry, backoff: float, max_backoff: float) -> float:
+        """Delays the supplied entry, whose navigation failed, until its backoff has
+        elapsed counting a retry, if the entry has been retried more than max_retries
+        times it is failed instead.
+        The backoff of the nth retry is min(backoff * 2 ^ (n - 1), max_backoff).
+
+        :param entry: The entry whose navigation failed
+        :param backoff: The backoff of the first retry in seconds
+        :param max_backoff: The maximum backoff in seconds
+        :return: The backoff of the entry or 0 if it was failed
+        """
+        row_id = int(entry.raw)
+        with self.transaction():
+            row = self.connection.execute(
+                "SELECT retries FROM queue WHERE id = ? AND claimed = 1", (row_id,)
+            ).fetchone()
+            if row is None:
+                return 0
+            retries = row[0] + 1
+            if retries > self.max_retries:
+                self.connection.execute(
+                    "INSERT INTO failed (url, depth, referrer) SELECT url, depth, referrer FROM queue WHERE id = ?",
+                    (row_id,),
+                )
+                self.connection.execute("DELETE FROM queue WHERE id = ?", (row_id,))
+                return 0
+            delay = max(min(backoff * 2 ** (retries - 1), max_backoff), 0.001)
+            self.connection.execute(
+                "UPDATE queue SET claimed = 2, retries = ? WHERE id = ?",
+                (retries, row_id),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO delayed (id, ready_at) VALUES (?, ?)",
+                (row_id, time.time() + delay),
+            )
+        self.size += 1
+        self.changed.set()
+        return delay
+
+    def park(self, entry: QueueEntry, delay: float) -> None:
+        """Delays the supplied entry, whose host is backing off, until the supplied
+        delay has elapsed without counting a retry
+
+        :param entry: The entry to be parked
+        :param delay: The number of seconds the entry is parked for
+        """
+        row_id = int(entry.raw)
+        with self.transaction():
+            cursor = self.connection.execute(
+                "UPDATE queue SET claimed = 2 WHERE id = ? AND claimed = 1", (row_id,)
+            )
+            if cursor.rowcount == 0:
+                return
+            self.connection.execute(
+                "INSERT OR REPLACE INTO delayed (id, ready_at) VALUES (?, ?)",
+                (row_id, time.time() + max(delay, 0.001)),
+            )
+        self.size += 1
+        self.changed.set()
+
+    def close(self) -> None:
+        """Closes the database"""
+        self.connection.close()
+
+    def _count_queued(self) -> int:
+        """Returns the number of entries waiting to be claimed, including the
+        retried entries not yet due
+
+        :return: The number of entries waiting to be claimed
+        """
+        return self.connection.execute(
+            "SELECT COUNT(*) FROM queue WHERE claimed != 1"
+        ).fetchone()[0]
+
+    def _member(self, url: str) -> Union[str, int]:
+        """Returns the seen set member of the supplied URL
+
+        :param url: The URL
+        :return: The URL or its fingerprint
+        """
+        return url_fingerprint(url) if self.fingerprint_seen else url
+
+    def _store_info(self, info: Dict[str, Any]) -> None:
+        """Stores the fields and scope rules of the supplied frontier info
+
+        :param info: A dictionary using the field names of the automation's info hash
+        plus the seeds and scope_rules of the automation
+        """
+        fields = [
+            (field, str(value))
+            for field, value in info.items()
+            if field not in (SEEDS_FIELD, SCOPE_RULES_FIELD) and value is not None
+        ]
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO info (field, value) VALUES (?, ?)", fields
+        )
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO scope (rule) VALUES (?)",
+            [
+                (rule if isinstance(rule, str) else dumps(rule),)
+                for rule in info.get(SCOPE_RULES_FIELD) or []
+            ],
+        )
+
+    def _promote_retries(self, now: float) -> None:
+        """Returns the retried entries that are due to the queue
+
+        :param now: The current time in seconds since the epoch
+        """
+        self.connection.execute(
+            "UPDATE queue SET claimed = 0 WHERE id IN (SELECT id FROM delayed WHERE ready_at <= ?)",
+            (now,),
+        )
+        self.connection.execute("DELETE FROM delayed WHERE ready_at <= ?", (now,))
+
+    def _recover(self) -> int:
+        """Returns the entries claimed when the database was last closed to the queue
+        counting a retry, failing the entries returned more than max_retries times
+
+        :return: The number of entries returned to the queue
+        """
+        execute = self.connection.execute
+        execute(
+            "INSERT INTO failed (url, depth, referrer) SELECT url, depth, referrer FROM queue WHERE claimed = 1 AND retries >= ?",
+            (self.max_retries,),
+        )
+        execute(
+            "DELETE FROM queue WHERE claimed = 1 AND retries >= ?", (self.max_retries,)
+        )
+        return execute(
+            "UPDATE queue SET claimed = 0, retries = retries + 1 WHERE claimed = 1"
+        ).rowcount
+
+    def __str__(self) -> str:
+        return f"SqliteQueue(path={self.path}, size={self.size})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+#: The queues of the automations running in this process, by database path
+_SQLITE_QUEUES: Dict[str, SqliteQueue] = {}
+
+
+def sqlite_queue(config: AutomationConfig, loop: AbstractEventLoop) -> SqliteQueue:
+    """Returns the sqlite queue of the automation, opening its database if it
+    is not open
+
+    :param config: The automation config
+    :param loop: The event loop used by the automation
+    :return: The automation's queue
+    """
+    path = config.frontier_db or f"{config.autoid}.frontier.db"
+    queue = _SQLITE_QUEUES.get(path)
+    if queue is None:
+        queue = _SQLITE_QUEUES[path] = SqliteQueue(
+            path, config.frontier_info or {}, loop=loop
+        )
+    return queue
+
+
+def close_sqlite_queues() -> None:
+    """Closes the databases of the sqlite queues opened by this process"""
+    queues = list(_SQLITE_QUEUES.values())
+    _SQLITE_QUEUES.clear()
+    for queue in queues:
+        queue.close()
+
+
+class SqliteFrontier(MemoryFrontier):
+    """A frontier kept in an SQLite database, see SqliteQueue, with the same
+    semantics as MemoryFrontier. The frontier survives restarts and does not use redis.
+    """
+
+    __slots__: List[str] = []
+
+    queue: SqliteQueue
+
+    def _open_queue(self) -> SqliteQueue:
+        """Returns the sqlite queue of the automation
+
+        :return: The automation's queue
+        """
+        return sqlite_queue(self.config, self.loop)
+
+    def __str__(self) -> str:
+        return f"SqliteFrontier(queue={self.queue})"
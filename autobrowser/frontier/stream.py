@@ -0,0 +1,368 @@
+from asyncio import gather
+from typing import Dict, List, Optional, Union
+
+from aioredis import ReplyError
+
+from .entry import QueueEntry
+from .redis import RedisFrontier
+from .scripts import (
+    STREAM_ADMIT_SCRIPT,
+    STREAM_CLAIM_SCRIPT,
+    STREAM_LEN_SCRIPT,
+    STREAM_REAP_SCRIPT,
+    STREAM_RECOVER_SCRIPT,
+    STREAM_RELEASE_SCRIPT,
+    STREAM_RENEW_SCRIPT,
+    STREAM_RETRY_SCRIPT,
+)
+from .shards import FrontierShard
+
+__all__ = ["StreamFrontier"]
+
+#: The consumer group of the crawlers of an automation
+STREAM_GROUP: str = "crawlers"
+
+
+class StreamFrontier(RedisFrontier):
+    """A frontier whose queue is a redis stream consumed by the automation's crawlers
+    as a consumer group.
+
+    Admitted URLs are added to the a:{autoid}:q:stream stream using XADD and claimed,
+    in batches, using XREADGROUP with each crawler, identified by its crawler id
+    ({reqid}:{n}), a consumer of the group. Completed URLs are acknowledged using XACK,
+    and the URLs of crawlers that stopped renewing them are reclaimed using XAUTOCLAIM,
+    so the URLs each crawler is working on can be inspected using XPENDING. The
+    consumers of stopped crawlers are deleted using XGROUP DELCONSUMER once their URLs
+    were reclaimed. URLs whose navigation failed wait in the a:{autoid}:q:retry sorted
+    set until their backoff elapsed and are then added back to the stream.
+
+    The URLs are crawled in the order they were admitted, the crawl order and host
+    politeness are not supported.
+    """
+
+    __slots__: List[str] = []
+
+    async def remove_current_from_pending(self) -> None:
+        """If currently_crawling url is set, mark it as completed.
+
+        Completed URLs are acknowledged by the next claim of URLs from the
+        stream or by release
+        """
+        if self.currently_crawling is not None:
+            self.shards[self.currently_crawling.shard].completed.append(
+                self.currently_crawling.stream_id
+            )
+            self.currently_crawling = None
+
+    async def retry_current(self) -> bool:
+        """Acknowledges the currently crawled URL, whose navigation failed, and moves it
+        to the retry sorted set of its shard to be added back to the stream once its
+        backoff, doubled for each retry of the URL, has elapsed. URLs retried more than
+        max_retries times are failed.
+
+        :return: T/F indicating if the URL will be retried rather than failed
+        """
+        entry = self.currently_crawling
+        if entry is None:
+            return False
+        self.currently_crawling = None
+        shard = self.shards[entry.shard]
+        backoff = await STREAM_RETRY_SCRIPT(
+            shard.redis,
+            keys=self._stream_keys(shard),
+            args=[
+                STREAM_GROUP,
+                self.crawler_id,
+                entry.stream_id,
+                max(int(self.config.retry_backoff * 1000), 1),
+                max(int(self.config.retry_backoff_max * 1000), 1),
+            ],
+        )
+        if backoff > 0:
+            self.logger.info(
+                "retry_current", f"retrying {entry.url} in {backoff / 1000:.1f} seconds"
+            )
+        elif backoff == 0:
+            self.logger.info(
+                "retry_current", f"{entry.url} was retried too many times, failing it"
+            )
+        return backoff != 0
+
+    async def park_current(self, delay: float) -> bool:
+        """Parking URLs is not supported by the stream frontier, as a URL not
+        acknowledged is reclaimed counting a delivery
+
+        :param delay: The number of seconds the URL would be parked for
+        :return: False, the URL is to be navigated to once the host's backoff elapsed
+        """
+        return False
+
+    async def q_len(self) -> int:
+        """Returns the number of URLs of the frontier's streams not yet claimed
+
+        :return: The length of the queue
+        """
+        lengths = await gather(
+            *[
+                STREAM_LEN_SCRIPT(
+                    shard.redis, keys=self._stream_keys(shard), args=[STREAM_GROUP]
+                )
+                for shard in self.shards
+            ],
+            loop=self.loop,
+        )
+        return sum(lengths)
+
+    async def recover(self) -> int:
+        """Makes the URLs still claimed by a previous run of this crawler, one that
+        stopped without releasing them, immediately reclaimable by any crawler
+
+        :return: The number of URLs made reclaimable
+        """
+        returned = await gather(
+            *[
+                STREAM_RECOVER_SCRIPT(
+                    shard.redis,
+                    keys=self._stream_keys(shard),
+                    args=[STREAM_GROUP, self.crawler_id, self.lease_time],
+                )
+                for shard in self.shards
+            ],
+            loop=self.loop,
+        )
+        num_returned = sum(returned)
+        self.logger.info(
+            "recover",
+            f"made {num_returned} URLs claimed by a previous run reclaimable",
+        )
+        return num_returned
+
+    async def renew_leases(self) -> int:
+        """Resets the idle time of the currently crawled, prefetched and completed but
+        not yet acknowledged URLs, so that they are not reclaimed by other crawlers.
+        URLs not renewed for the lease time are reclaimed when URLs are claimed.
+        The consumers of other crawlers holding no URLs and idle for the lease time
+        are deleted.
+
+        :return: The number of URLs reclaimed, always 0
+        """
+        held: Dict[int, List[str]] = {
+            shard.index: list(shard.completed) for shard in self.shards
+        }
+        for entry in self._prefetched:
+            held[entry.shard].append(entry.stream_id)
+        if self.currently_crawling is not None:
+            held[self.currently_crawling.shard].append(
+                self.currently_crawling.stream_id
+            )
+        await gather(
+            *[
+                STREAM_RENEW_SCRIPT(
+                    shard.redis,
+                    keys=self._stream_keys(shard),
+                    args=[STREAM_GROUP, self.crawler_id, *held[shard.index]],
+                )
+                for shard in self.shards
+                if held[shard.index]
+            ],
+            loop=self.loop,
+        )
+        reaped = await gather(
+            *[
+                STREAM_REAP_SCRIPT(
+                    shard.redis,
+                    keys=self._stream_keys(shard),
+                    args=[STREAM_GROUP, self.crawler_id, self.lease_time],
+                )
+                for shard in self.shards
+            ],
+            loop=self.loop,
+        )
+        num_reaped = sum(reaped)
+        if num_reaped:
+            self.logger.info(
+                "renew_leases", f"deleted the consumers of {num_reaped} stopped crawlers"
+            )
+        return 0
+
+    async def _init_queues(self) -> None:
+        """Creates the consumer group of the shards' streams if it does not exist"""
+        if self.order.ordered or self.politeness.enabled:
+            self.logger.warning(
+                "init",
+                "the stream frontier crawls URLs in the order they were admitted, ignoring the crawl order and host politeness",
+            )
+        for shard in self.shards:
+            try:
+                await shard.redis.xgroup_create(
+                    shard.keys.queue_stream, STREAM_GROUP, latest_id="0", mkstream=True
+                )
+            except ReplyError as e:
+                if not str(e).startswith("BUSYGROUP"):
+                    raise
+
+    async def admit_to_shard(
+        self, shard: FrontierShard, page: str, candidates: List[str]
+    ) -> List[int]:
+        """Adds the not seen candidates to the stream of the supplied shard
+
+        :param shard: The shard the candidates belong to
+        :param page: The URL of the page the candidates were discovered on
+        :param candidates: The (seen member, entry)s of the candidates
+        :return: A list of 1 (added) or 0 (seen) for each candidate
+        """
+        return await STREAM_ADMIT_SCRIPT(
+            shard.redis,
+            keys=[
+                shard.keys.queue_stream,
+                shard.seen.key,
+                shard.keys.referrers,
+                shard.keys.referrer_ids,
+            ],
+            args=[shard.seen.encoding, page, *candidates],
+        )
+
+    async def _claim(self, shard: FrontierShard, count: int) -> int:
+        """Claims up to count URLs from the stream of the supplied shard, adding them
+        to the prefetch buffer, while acknowledging the completed URLs
+
+        :param shard: The shard to claim from
+        :param count: The maximum number of URLs to be claimed
+        :return: -1 if no URLs could be claimed, the number of milliseconds until the
+        next retry is due if only retried URLs are waiting, otherwise 0
+        """
+        completed = shard.completed
+        shard.completed = []
+        wait, *claimed = await STREAM_CLAIM_SCRIPT(
+            shard.redis,
+            keys=self._stream_keys(shard),
+            args=[STREAM_GROUP, self.crawler_id, count, self.lease_time, *completed],
+        )
+        for i in range(0, len(claimed), 2):
+            self._prefetched.append(self._decode(shard, claimed[i], claimed[i + 1]))
+        self.logger.debug(
+            "_claim",
+            f"claimed {len(claimed) // 2} URLs from shard {shard.index}, requested {count} URLs",
+        )
+        return wait
+
+    async def _release_shard(
+        self,
+        shard: FrontierShard,
+        prefetched: List[QueueEntry],
+        abandoned: Optional[QueueEntry],
+    ) -> None:
+        """Acknowledges the completed URLs claimed from the supplied shard and makes
+        its prefetched and abandoned URLs immediately reclaimable by any crawler
+
+        :param shard: The shard to release the URLs of
+        :param prefetched: The prefetched URLs of all shards
+        :param abandoned: The URL being crawled when the crawler stopped, if any
+        """
+        completed = shard.completed
+        shard.completed = []
+        returned = [
+            entry.stream_id for entry in prefetched if entry.shard == shard.index
+        ]
+        if abandoned is not None and abandoned.shard == shard.index:
+            returned.append(abandoned.stream_id)
+        if not completed and not returned:
+            return
+        num_returned = await STREAM_RELEASE_SCRIPT(
+            shard.redis,
+            keys=self._stream_keys(shard),
+            args=[
+                STREAM_GROUP,
+                self.crawler_id,
+                self.lease_time,
+                len(completed),
+                *completed,
+                *returned,
+            ],
+        )
+        self.logger.info(
+            "release",
+            f"acknowledged {len(completed)} completed URLs and returned {num_returned} abandoned or prefetched URLs to the stream of shard {shard.index}",
+        )
+
+    async def _block_for_populated_q(
+        self,
+        logged_method: str,
+        max_time: Union[int, float] = 60,
+        block_time: Union[int, float] = 5,
+    ) -> None:
+        """Performs the blocking wait for the frontiers stream to become populated.
+
+        The wait is performed using XREADGROUP with BLOCK on the home shard's stream,
+        with the URL read added to the prefetch buffer. Each read blocks for at most
+        block_time seconds and never past max_time, the other shards and the URLs
+        pushed onto the queue lists are checked each time a read times out.
+
+        :param logged_method: The method name that should be used rather than this one
+        :param max_time: The maximum amount of time to wait for, -1 waits forever
+        :param block_time: The maximum amount of time a single read blocks for
+        """
+        if not await self.exhausted():
+            return
+        eloop = self.loop
+        deadline = eloop.time() + max_time if max_time != -1 else None
+        home = self.home
+        self_logger_info = self.logger.info
+
+        while 1:
+            wait_time = block_time
+            if deadline is not None:
+                remaining = deadline - eloop.time()
+                if remaining <= 0:
+                    self_logger_info(logged_method, "timed out")
+                    return
+                wait_time = min(wait_time, remaining)
+            # the blocking read uses a connection of its own, as the commands sent using
+            # the pool share its connections and would wait for the read
+            with await home.redis as conn:
+                read = await conn.xread_group(
+                    STREAM_GROUP,
+                    self.crawler_id,
+                    [home.keys.queue_stream],
+                    timeout=max(int(wait_time * 1000), 1),
+                    count=1,
+                    latest_ids=[">"],
+                )
+            if read:
+                _, stream_id, fields = read[0]
+                self._prefetched.append(self._decode(home, stream_id, fields["e"]))
+                return
+            if not await self.exhausted():
+                return
+            self_logger_info(logged_method, "q still not populated waiting")
+
+    @staticmethod
+    def _decode(shard: FrontierShard, stream_id: str, raw: str) -> QueueEntry:
+        """Decodes the supplied entry claimed from the stream of the supplied shard
+
+        :param shard: The shard the entry was claimed from
+        :param stream_id: The id of the entry's stream message
+        :param raw: The entry
+        :return: The decoded entry
+        """
+        entry = QueueEntry.decode(raw)
+        entry.shard = shard.index
+        entry.stream_id = stream_id
+        return entry
+
+    @staticmethod
+    def _stream_keys(shard: FrontierShard) -> List[str]:
+        """Returns the keys of the supplied shard used by the stream scripts
+
+        :param shard: The shard
+        :return: The keys of the shard's stream, queue list, info hash and failed list
+        """
+        return [
+            shard.keys.queue_stream,
+            shard.keys.queue,
+            shard.keys.info,
+            shard.keys.failed,
+        ]
+
+    def __str__(self) -> str:
+        return f"StreamFrontier()"
@@ -0,0 +1,158 @@
+from hashlib import blake2b
+from typing import Dict, Optional, Tuple
+
+import attr
+from aioredis import Redis
+
+from autobrowser.automation import RedisKeys
+from .captures import canonical_url
+from .seen import url_fingerprint
+
+__all__ = ["PageValidators", "ValidatorStore"]
+
+#: The number of hashes the validators are distributed over, see CAPTURE_BUCKETS
+VALIDATOR_BUCKETS: int = 1 << 16
+
+
+def short_hash(value: str) -> str:
+    """Returns the 64bit hex digest of the supplied value or an empty string if
+    the value is empty
+
+    :param value: The value to be hashed
+    :return: The digest of the value
+    """
+    if not value:
+        return ""
+    return blake2b(value.encode("utf-8"), digest_size=8).hexdigest()
+
+
+@attr.dataclass(slots=True)
+class PageValidators:
+    """The validators of a crawled page used to detect if it has changed since
+    it was last crawled. The ETag and Last-Modified values are stored hashed as
+    they are only compared for equality.
+    """
+
+    #: The digest of the page's main document, empty if it was not known
+    digest: str = attr.ib(default="")
+    #: The hash of the ETag response header, empty if there was none
+    etag: str = attr.ib(default="")
+    #: The hash of the Last-Modified response header, empty if there was none
+    last_modified: str = attr.ib(default="")
+
+    @staticmethod
+    def from_response(
+        headers: Optional[Dict[str, str]], digest: str = ""
+    ) -> "PageValidators":
+        """Creates the validators of a page using its navigation response's headers
+
+        :param headers: The headers of the navigation response
+        :param digest: The digest of the page's main document, if known
+        :return: The page's validators
+        """
+        etag = last_modified = ""
+        for name, value in (headers or {}).items():
+            lower_name = name.lower()
+            if lower_name == "etag":
+                etag = value
+            elif lower_name == "last-modified":
+                last_modified = value
+        return PageValidators(digest, short_hash(etag), short_hash(last_modified))
+
+    @staticmethod
+    def decode(value: str) -> "PageValidators":
+        """Decodes the supplied stored validators
+
+        :param value: The validators as stored, `digest:etag:last_modified`
+        :return: The decoded validators
+        """
+        digest, etag, last_modified = value.split(":", 2)
+        return PageValidators(digest, etag, last_modified)
+
+    def encode(self) -> str:
+        """Returns the validators as stored
+
+        :return: The encoded validators
+        """
+        return f"{self.digest}:{self.etag}:{self.last_modified}"
+
+    def unchanged_since(self, previous: "PageValidators") -> bool:
+        """Returns T/F indicating if the page is unchanged since the crawl that
+        recorded the supplied validators.
+
+        The page is unchanged if its ETags match, or if neither crawl had an ETag
+        its Last-Modified values match, or its main document's digests match.
+
+        :param previous: The validators recorded by the previous crawl of the page
+        :return: T/F indicating if the page is unchanged
+        """
+        if self.digest and self.digest == previous.digest:
+            return True
+        if self.etag or previous.etag:
+            return self.etag == previous.etag
+        return (
+            bool(self.last_modified) and self.last_modified == previous.last_modified
+        )
+
+
+class ValidatorStore:
+    """The validators of the pages crawled by an automation, kept across crawls
+    of the automation so that recrawled pages that have not changed are detected.
+
+    Validators are keyed by the 64bit fingerprint of the page's canonicalized URL
+    and stored in the hashes a:{autoid}:validators:{bucket}, distributed over
+    VALIDATOR_BUCKETS hashes so that redis stores each hash compactly.
+    """
+
+    __slots__ = ["__weakref__", "key", "redis"]
+
+    def __init__(self, redis: Redis, keys: RedisKeys) -> None:
+        """Initialize the new instance of ValidatorStore
+
+        :param redis: The redis instance to be used
+        :param keys: The redis keys class containing the keys for the automation
+        """
+        self.redis: Redis = redis
+        self.key: str = keys.validators
+
+    def location(self, url: str) -> Tuple[str, int]:
+        """Returns the hash and field the validators of the supplied URL are stored in
+
+        :param url: The URL
+        :return: A tuple of the key of the hash and the field
+        """
+        fingerprint = url_fingerprint(canonical_url(url))
+        return f"{self.key}:{fingerprint % VALIDATOR_BUCKETS}", fingerprint
+
+    async def get(self, url: str) -> Optional[PageValidators]:
+        """Returns the validators recorded for the supplied URL, if any
+
+        :param url: The URL of the page
+        :return: The page's validators or None
+        """
+        value = await self.redis.hget(*self.location(url))
+        return PageValidators.decode(value) if value else None
+
+    async def swap(
+        self, url: str, validators: PageValidators
+    ) -> Optional[PageValidators]:
+        """Records the validators of the supplied URL returning the previously
+        recorded validators in a single round trip
+
+        :param url: The URL of the page
+        :param validators: The page's validators
+        :return: The page's previous validators or None
+        """
+        key, field = self.location(url)
+        pipeline = self.redis.pipeline()
+        previous = pipeline.hget(key, field)
+        pipeline.hset(key, field, validators.encode())
+        await pipeline.execute()
+        value = previous.result()
+        return PageValidators.decode(value) if value else None
+
+    def __str__(self) -> str:
+        return f"ValidatorStore(key={self.key})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
@@ -1,4 +1,5 @@
-from typing import Dict, List, Union
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Union
 
 from aioredis import Redis
 from ujson import loads
@@ -27,24 +28,29 @@ class RedisScope:
         "__weakref__",
         "_current_page",
         "all_links",
+        "inner_page_links",
         "keys",
         "logger",
         "redis",
         "rules",
     ]
 
-    def __init__(self, redis: Redis, keys: RedisKeys) -> None:
+    def __init__(self, redis: Optional[Redis], keys: RedisKeys) -> None:
         """Initialize the new instance of RedisScope
 
-        :param redis: The redis instance to be used
+        :param redis: The redis instance to be used, None when the
+        scope rules are supplied using load_rules
         :param keys: The redis keys class containing the keys for the automation
         """
-        self.redis: Redis = redis
+        self.redis: Optional[Redis] = redis
         self.keys: RedisKeys = keys
         self.rules: List[MatchRule] = []
         self.all_links: bool = False
         self.logger: AutoLogger = create_autologger("scope", "RedisScope")
         self._current_page: str = ""
+        #: The inner page links of the current page in the order they were discovered,
+        #: kept in process as they only concern the tab crawling the page
+        self.inner_page_links: "OrderedDict[str, None]" = OrderedDict()
 
     @property
     def current_page(self) -> str:
@@ -58,11 +64,19 @@ class RedisScope:
         If the retrieved scope rules is zero then all links are considered in scope.
         """
 
+        self.load_rules(await self.redis.smembers(self.keys.scope))
+
+    def load_rules(self, rules: Iterable[Union[str, Dict, MatchRule]]) -> None:
+        """Populates the rules list using the supplied scope rules.
+
+        If the number of scope rules is zero then all links are considered in scope.
+
+        :param rules: The scope rules of the automation
+        """
         add_rule = self.add_scope_rule
-        rules = await self.redis.smembers(self.keys.scope)
 
-        for scope_rule_str in rules:
-            add_rule(scope_rule_str)
+        for scope_rule in rules:
+            add_rule(scope_rule)
 
         num_rules = len(self.rules)
         self.all_links = num_rules == 0
@@ -121,6 +135,30 @@ class RedisScope:
         :param current_page: The URL to the page being crawled
         """
         self._current_page = strip_frag(current_page)
+        self.inner_page_links.clear()
+
+    def add_inner_page_link(self, url: str) -> bool:
+        """Adds the supplied URL to the inner page links of the current page
+        if it is an inner page link
+
+        :param url: The outlink URL to be tested
+        :return: T/F indicating if the supplied outlink URL is an inner page link
+        """
+        if url in self.inner_page_links:
+            return True
+        if self.is_inner_page_link(url):
+            self.inner_page_links[url] = None
+            return True
+        return False
+
+    def pop_inner_page_link(self) -> Optional[str]:
+        """Removes and returns the first discovered inner page link of the current page
+
+        :return: The inner page link or None if there are none
+        """
+        if not self.inner_page_links:
+            return None
+        return self.inner_page_links.popitem(last=False)[0]
 
     def __str__(self) -> str:
         return f"RedisScope(current_page={self._current_page}, all_links={self.all_links}, rules={len(self.rules)})"
@@ -1,17 +1,30 @@
 import time
-from asyncio import Task, gather
+from asyncio import CancelledError, Task, gather, sleep
 from enum import Enum, auto
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 
 from email.utils import parsedate
+from hashlib import blake2b
 import datetime
 
 import aiofiles
 from simplechrome import Frame, FrameManager, NavigationError, NetworkManager, Response
 
+from autobrowser.abcs import Frontier
 from autobrowser.automation import CloseReason
-from autobrowser.frontier import RedisFrontier
+from autobrowser.frontier import (
+    HostHealth,
+    HostRateLimiter,
+    PageValidators,
+    RedisFrontier,
+    SitemapFeeder,
+    ValidatorStore,
+    create_frontier,
+    host_health,
+    host_rate_limiter,
+    sitemap_feeder,
+)
 from autobrowser.util import Helper
 from .basetab import BaseTab
 
@@ -19,11 +32,19 @@ __all__ = ["CrawlerTab"]
 
 
 class NavigationResult(Enum):
-    """An enumeration representing the three possible outcomes of navigation"""
+    """An enumeration representing the possible outcomes of navigation"""
 
+    DUPLICATE = auto()
     EXIT_CRAWL_LOOP = auto()
     OK = auto()
+    PARKED = auto()
+    RETRY = auto()
     SKIP_URL = auto()
+    UNCHANGED = auto()
+
+
+#: The response statuses of transient failures, the URLs are retried after a backoff
+RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
 
 
 class CrawlerTab(BaseTab):
@@ -33,6 +54,10 @@ class CrawlerTab(BaseTab):
          - CRAWL_NO_NETCACHE: if present the network cache is disabled
          - WAIT_FOR_Q: if present the crawler will wait for the frontier q
             to be populated before starting the crawl loop.
+         - FRONTIER_PREFETCH: the number of URLs the frontier claims ahead of
+           the URL currently being crawled
+         - FRONTIER_BACKEND: the frontier backend to be used, redis (default), stream,
+           memory or sqlite
          - BEHAVIOR_RUN_TIME: an integer, that if present, will be used
            to set the maximum amount of time the behaviors action will
            be run for (in seconds). If not present the default time
@@ -40,6 +65,20 @@ class CrawlerTab(BaseTab):
          - OUTLINKS_EXPRESSION: the JS expression to be used for collecting outlinks
          - CLEAR_OUTLINKS_EXPRESSION: the JS expression to be used for clearing the
            collected outlinks
+         - CAPTURE_INDEX: if present the key prefix of the capture index shared by
+           automations, the pages crawled are recorded in it
+         - SKIP_UNCHANGED_PAGES: if present the validators of the pages crawled are
+           recorded and the behaviors of pages unchanged since they were last crawled
+           are not run
+         - HOST_RATE_LIMIT: if present the maximum number of requests per second
+           made to each host by all crawlers, before navigating to a page the crawler
+           waits until its host's rate allows
+         - ADAPTIVE_HOST_BACKOFF: if present the crawler backs off from hosts that
+           throttle it (429, 503) or slow down, parking their URLs
+         - FEED_SITEMAPS: if present the URLs listed by the sitemaps of the hosts
+           crawled, and allowed by their robots.txt, are added to the frontier
+         - DEDUPE_CANONICAL_LINKS: if present the canonical URL of the pages crawled
+           is marked as crawled along with their URL after any redirects
     """
 
     __slots__ = [
@@ -49,10 +88,15 @@ class CrawlerTab(BaseTab):
         "network",
         "crawl_loop_task",
         "frontier",
+        "host_health",
         "href_fn",
+        "rate_limiter",
+        "sitemap_feeder",
+        "validators",
         "_max_behavior_time",
         "_navigation_timeout",
         "_exit_crawl_loop",
+        "_sitemap_task",
     ]
 
     def __init__(self, *args, **kwargs) -> None:
@@ -66,9 +110,32 @@ class CrawlerTab(BaseTab):
         self.network: NetworkManager = None
         #: The crawling main loop
         self.crawl_loop_task: Optional[Task] = None
-        self.frontier: RedisFrontier = RedisFrontier(
+        self.frontier: Frontier = create_frontier(
             self.redis, config=self.config, loop=self.loop
         )
+        #: The validators of the crawled pages, used to detect unchanged pages
+        self.validators: Optional[ValidatorStore] = (
+            ValidatorStore(self.redis, self.config.redis_keys)
+            if self.config.skip_unchanged_pages and self.redis is not None
+            else None
+        )
+        #: Bounds the rate at which each host is navigated to by all crawlers
+        self.rate_limiter: Optional[HostRateLimiter] = host_rate_limiter(
+            self.redis, self.config, loop=self.loop
+        )
+        #: Tracks the health of the hosts navigated to, used to back off from them
+        self.host_health: Optional[HostHealth] = host_health(
+            self.redis, self.config, loop=self.loop
+        )
+        #: Feeds the URLs of the sitemaps of the hosts crawled to the frontier
+        self.sitemap_feeder: Optional[SitemapFeeder] = (
+            sitemap_feeder(self.frontier, self.session, self.config, loop=self.loop)
+            if self.config.feed_sitemaps
+            and self.session is not None
+            and isinstance(self.frontier, RedisFrontier)
+            else None
+        )
+        self._sitemap_task: Optional[Task] = None
         #: The maximum amount of time the crawler should run behaviors for
         self._max_behavior_time: Union[int, float] = self.config.max_behavior_time
         self._navigation_timeout: Union[int, float] = self.config.navigation_timeout
@@ -241,6 +308,17 @@ class CrawlerTab(BaseTab):
         if self._graceful_shutdown:
             await self.frontier.remove_current_from_pending()
 
+        try:
+            await self.frontier.release()
+        except Exception as e:
+            self.logger.exception(
+                logged_method, "releasing the frontier's claimed URLs failed", exc_info=e
+            )
+
+        if self._sitemap_task is not None and not self._sitemap_task.done():
+            self._sitemap_task.cancel()
+        self._sitemap_task = None
+
         await self.navigation_reset()
         self.crawl_loop_task = None
 
@@ -248,7 +326,8 @@ class CrawlerTab(BaseTab):
         if self._close_reason is None and is_frontier_exhausted:
             self._close_reason = CloseReason.CRAWL_END
 
-        await self.redis.lpush(self.config.redis_keys.auto_done, end_info)
+        if self.redis is not None:
+            await self.redis.lpush(self.config.redis_keys.auto_done, end_info)
         await super().close()
 
     def set_timestamp_from_response(self, response: Response) -> None:
@@ -291,10 +370,15 @@ class CrawlerTab(BaseTab):
         """
         self._url = url
         logged_method = f"goto"
+        if await self._host_parked(url):
+            return NavigationResult.PARKED
+        await self._wait_for_rate_limit(url)
+        started = self.loop.time()
         try:
             response = await self.frames.mainFrame.goto(
                 url, waitUntil=wait, timeout=self._navigation_timeout
             )
+            await self._record_host_health(url, response, started)
             self.set_timestamp_from_response(response)
             info = (
                 Helper.json_string(
@@ -308,7 +392,19 @@ class CrawlerTab(BaseTab):
             )
             self.logger.info(logged_method, f"we navigated to the page - {info}")
             self.frontier.crawling_new_page(self.main_frame.url)
-            return self._determine_navigation_result(response)
+            navigation_result = self._determine_navigation_result(response)
+            if navigation_result == NavigationResult.OK and await self._page_crawled(
+                url, response
+            ):
+                return NavigationResult.DUPLICATE
+            if navigation_result == NavigationResult.OK and (
+                self.validators is not None or self.config.capture_index
+            ):
+                digest = await self._page_digest(response)
+                await self._record_capture(url, digest)
+                if await self._page_unchanged(url, response, digest):
+                    navigation_result = NavigationResult.UNCHANGED
+            return navigation_result
         except NavigationError as ne:
             if ne.disconnected:
                 self.logger.critical(
@@ -317,8 +413,15 @@ class CrawlerTab(BaseTab):
                     exc_info=ne,
                 )
                 return NavigationResult.EXIT_CRAWL_LOOP
-            if ne.timeout or ne.response is not None:
+            if ne.response is not None or ne.timeout:
+                await self._record_host_health(url, ne.response, started)
+            if ne.response is not None:
                 return self._determine_navigation_result(ne.response)
+            if ne.timeout:
+                self.logger.info(
+                    logged_method, f"navigation timed out without a response for {url}"
+                )
+                return NavigationResult.RETRY
             self.logger.exception(
                 logged_method, f"navigation failed for {url}", exc_info=ne
             )
@@ -436,8 +539,13 @@ class CrawlerTab(BaseTab):
 
         Actions:
            - `EXIT_CRAWL_LOOP`: log and set the `_exit_crawl_loop` to True
+           - `RETRY`: log and return the URL to the frontier to be retried after a backoff
+           - `PARKED`: log, the URL was returned to the frontier as its host is backing off
            - `SKIP_URL`: log
-           - `OK`: log and run the page's behavior
+           - `DUPLICATE`: log, the page was already crawled under its URL after redirects
+           - `OK`: log, feed its host's sitemaps and run the page's behavior
+           - `UNCHANGED`: log, feed its host's sitemaps and collect the page's outlinks
+             without running its behavior
 
         The currently crawled URL is always updated in redis no matter what
         the navigation result is.
@@ -450,6 +558,7 @@ class CrawlerTab(BaseTab):
             self.logger.info(
                 logged_method, f"navigated to the next URL with no error - {url}"
             )
+            self._feed_sitemaps()
             await self.run_behavior()
 
         elif navigation_result == NavigationResult.EXIT_CRAWL_LOOP:
@@ -459,14 +568,85 @@ class CrawlerTab(BaseTab):
             )
             self._exit_crawl_loop = True
 
+        elif navigation_result == NavigationResult.RETRY:
+            self.logger.info(
+                logged_method, f"the URL navigated to is being retried - {url}"
+            )
+            try:
+                await self.frontier.retry_current()
+            except Exception as e:
+                self.logger.exception(
+                    logged_method, f"retrying the URL failed - {url}", exc_info=e
+                )
+
+        elif navigation_result == NavigationResult.PARKED:
+            self.logger.info(
+                logged_method,
+                f"the URL's host is backing off, the URL was parked - {url}",
+            )
+
         elif navigation_result == NavigationResult.SKIP_URL:
             self.logger.info(
                 logged_method, f"the URL navigated to is being skipped - {url}"
             )
 
+        elif navigation_result == NavigationResult.DUPLICATE:
+            self.logger.info(
+                logged_method,
+                f"the page was already crawled by the automation, not running its behavior - {url}",
+            )
+
+        elif navigation_result == NavigationResult.UNCHANGED:
+            self.logger.info(
+                logged_method,
+                f"the page is unchanged since it was last crawled, not running its behavior - {url}",
+            )
+            self._feed_sitemaps()
+            # the pages linked to may have changed even though this page has not
+            try:
+                await self.collect_outlinks_all_frames()
+            except Exception as e:
+                self.logger.exception(
+                    logged_method, "collecting the page's out links failed", exc_info=e
+                )
+
         # we remove from pending set when we run a behavior
         await self.frontier.remove_current_from_pending()
 
+    def _feed_sitemaps(self) -> None:
+        """Starts feeding the sitemaps of the current page's host to the frontier in
+        the background, if the automation feeds sitemaps and the host has not been fed.
+        Hosts are fed one at a time, the hosts crawled while feeding are fed when one of
+        their pages is next crawled
+        """
+        if self.sitemap_feeder is None or (
+            self._sitemap_task is not None and not self._sitemap_task.done()
+        ):
+            return
+        url = self.main_frame.url
+        frontier = self.sitemap_feeder.frontier
+        depth = frontier.next_depth()
+        if depth > frontier.crawl_depth or not self.sitemap_feeder.should_feed(url):
+            return
+        self._sitemap_task = self.loop.create_task(self._feed_sitemap(url, depth))
+
+    async def _feed_sitemap(self, url: str, depth: int) -> None:
+        """Feeds the sitemaps of the supplied URL's host to the frontier
+
+        :param url: The URL of the crawled page
+        :param depth: The depth the URLs of the sitemaps are to be crawled at
+        """
+        try:
+            await self.sitemap_feeder.feed(url, depth)
+        except CancelledError:
+            raise
+        except Exception as e:
+            self.logger.exception(
+                "_feed_sitemap",
+                f"feeding the sitemaps of the host of {url} failed",
+                exc_info=e,
+            )
+
     def _crawl_loop_running(self) -> bool:
         """Returns T/F indicating if the crawl loop is running (task not done)
 
@@ -489,6 +669,12 @@ class CrawlerTab(BaseTab):
                 f"we navigated somewhere but must skip the URL due to not having a navigation response",
             )
             return NavigationResult.SKIP_URL
+        if navigation_response.status in RETRY_STATUSES:
+            self.logger.info(
+                logged_method,
+                f"we navigated somewhere but the status was a transient failure - {navigation_response.status}",
+            )
+            return NavigationResult.RETRY
         if "html" in navigation_response.mimeType.lower():
             if navigation_response.ok:
                 return NavigationResult.OK
@@ -536,6 +722,12 @@ class CrawlerTab(BaseTab):
 
             next_url = await next_crawl_url()
 
+            if next_url is None:
+                log_info(
+                    logged_method, "exiting crawl loop, the frontier is exhausted"
+                )
+                break
+
             log_info(logged_method, f"navigating - {next_url}")
 
             navigation_result = await navigate_to_page(next_url)
@@ -555,6 +747,172 @@ class CrawlerTab(BaseTab):
             # coroutines can do their thing if they are waiting. e.g. shutdowns etc
             await one_tick_sleep()
 
+    async def _page_digest(self, response: Response) -> str:
+        """Returns the digest of the navigated to page's main document
+
+        :param response: The navigation response
+        :return: The digest of the page's main document or an empty string if
+        its content could not be retrieved
+        """
+        try:
+            return blake2b(await response.buffer(), digest_size=16).hexdigest()
+        except Exception as e:
+            self.logger.exception(
+                "_page_digest", "retrieving the page's content failed", exc_info=e
+            )
+        return ""
+
+    async def _page_unchanged(self, url: str, response: Response, digest: str) -> bool:
+        """Records the validators of the navigated to page returning T/F indicating
+        if the page is unchanged since it was last crawled
+
+        :param url: The URL navigated to
+        :param response: The navigation response
+        :param digest: The digest of the page's main document
+        :return: T/F indicating if the page is unchanged
+        """
+        if self.validators is None:
+            return False
+        logged_method = "_page_unchanged"
+        validators = PageValidators.from_response(response.headers, digest)
+        try:
+            previous = await self.validators.swap(url, validators)
+        except Exception as e:
+            self.logger.exception(
+                logged_method, f"recording the validators of {url} failed", exc_info=e
+            )
+            return False
+        return previous is not None and validators.unchanged_since(previous)
+
+    async def _page_crawled(self, url: str, response: Response) -> bool:
+        """Marks the navigated to page as crawled under its URL after any redirects,
+        and its canonical URL if the automation dedupes canonical links, returning
+        T/F indicating if the automation already crawled the page under its URL for
+        another claimed URL, e.g. another URL that redirected to it
+
+        :param url: The URL navigated to
+        :param response: The navigation response
+        :return: T/F indicating if the page was already crawled for another URL
+        """
+        logged_method = "_page_crawled"
+        page_url = response.url or url
+        aliases = []
+        if self.config.dedupe_canonical_links:
+            canonical = await self.evaluate_in_page(
+                self.config.canonical_link_expression
+            )
+            if (
+                isinstance(canonical, str)
+                and canonical.startswith(("http://", "https://"))
+                and canonical != page_url
+            ):
+                aliases.append(canonical)
+        try:
+            return not await self.frontier.mark_crawled(page_url, aliases)
+        except Exception as e:
+            self.logger.exception(
+                logged_method, f"marking {page_url} as crawled failed", exc_info=e
+            )
+        return False
+
+    async def _record_capture(self, url: str, digest: str) -> None:
+        """Records the capture of the navigated to page, under both the URL navigated
+        to and the URL of the page if it was redirected, when the automation uses a
+        capture index
+
+        :param url: The URL navigated to
+        :param digest: The digest of the page's main document
+        """
+        if not self.config.capture_index:
+            return
+        logged_method = "_record_capture"
+        try:
+            await self.frontier.record_capture(url, digest)
+            if self.main_frame.url != url:
+                await self.frontier.record_capture(self.main_frame.url, digest)
+        except Exception as e:
+            self.logger.exception(
+                logged_method, f"recording the capture of {url} failed", exc_info=e
+            )
+
+    async def _host_parked(self, url: str) -> bool:
+        """Waits for the turn of the supplied URL's host if it is backing off, parking
+        the URL in the frontier if the host is parked
+
+        :param url: The URL to be navigated to
+        :return: T/F indicating if the URL was parked, or returned to the frontier
+        already, rather than navigated to
+        """
+        if self.host_health is None:
+            return False
+        logged_method = "_host_parked"
+        try:
+            parked_for = await self.host_health.acquire(url)
+            if parked_for <= 0:
+                return False
+            if await self.frontier.park_current(parked_for):
+                return True
+            # the frontier can not park URLs so we wait out the host's backoff instead
+            self.logger.info(
+                logged_method,
+                f"waiting {parked_for:.1f} seconds for the host of {url} to be unparked",
+            )
+            await sleep(parked_for, loop=self.loop)
+        except CancelledError:
+            raise
+        except Exception as e:
+            self.logger.exception(
+                logged_method,
+                f"checking the health of the host of {url} failed, navigating without it",
+                exc_info=e,
+            )
+        return False
+
+    async def _record_host_health(
+        self, url: str, response: Optional[Response], started: float
+    ) -> None:
+        """Records the outcome of the navigation to the supplied URL in the health of
+        its host, if the automation backs off from hosts adaptively
+
+        :param url: The URL navigated to
+        :param response: The navigation response, None if the navigation timed out
+        :param started: The time of the event loop the navigation started at
+        """
+        if self.host_health is None:
+            return
+        try:
+            await self.host_health.record(
+                url,
+                response.status if response is not None else None,
+                self.loop.time() - started,
+                response.headers if response is not None else None,
+            )
+        except Exception as e:
+            self.logger.exception(
+                "_record_host_health",
+                f"recording the health of the host of {url} failed",
+                exc_info=e,
+            )
+
+    async def _wait_for_rate_limit(self, url: str) -> None:
+        """Waits until the rate limit of the supplied URL's host allows navigating
+        to it, if the automation limits the rate of hosts
+
+        :param url: The URL to be navigated to
+        """
+        if self.rate_limiter is None:
+            return
+        try:
+            await self.rate_limiter.acquire(url)
+        except CancelledError:
+            raise
+        except Exception as e:
+            self.logger.exception(
+                "_wait_for_rate_limit",
+                f"acquiring the rate limit of {url} failed, navigating without it",
+                exc_info=e,
+            )
+
     async def _post_run_behavior(self) -> None:
         """Performs the actions the crawler is configured to perform once a behavior has run"""
         await self._visit_inner_page_links()
@@ -1,4 +1,5 @@
 from .helper import Helper
 from .loggers import AutoLogger, RootLogger, create_autologger
+from .redis_script import RedisScript
 
-__all__ = ["AutoLogger", "Helper", "RootLogger", "create_autologger"]
+__all__ = ["AutoLogger", "Helper", "RedisScript", "RootLogger", "create_autologger"]
@@ -0,0 +1,50 @@
+from hashlib import sha1
+from typing import Any, List, Optional
+
+from aioredis import Redis, ReplyError
+
+__all__ = ["RedisScript"]
+
+
+class RedisScript:
+    """Utility class for executing a server side lua script using EVALSHA,
+    falling back to EVAL (which caches the script) when redis does not know
+    the script yet"""
+
+    __slots__ = ["__weakref__", "script", "sha"]
+
+    def __init__(self, script: str) -> None:
+        """Initialize the new instance of RedisScript
+
+        :param script: The lua source of the script
+        """
+        self.script: str = script
+        self.sha: str = sha1(script.encode("utf-8")).hexdigest()
+
+    async def __call__(
+        self,
+        redis: Redis,
+        keys: Optional[List[str]] = None,
+        args: Optional[List[Any]] = None,
+    ) -> Any:
+        """Executes the script using the supplied redis instance
+
+        :param redis: The redis instance to be used
+        :param keys: The keys the script operates on
+        :param args: The arguments to the script
+        :return: The return value of the script
+        """
+        keys = keys or []
+        args = args or []
+        try:
+            return await redis.evalsha(self.sha, keys=keys, args=args)
+        except ReplyError as e:
+            if not str(e).startswith("NOSCRIPT"):
+                raise
+        return await redis.eval(self.script, keys=keys, args=args)
+
+    def __str__(self) -> str:
+        return f"RedisScript(sha={self.sha})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
@@ -1,11 +1,19 @@
-from typing import Dict
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
 
 import pytest
 from _pytest.fixtures import SubRequest
 import uvloop
+from aioredis import Redis, RedisError, create_redis_pool
 from ruamel.yaml import YAML
 from pathlib import Path
 
+from autobrowser.automation import build_automation_config
+from autobrowser.frontier import RedisFrontier, close_shard_pools, drop_admission_caches
+
+#: The redis database flushed and used by the tests that need redis
+TEST_REDIS_URL: str = os.environ.get("TEST_REDIS_URL", "redis://localhost/15")
+
 
 @pytest.yield_fixture()
 def event_loop():
@@ -24,3 +32,40 @@ def behavior_manager_config(request: SubRequest) -> Dict:
     if request.cls:
         request.cls.config = config
     return config
+
+
+@pytest.fixture
+def redis_url() -> str:
+    return TEST_REDIS_URL
+
+
+@pytest.fixture
+async def redis(redis_url: str, event_loop) -> AsyncIterator[Redis]:
+    try:
+        redis = await create_redis_pool(redis_url, loop=event_loop, encoding="utf-8")
+    except (OSError, RedisError):
+        pytest.skip(f"redis is not available at {redis_url}")
+    await redis.flushdb()
+    yield redis
+    drop_admission_caches()
+    await close_shard_pools()
+    await redis.flushdb()
+    redis.close()
+    await redis.wait_closed()
+
+
+@pytest.fixture
+def create_frontier(
+    redis: Redis, redis_url: str, event_loop
+) -> Callable[..., Awaitable[RedisFrontier]]:
+    async def create(
+        info: Dict[str, Any], frontier_class=RedisFrontier, **options: Any
+    ) -> RedisFrontier:
+        options.setdefault("autoid", "test")
+        config = build_automation_config(reqid="test", redis_url=redis_url, **options)
+        await redis.hmset_dict(config.redis_keys.info, dict(crawl_depth=2, **info))
+        frontier = frontier_class(redis, config, loop=event_loop)
+        await frontier.load()
+        return frontier
+
+    return create
@@ -1,13 +1,18 @@
 import asyncio
 import logging
-import ujson
 from asyncio import AbstractEventLoop
 
 import aioredis
 import uvloop
 from aioredis import Redis
 
-from autobrowser import build_automation_config, LocalBrowserDiver, run_automation
+from autobrowser import (
+    AutomationConfig,
+    build_automation_config,
+    LocalBrowserDiver,
+    run_automation,
+)
+from autobrowser.frontier import SeedImportStats, admit_seed_batch, create_frontier
 
 try:
     uvloop.install()
@@ -92,12 +97,11 @@ async def reset_redis(
     else:
         await redis.delete(q_key, info_key, seen_key, scope_key, done_key),
     await redis.hset(info_key, "crawl_depth", 2),
-    for url in default_seed_list:
-        await asyncio.gather(
-            redis.rpush(q_key, ujson.dumps({"url": url, "depth": 0})),
-            redis.sadd(seen_key, url),
-            loop=loop,
-        )
+    frontier = create_frontier(
+        redis, AutomationConfig(autoid=dummy_auto_id, reqid="seed-import"), loop=loop
+    )
+    await frontier.load()
+    await admit_seed_batch(frontier, default_seed_list, SeedImportStats())
     # await redis.hset(info_key, "browser_overrides", ujson.dumps({
     #     "accept_language": "fr-CH, fr;q=0.9, en;q=0.8, de;q=0.7, *;q=0.5"
     # }))
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import logging
+import time
+
+import aioredis
+
+from autobrowser import AutomationConfig, run_automation
+from autobrowser.frontier import (
+    close_shard_pools,
+    create_frontier_shards,
+    export_frontier,
+    import_frontier,
+)
+
+logger = logging.getLogger("autobrowser")
+logger.setLevel(logging.INFO)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Exports an automation's frontier to a snapshot file or imports a snapshot file into an automation's frontier"
+    )
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("autoid", help="The id of the automation")
+    parser.add_argument("path", help="The path of the snapshot file")
+    parser.add_argument("--redis-url", default="redis://localhost")
+    parser.add_argument(
+        "--redis-shard-urls",
+        default="",
+        help="A comma separated list of the redis URLs of the additional frontier shards",
+    )
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument(
+        "--replace",
+        action="store_true",
+        help="Delete the automation's existing keys before importing",
+    )
+    return parser.parse_args()
+
+
+async def snapshot(args: argparse.Namespace) -> int:
+    loop = asyncio.get_event_loop()
+    config = AutomationConfig(
+        autoid=args.autoid,
+        redis_url=args.redis_url,
+        redis_shard_urls=args.redis_shard_urls,
+    )
+    redis = await aioredis.create_redis(args.redis_url, loop=loop, encoding="utf-8")
+    start = time.monotonic()
+    try:
+        shards = await create_frontier_shards(redis, config, "snapshot", loop=loop)
+        if args.action == "export":
+            num_keys = await export_frontier(
+                shards, args.path, batch_size=args.batch_size
+            )
+            logger.info(f"exported {num_keys} keys to {args.path}")
+        else:
+            num_items = await import_frontier(
+                shards, args.path, batch_size=args.batch_size, replace=args.replace
+            )
+            logger.info(f"imported {num_items} items from {args.path}")
+        logger.info(f"took {time.monotonic() - start:.2f} seconds")
+    finally:
+        await close_shard_pools()
+        redis.close()
+        await redis.wait_closed()
+    return 0
+
+
+if __name__ == "__main__":
+    run_automation(snapshot(parse_args()))
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import logging
+
+import aioredis
+
+from autobrowser import AutomationConfig, run_automation
+from autobrowser.frontier import (
+    close_shard_pools,
+    create_frontier,
+    import_seeds,
+    read_seed_urls,
+)
+
+logger = logging.getLogger("autobrowser")
+logger.setLevel(logging.INFO)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Imports the seeds of a file, one URL per line, into an automation's frontier"
+    )
+    parser.add_argument("autoid", help="The id of the automation")
+    parser.add_argument(
+        "path", help="The path of the seed file, gzip compressed or not, - for stdin"
+    )
+    parser.add_argument("--redis-url", default="redis://localhost")
+    parser.add_argument(
+        "--redis-shard-urls",
+        default="",
+        help="A comma separated list of the redis URLs of the additional frontier shards",
+    )
+    parser.add_argument("--backend", choices=["redis", "stream"], default="redis")
+    parser.add_argument(
+        "--spill-dir", default=None, help="The automation's FRONTIER_SPILL_DIR, if any"
+    )
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="The number of batches in flight"
+    )
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=10,
+        help="How often, in seconds, the progress is logged",
+    )
+    parser.add_argument(
+        "--no-canonicalize",
+        action="store_true",
+        help="Import the seeds as they are rather than canonicalized",
+    )
+    return parser.parse_args()
+
+
+async def seed(args: argparse.Namespace) -> int:
+    loop = asyncio.get_event_loop()
+    config = AutomationConfig(
+        autoid=args.autoid,
+        reqid="seed-import",
+        redis_url=args.redis_url,
+        redis_shard_urls=args.redis_shard_urls,
+        frontier_backend=args.backend,
+        frontier_spill_dir=args.spill_dir,
+    )
+    redis = await aioredis.create_redis(args.redis_url, loop=loop, encoding="utf-8")
+    try:
+        frontier = create_frontier(redis, config, loop=loop)
+        await frontier.load()
+        await import_seeds(
+            frontier,
+            read_seed_urls(args.path),
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            progress_interval=args.progress_interval,
+            canonicalize=not args.no_canonicalize,
+        )
+    finally:
+        await close_shard_pools()
+        redis.close()
+        await redis.wait_closed()
+    return 0
+
+
+if __name__ == "__main__":
+    run_automation(seed(parse_args()))
@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import logging
+
+import aioredis
+
+from autobrowser import AutomationConfig, run_automation
+from autobrowser.frontier import migrate_seen_set
+
+logger = logging.getLogger("autobrowser")
+logger.setLevel(logging.INFO)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Converts an automation's plain seen set to a compact encoding"
+    )
+    parser.add_argument("autoid", help="The id of the automation")
+    parser.add_argument(
+        "encoding", choices=["fingerprint", "bloom"], help="The new seen set encoding"
+    )
+    parser.add_argument("--redis-url", default="redis://localhost")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument(
+        "--error-rate", type=float, default=None, help="The bloom filter error rate"
+    )
+    parser.add_argument(
+        "--capacity", type=int, default=None, help="The bloom filter initial capacity"
+    )
+    parser.add_argument(
+        "--delete-plain",
+        action="store_true",
+        help="Delete the plain seen set once converted",
+    )
+    return parser.parse_args()
+
+
+async def migrate(args: argparse.Namespace) -> int:
+    loop = asyncio.get_event_loop()
+    redis = await aioredis.create_redis(args.redis_url, loop=loop, encoding="utf-8")
+    keys = AutomationConfig(autoid=args.autoid).redis_keys
+    try:
+        num_converted = await migrate_seen_set(
+            redis,
+            keys,
+            args.encoding,
+            batch_size=args.batch_size,
+            delete_plain=args.delete_plain,
+            error_rate=args.error_rate,
+            capacity=args.capacity,
+        )
+        logger.info(f"converted {num_converted} URLs to the {args.encoding} encoding")
+    finally:
+        redis.close()
+        await redis.wait_closed()
+    return 0
+
+
+if __name__ == "__main__":
+    run_automation(migrate(parse_args()))
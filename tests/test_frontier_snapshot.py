@@ -0,0 +1,76 @@
+import pytest
+
+from autobrowser.frontier import export_frontier, import_frontier
+
+URLS = [f"http://example.com/{i}" for i in range(10)]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_restores_the_queue_and_seen_set(create_frontier, tmp_path):
+    frontier = await create_frontier({}, frontier_prefetch=0)
+    await frontier.admit(URLS, 1)
+    crawled = await frontier.next_url()
+    await frontier.remove_current_from_pending()
+    await frontier.release()
+    path = str(tmp_path / "snapshot.gz")
+    assert await export_frontier(frontier.shards, path) > 0
+
+    restored = await create_frontier({}, autoid="restored", frontier_prefetch=0)
+    assert await import_frontier(restored.shards, path, replace=True) > 0
+    await restored.load()
+    assert await restored.q_len() == 9
+    assert all([await restored.is_seen(url) for url in URLS])
+    url = await restored.next_url()
+    assert url in URLS and url != crawled
+
+
+@pytest.mark.asyncio
+async def test_snapshot_queues_the_spilled_urls(create_frontier, tmp_path):
+    frontier = await create_frontier(
+        {},
+        frontier_spill_dir=str(tmp_path / "spill"),
+        frontier_hot_size=2,
+        frontier_spill_segment_size=3,
+    )
+    await frontier.admit(URLS, 1)
+    await frontier.balance_spilled()
+    path = str(tmp_path / "snapshot.gz")
+    await export_frontier(frontier.shards, path)
+
+    restored = await create_frontier({}, autoid="restored")
+    await import_frontier(restored.shards, path, replace=True)
+    assert await restored.redis.llen(restored.keys.queue) == 10
+    assert await restored.q_len() == 10
+
+
+@pytest.mark.asyncio
+async def test_import_requires_replace_for_a_frontier_with_keys(
+    create_frontier, tmp_path
+):
+    frontier = await create_frontier({})
+    await frontier.admit(URLS, 1)
+    path = str(tmp_path / "snapshot.gz")
+    await export_frontier(frontier.shards, path)
+    with pytest.raises(ValueError):
+        await import_frontier(frontier.shards, path)
+    assert await import_frontier(frontier.shards, path, replace=True) > 0
+    assert await frontier.q_len() == 10
+
+
+@pytest.mark.asyncio
+async def test_snapshot_skips_keys_with_a_ttl(redis, create_frontier, tmp_path):
+    frontier = await create_frontier({}, frontier_prefetch=0)
+    await frontier.admit(URLS, 1)
+    assert await frontier.next_url() in URLS
+    feeding_key = f"{frontier.keys.sitemaps}:feeding:http://example.com"
+    await redis.set(feeding_key, 1, expire=60)
+    path = str(tmp_path / "snapshot.gz")
+    await export_frontier(frontier.shards, path)
+
+    restored = await create_frontier({}, autoid="restored")
+    await import_frontier(restored.shards, path, replace=True)
+    assert await redis.exists(restored.keys.pending_leases)
+    assert not await redis.exists(
+        f"{restored.keys.sitemaps}:feeding:http://example.com"
+    )
+    assert not await redis.exists(restored.keys.leased_by(frontier.crawler_id))
@@ -0,0 +1,66 @@
+from urllib.parse import urlsplit
+
+import pytest
+
+from autobrowser.frontier import MemoryQueue, QueueEntry
+
+
+def queue_entry(url: str) -> QueueEntry:
+    return QueueEntry(url, 0, host=urlsplit(url).hostname)
+
+
+@pytest.mark.asyncio
+async def test_memory_queue_waits_for_the_host_delay(event_loop):
+    queue = MemoryQueue({"host_delay": 60}, loop=event_loop)
+    for url in ("http://a.com/1", "http://a.com/2", "http://b.com/1"):
+        queue.push(queue_entry(url))
+    first, _ = queue.pop()
+    second, _ = queue.pop()
+    assert {first.host, second.host} == {"a.com", "b.com"}
+    entry, wait = queue.pop()
+    assert entry is None
+    assert 59 < wait <= 60
+
+
+@pytest.mark.asyncio
+async def test_memory_queue_parks_hosts_at_max_concurrency(event_loop):
+    queue = MemoryQueue({"host_max_concurrency": 1}, loop=event_loop)
+    for url in ("http://a.com/1", "http://a.com/2"):
+        queue.push(queue_entry(url))
+    first, _ = queue.pop()
+    assert first.url == "http://a.com/1"
+    assert queue.pop() == (None, 0)
+    queue.complete(first)
+    second, _ = queue.pop()
+    assert second.url == "http://a.com/2"
+
+
+@pytest.mark.asyncio
+async def test_crawlers_do_not_share_a_host_at_max_concurrency(create_frontier):
+    info = {"host_max_concurrency": 1}
+    first = await create_frontier(info, frontier_prefetch=0)
+    second = await create_frontier(info, frontier_prefetch=0)
+    await first.admit(["http://a.com/1", "http://a.com/2", "http://b.com/1"], 1)
+    first_url = await first.next_url()
+    second_url = await second.next_url()
+    assert urlsplit(first_url).hostname != urlsplit(second_url).hostname
+    assert await first.q_len() == 1
+    await first.release()
+    await second.release()
+
+
+@pytest.mark.asyncio
+async def test_queue_len_is_counted_not_scanned(redis, create_frontier):
+    frontier = await create_frontier({"host_max_concurrency": 5})
+    await frontier.admit([f"http://h{i % 3}.com/{i}" for i in range(10)], 1)
+    assert await frontier.q_len() == 10
+    assert await redis.get(f"{frontier.keys.queue}:queued") == "10"
+    for _ in range(4):
+        assert await frontier.next_url() is not None
+        await frontier.remove_current_from_pending()
+    # the prefetched URL is claimed too
+    assert await frontier.q_len() == 5
+    await redis.delete(f"{frontier.keys.queue}:queued")
+    assert await frontier.q_len() == 5
+    await frontier.release()
+    assert await frontier.q_len() == 6
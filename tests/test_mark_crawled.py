@@ -0,0 +1,22 @@
+import pytest
+
+from autobrowser.frontier.seen import url_fingerprint
+
+
+@pytest.mark.asyncio
+async def test_pages_crawled_for_another_url_are_duplicates(redis, create_frontier):
+    frontier = await create_frontier({}, frontier_prefetch=0)
+    await frontier.admit(["http://example.com/a", "http://example.com/b"], 1)
+    assert await frontier.next_url() == "http://example.com/a"
+    # a redirected to b
+    assert await frontier.mark_crawled("http://example.com/b")
+    # the claimed URL is recorded by its fingerprint
+    assert await redis.hget(frontier.keys.crawled, "http://example.com/b") == str(
+        url_fingerprint("http://example.com/a")
+    )
+    assert await frontier.mark_crawled("http://example.com/b")
+    await frontier.remove_current_from_pending()
+    assert await frontier.next_url() == "http://example.com/b"
+    assert not await frontier.mark_crawled("http://example.com/b")
+    await frontier.remove_current_from_pending()
+    await frontier.release()
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from autobrowser.automation import build_automation_config
+from autobrowser.frontier import (
+    AdmissionResult,
+    MemoryFrontier,
+    MemoryQueue,
+    QueueEntry,
+    drop_memory_queue,
+)
+
+
+@pytest.fixture
+async def frontier(event_loop):
+    config = build_automation_config(
+        autoid="memory-test",
+        reqid="test",
+        frontier_backend="memory",
+        frontier_info={
+            "crawl_depth": 2,
+            "max_retries": 1,
+            "seeds": ["http://example.com/"],
+        },
+    )
+    frontier = MemoryFrontier(None, config, loop=event_loop)
+    await frontier.init()
+    yield frontier
+    drop_memory_queue(config)
+
+
+@pytest.mark.asyncio
+async def test_memory_queue_pops_fifo_then_buckets_then_hosts(event_loop):
+    queue = MemoryQueue({}, loop=event_loop)
+    queue.push(QueueEntry("http://h.com/", 0, host="h.com"))
+    queue.push(QueueEntry("http://p2.com/", 0, prio=2))
+    queue.push(QueueEntry("http://p1.com/", 0, prio=1))
+    queue.push(QueueEntry("http://fifo.com/", 0))
+    popped = [queue.pop()[0].url for _ in range(4)]
+    assert popped == [
+        "http://fifo.com/",
+        "http://p1.com/",
+        "http://p2.com/",
+        "http://h.com/",
+    ]
+    assert queue.pop() == (None, -1)
+
+
+@pytest.mark.asyncio
+async def test_memory_queue_returns_due_retries_to_the_head_of_their_queue(event_loop):
+    queue = MemoryQueue({}, loop=event_loop)
+    queue.push(QueueEntry("http://example.com/1", 0))
+    queue.push(QueueEntry("http://example.com/2", 0))
+    retried, _ = queue.pop()
+    assert queue.retry(retried, 0.01, 1) == 0.01
+    entry, _ = queue.pop()
+    assert entry.url == "http://example.com/2"
+    entry, wait = queue.pop()
+    assert entry is None and 0 < wait < 0.011
+    await asyncio.sleep(0.02)
+    entry, _ = queue.pop()
+    assert entry.url == "http://example.com/1"
+
+
+@pytest.mark.asyncio
+async def test_memory_frontier_admits_unseen_urls_once(frontier):
+    admitted = await frontier.admit(
+        ["http://example.com/", "http://example.com/a", "http://example.com/a"], 1
+    )
+    assert [result for _, result in admitted] == [
+        AdmissionResult.SEEN,
+        AdmissionResult.ADDED,
+        AdmissionResult.SEEN,
+    ]
+    assert await frontier.q_len() == 2
+    assert await frontier.next_url() == "http://example.com/"
+    await frontier.remove_current_from_pending()
+    assert await frontier.next_url() == "http://example.com/a"
+    await frontier.remove_current_from_pending()
+    assert await frontier.next_url() is None
+    assert await frontier.exhausted()
+
+
+@pytest.mark.asyncio
+async def test_memory_frontier_fails_urls_abandoned_too_many_times(frontier):
+    assert await frontier.next_url() == "http://example.com/"
+    await frontier.release()
+    assert await frontier.q_len() == 1
+    assert await frontier.next_url() == "http://example.com/"
+    await frontier.release()
+    assert await frontier.q_len() == 0
+    assert [entry.url for entry in frontier.queue.failed] == ["http://example.com/"]
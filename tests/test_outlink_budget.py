@@ -0,0 +1,99 @@
+import pytest
+
+from autobrowser.frontier import AdmissionResult, OutlinkBudget
+from autobrowser.frontier.budget import admit_within_budget, path_template
+
+
+def test_path_template_replaces_ids_and_numbers():
+    assert path_template("http://example.com/post/2024/01/42") == (
+        "example.com/post/{n}/{n}/{n}"
+    )
+    assert path_template(
+        "http://example.com/item/0123456789abcdef0123"
+    ) == path_template("http://example.com/item/fedcba9876543210fedc")
+
+
+def test_outlink_budget_ranks_same_host_shallow_new_templates_first():
+    budget = OutlinkBudget(page_budget=10)
+    budget.crawling_new_page("http://example.com/")
+    ranked = budget.rank(
+        [
+            "http://other.com/a",
+            "http://example.com/a/b/c",
+            "http://example.com/page/1",
+            "http://example.com/page/2",
+            "http://example.com/about",
+            "http://example.com/about",
+        ]
+    )
+    assert ranked == [
+        "http://example.com/about",
+        "http://example.com/page/1",
+        "http://example.com/a/b/c",
+        "http://example.com/page/2",
+        "http://other.com/a",
+    ]
+
+
+def test_outlink_budget_takes_within_page_and_host_budgets():
+    budget = OutlinkBudget(page_budget=3, host_budget=2)
+    budget.crawling_new_page("http://example.com/")
+    ranked = [
+        "http://example.com/a",
+        "http://example.com/b",
+        "http://example.com/c",
+        "http://other.com/a",
+        "http://third.com/a",
+    ]
+    offered, held_back = budget.take(ranked)
+    assert offered == [
+        "http://example.com/a",
+        "http://example.com/b",
+        "http://other.com/a",
+    ]
+    assert held_back == ["http://example.com/c", "http://third.com/a"]
+
+    budget.record([("http://example.com/a", AdmissionResult.ADDED)])
+    budget.record([("http://example.com/b", AdmissionResult.SEEN)])
+    assert budget.remaining == 2
+    offered, held_back = budget.take(held_back)
+    assert offered == ["http://example.com/c", "http://third.com/a"]
+    assert held_back == []
+
+    assert OutlinkBudget().take(ranked) == (ranked, [])
+    assert not OutlinkBudget().enabled
+
+
+@pytest.mark.asyncio
+async def test_admit_within_budget_offers_rounds_until_the_budget_is_spent():
+    seen = {"http://example.com/a", "http://example.com/b"}
+    probed = {"http://example.com/a"}
+    offers = []
+
+    async def admit(urls, depth):
+        offers.append(list(urls))
+        return [
+            (url, AdmissionResult.SEEN if url in seen else AdmissionResult.ADDED)
+            for url in urls
+        ]
+
+    async def probe(urls):
+        return [AdmissionResult.SEEN if url in probed else None for url in urls]
+
+    budget = OutlinkBudget(page_budget=2)
+    budget.crawling_new_page("http://example.com/")
+    urls = [f"http://example.com/{name}" for name in "abcde"]
+    admitted = await admit_within_budget(admit, budget, urls, 1, probe=probe)
+
+    # the probed rejection is never offered, the seen outlink does not count
+    assert offers == [
+        ["http://example.com/b", "http://example.com/c"],
+        ["http://example.com/d"],
+    ]
+    assert dict(admitted) == {
+        "http://example.com/a": AdmissionResult.SEEN,
+        "http://example.com/b": AdmissionResult.SEEN,
+        "http://example.com/c": AdmissionResult.ADDED,
+        "http://example.com/d": AdmissionResult.ADDED,
+    }
+    assert budget.stats() == dict(page="http://example.com/", admitted=2, dropped=1)
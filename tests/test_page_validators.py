@@ -0,0 +1,49 @@
+import pytest
+
+from autobrowser.automation import RedisKeys, build_automation_config
+from autobrowser.frontier import PageValidators, ValidatorStore
+
+
+def test_page_validators_from_response_ignores_header_case():
+    validators = PageValidators.from_response(
+        {"ETAG": '"v1"', "last-modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    )
+    assert validators == PageValidators.from_response(
+        {"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}
+    )
+    assert validators.etag and validators.last_modified and not validators.digest
+    assert PageValidators.decode(validators.encode()) == validators
+    assert PageValidators.from_response(None) == PageValidators()
+
+
+def test_page_validators_unchanged_since():
+    etag_v1 = PageValidators.from_response({"ETag": '"v1"', "Last-Modified": "a"})
+    etag_v2 = PageValidators.from_response({"ETag": '"v2"', "Last-Modified": "a"})
+    modified_a = PageValidators.from_response({"Last-Modified": "a"})
+    modified_b = PageValidators.from_response({"Last-Modified": "b"})
+
+    assert etag_v1.unchanged_since(etag_v1)
+    # a changed ETag wins over an unchanged Last-Modified
+    assert not etag_v2.unchanged_since(etag_v1)
+    # Last-Modified is only compared when neither crawl had an ETag
+    assert not modified_a.unchanged_since(etag_v1)
+    assert modified_a.unchanged_since(modified_a)
+    assert not modified_b.unchanged_since(modified_a)
+    # matching digests are unchanged whatever the headers say
+    assert PageValidators("d", etag_v2.etag).unchanged_since(
+        PageValidators("d", etag_v1.etag)
+    )
+    assert not PageValidators().unchanged_since(PageValidators())
+
+
+@pytest.mark.asyncio
+async def test_validator_store_swaps_validators(redis):
+    keys = RedisKeys(build_automation_config(autoid="test", reqid="test"))
+    store = ValidatorStore(redis, keys)
+    validators = PageValidators.from_response({"ETag": '"v1"'})
+    assert await store.swap("http://example.com/", validators) is None
+    # the validators are keyed by the canonicalized URL
+    assert await store.get("http://EXAMPLE.com") == validators
+    changed = PageValidators.from_response({"ETag": '"v2"'})
+    assert await store.swap("http://example.com/", changed) == validators
+    assert await store.get("http://example.com/") == changed
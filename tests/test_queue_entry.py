@@ -0,0 +1,35 @@
+from autobrowser.frontier import QueueEntry
+
+
+def test_decode_tab_separated_entry():
+    raw = "7\t2\t\t\thttp://example.com/a\tb"
+    entry = QueueEntry.decode(raw)
+    assert entry == QueueEntry("http://example.com/a\tb", 2, "7", None, None, raw)
+
+
+def test_encoded_entry_decodes_once_referred():
+    encoded = QueueEntry.encode_unreferred("http://example.com/", 1, 3, "example.com")
+    entry = QueueEntry.decode(f"12\t{encoded}")
+    assert (entry.url, entry.depth, entry.referrer, entry.prio, entry.host) == (
+        "http://example.com/",
+        1,
+        "12",
+        3,
+        "example.com",
+    )
+
+
+def test_unreferred_entry_omits_unused_fields():
+    assert QueueEntry.encode_unreferred("http://example.com/", 0) == (
+        "0\t\t\thttp://example.com/"
+    )
+
+
+def test_decode_json_entry():
+    raw = '{"url": "http://example.com/", "depth": 1, "page": "http://example.com/p"}'
+    entry = QueueEntry.decode(raw)
+    assert entry.url == "http://example.com/"
+    assert entry.depth == 1
+    assert entry.referrer == "http://example.com/p"
+    assert entry.prio is None and entry.host is None
+    assert entry.raw == raw
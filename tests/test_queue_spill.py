@@ -0,0 +1,69 @@
+import pytest
+
+from autobrowser.frontier import QueueSpiller
+from autobrowser.frontier.scripts import SPILL_SCRIPT
+
+URLS = [f"http://example.com/{i}" for i in range(10)]
+
+
+@pytest.fixture
+async def frontier(create_frontier, tmp_path):
+    frontier = await create_frontier(
+        {},
+        frontier_prefetch=0,
+        frontier_spill_dir=str(tmp_path),
+        frontier_hot_size=2,
+        frontier_spill_segment_size=3,
+    )
+    await frontier.admit(URLS, 1)
+    await frontier.balance_spilled()
+    return frontier
+
+
+@pytest.mark.asyncio
+async def test_spilled_urls_are_counted_as_queued(redis, frontier, tmp_path):
+    keys = frontier.keys
+    assert await redis.llen(keys.queue) <= 5
+    assert await redis.get(f"{keys.queue_spilled}:count") == str(
+        10 - await redis.llen(keys.queue)
+    )
+    assert len(list(tmp_path.rglob("*.seg.gz"))) == await redis.llen(keys.queue_spilled)
+    assert await frontier.q_len() == 10
+
+
+@pytest.mark.asyncio
+async def test_spilled_urls_are_refilled_and_crawled_once(redis, frontier, tmp_path):
+    crawled = []
+    while 1:
+        url = await frontier.next_url()
+        if url is None:
+            break
+        crawled.append(url)
+        await frontier.remove_current_from_pending()
+        await frontier.balance_spilled()
+    assert sorted(crawled) == sorted(URLS)
+    assert await frontier.q_len() == 0
+    assert not list(tmp_path.rglob("*.seg.gz"))
+    await frontier.release()
+
+
+@pytest.mark.asyncio
+async def test_urls_spilled_by_a_crashed_crawler_are_reaped(redis, frontier, tmp_path):
+    keys = frontier.keys
+    crashed = QueueSpiller(
+        redis, keys, str(tmp_path), "crashed:0", hot_size=1, segment_size=1
+    )
+    queued = await redis.llen(keys.queue)
+    # the crawler crashed before writing the segment of the entries it took
+    await SPILL_SCRIPT(
+        redis,
+        keys=[keys.queue, crashed.spilling_key, crashed.leases_key],
+        args=[1, 1, 60_000],
+    )
+    assert await redis.llen(keys.queue) == queued - 1
+    assert await frontier.home.spiller.reap() == 0
+    await redis.zadd(crashed.leases_key, 0, crashed.spilling_key)
+    assert await frontier.home.spiller.reap() == 1
+    assert await redis.llen(keys.queue) == queued
+    assert not await redis.exists(crashed.spilling_key)
+    assert await frontier.q_len() == 10
@@ -0,0 +1,68 @@
+import pytest
+
+from autobrowser.frontier import MemoryQueue, QueueEntry, StreamFrontier
+
+
+@pytest.mark.asyncio
+async def test_memory_queue_doubles_backoff_up_to_the_maximum(event_loop):
+    queue = MemoryQueue({"max_retries": 3}, loop=event_loop)
+    queue.push(QueueEntry("http://example.com/", 0))
+    entry, _ = queue.pop()
+    backoffs = [queue.retry(entry, 0.001, 0.003) for _ in range(4)]
+    assert backoffs == [0.001, 0.002, 0.003, 0]
+    assert [failed.url for failed in queue.failed] == ["http://example.com/"]
+
+
+@pytest.mark.asyncio
+async def test_failed_navigations_are_retried_after_their_backoff(
+    redis, create_frontier
+):
+    frontier = await create_frontier(
+        dict(max_retries=2),
+        frontier_prefetch=0,
+        retry_backoff=0.05,
+        retry_backoff_max=0.08,
+    )
+    retry_key = f"{frontier.keys.queue}:retry"
+    await frontier.admit(["http://example.com/"], 1)
+    for backoff in (50, 80):
+        assert await frontier.next_url() == "http://example.com/"
+        raw = frontier.currently_crawling.raw
+        assert await frontier.retry_current()
+        due = await redis.zscore(retry_key, raw)
+        assert backoff - 20 <= due - await redis.time() * 1000 <= backoff
+    # next_url waits for the retry to become due
+    assert await frontier.next_url() == "http://example.com/"
+    assert not await frontier.retry_current()
+    assert await redis.zcard(retry_key) == 0
+    assert await redis.llen(frontier.keys.failed) == 1
+    assert await frontier.next_url() is None
+
+
+@pytest.mark.asyncio
+async def test_stream_frontier_retries_after_the_backoff(redis, create_frontier):
+    frontier = await create_frontier(
+        dict(max_retries=2),
+        StreamFrontier,
+        frontier_prefetch=0,
+        retry_backoff=0.05,
+        retry_backoff_max=0.08,
+    )
+    retry_key = f"{frontier.keys.queue}:retry"
+    await frontier.admit(["http://example.com/"], 1)
+    for retries, backoff in ((1, 50), (2, 80)):
+        assert await frontier.next_url() == "http://example.com/"
+        before = await redis.time() * 1000
+        assert await frontier.retry_current()
+        after = await redis.time() * 1000
+        assert await redis.xlen(frontier.keys.queue_stream) == 0
+        [(member, due)] = await redis.zrange(retry_key, withscores=True)
+        assert member.startswith(f"{retries}\t")
+        assert before + backoff - 1 <= due <= after + backoff
+        assert await frontier.q_len() == 1
+    # next_url waits for the retry to become due
+    assert await frontier.next_url() == "http://example.com/"
+    assert not await frontier.retry_current()
+    assert await redis.zcard(retry_key) == 0
+    assert await redis.llen(frontier.keys.failed) == 1
+    assert await frontier.next_url() is None
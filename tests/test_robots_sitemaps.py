@@ -0,0 +1,163 @@
+import gzip
+from typing import Dict, Tuple
+
+import pytest
+from aiohttp import ClientResponseError, ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from autobrowser.frontier import RobotsStore, SitemapFeeder
+from autobrowser.frontier.robots import parse_robots
+from autobrowser.frontier.sitemaps import iter_sitemap
+from autobrowser.util import create_autologger
+
+ROBOTS_TXT = """
+User-agent: *
+Disallow: /
+
+User-agent: autobrowser
+User-agent: other
+Disallow: /private
+Allow: /private/public
+Disallow: /*.pdf$
+Crawl-delay: 2.5
+
+Sitemap: http://example.com/sitemap.xml
+"""
+
+URLSET = b"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <url><loc>http://example.com/a</loc></url>
+  <url><loc> http://example.com/b </loc><lastmod>2024-01-01</lastmod></url>
+</urlset>
+"""
+
+SITEMAP_INDEX = b"""<?xml version="1.0" encoding="UTF-8"?>
+<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+  <sitemap><loc>http://example.com/sitemap-1.xml</loc></sitemap>
+</sitemapindex>
+"""
+
+ENTITIES = b"""<?xml version="1.0"?>
+<!DOCTYPE lolz [<!ENTITY lol "lol">]>
+<urlset><url><loc>http://example.com/&lol;</loc></url></urlset>
+"""
+
+
+@pytest.fixture
+async def sitemap_server(event_loop):
+    #: path -> (status, body)
+    pages: Dict[str, Tuple[int, bytes]] = {}
+
+    async def handle(request: web.Request) -> web.Response:
+        status, body = pages.get(request.path, (404, b""))
+        return web.Response(status=status, body=body)
+
+    app = web.Application()
+    app.router.add_get("/{path:.*}", handle)
+    server = TestServer(app, loop=event_loop)
+    await server.start_server(loop=event_loop)
+    session = ClientSession()
+    yield server, session, pages
+    await session.close()
+    await server.close()
+
+
+async def read_sitemap(server, session, path):
+    logger = create_autologger("tests", "sitemaps")
+    return [
+        location
+        async for location in iter_sitemap(session, str(server.make_url(path)), logger)
+    ]
+
+
+def test_parse_robots_uses_the_most_specific_group():
+    rules = parse_robots(ROBOTS_TXT, "Mozilla/5.0 (compatible; autobrowser/1.0)")
+    assert rules.crawl_delay == 2.5
+    assert rules.sitemaps == ["http://example.com/sitemap.xml"]
+    assert rules.allowed("http://example.com/")
+    assert not rules.allowed("http://example.com/private/page")
+    # the longest matching rule applies
+    assert rules.allowed("http://example.com/private/public/page")
+    assert not rules.allowed("http://example.com/docs/report.pdf")
+    assert rules.allowed("http://example.com/docs/report.pdf?download=1")
+
+    others = parse_robots(ROBOTS_TXT, "somebot")
+    assert not others.allowed("http://example.com/page")
+    assert others.allowed("http://example.com/robots.txt")
+    assert others.crawl_delay is None
+    assert parse_robots("", "somebot").allowed("http://example.com/page")
+
+
+@pytest.mark.asyncio
+async def test_iter_sitemap_parses_xml_text_and_gzip_sitemaps(sitemap_server):
+    server, session, pages = sitemap_server
+    pages["/sitemap.xml"] = (200, URLSET)
+    pages["/sitemap.xml.gz"] = (200, gzip.compress(URLSET))
+    pages["/bom.xml.gz"] = (200, gzip.compress(b"\xef\xbb\xbf" + URLSET))
+    pages["/index.xml"] = (200, SITEMAP_INDEX)
+    pages["/sitemap.txt"] = (200, b"\nhttp://example.com/a\r\nhttp://example.com/b")
+    urls = [("http://example.com/a", False), ("http://example.com/b", False)]
+    assert await read_sitemap(server, session, "/sitemap.xml") == urls
+    assert await read_sitemap(server, session, "/sitemap.xml.gz") == urls
+    assert await read_sitemap(server, session, "/bom.xml.gz") == urls
+    assert await read_sitemap(server, session, "/sitemap.txt") == urls
+    assert await read_sitemap(server, session, "/index.xml") == [
+        ("http://example.com/sitemap-1.xml", True)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_iter_sitemap_refuses_entities_and_missing_sitemaps(sitemap_server):
+    server, session, pages = sitemap_server
+    pages["/entities.xml"] = (200, ENTITIES)
+    pages["/broken.xml"] = (500, b"")
+    assert await read_sitemap(server, session, "/entities.xml") == []
+    assert await read_sitemap(server, session, "/missing.xml") == []
+    with pytest.raises(ClientResponseError):
+        await read_sitemap(server, session, "/broken.xml")
+
+
+@pytest.mark.asyncio
+async def test_sitemap_feeder_records_origins_once_fed(
+    redis, create_frontier, sitemap_server, event_loop
+):
+    server, session, pages = sitemap_server
+    origin = str(server.make_url("")).rstrip("/")
+    pages["/robots.txt"] = (200, f"Sitemap: {origin}/urls.txt\n".encode())
+    pages["/urls.txt"] = (
+        200,
+        f"{origin}/a\n{origin}/b\nhttp://example.com/c\n".encode(),
+    )
+    frontier = await create_frontier({}, frontier_prefetch=0)
+    robots = RobotsStore(redis, session, loop=event_loop)
+    feeder = SitemapFeeder(frontier, session, robots, loop=event_loop)
+
+    stats = await feeder.feed(f"{origin}/", 1)
+    assert (stats.read, stats.invalid) == (3, 1)
+    assert await frontier.q_len() == 2
+    assert await redis.hexists(feeder.key, origin)
+    assert not feeder.should_feed(f"{origin}/page")
+    other = SitemapFeeder(frontier, session, robots, loop=event_loop)
+    assert await other.feed(f"{origin}/", 1) is None
+
+
+@pytest.mark.asyncio
+async def test_sitemap_feeder_does_not_record_unfetched_origins(
+    redis, create_frontier, sitemap_server, event_loop
+):
+    server, session, pages = sitemap_server
+    origin = str(server.make_url("")).rstrip("/")
+    pages["/sitemap.xml"] = (503, b"")
+    frontier = await create_frontier({}, frontier_prefetch=0)
+    robots = RobotsStore(redis, session, loop=event_loop)
+    feeder = SitemapFeeder(frontier, session, robots, loop=event_loop)
+
+    assert await feeder.feed(f"{origin}/", 1) is None
+    assert not await redis.hexists(feeder.key, origin)
+    assert await frontier.q_len() == 0
+    # the origin is fed again once its claim expired
+    await redis.delete(f"{feeder.key}:feeding:{origin}")
+    pages["/sitemap.xml"] = (200, f"{origin}/a\n".encode())
+    other = SitemapFeeder(frontier, session, robots, loop=event_loop)
+    assert (await other.feed(f"{origin}/", 1)).read == 1
+    assert await redis.hexists(feeder.key, origin)
@@ -0,0 +1,66 @@
+import pytest
+
+from autobrowser.automation import build_automation_config
+from autobrowser.frontier import AdmissionResult, SqliteFrontier, close_sqlite_queues
+
+
+@pytest.fixture
+def create_sqlite_frontier(tmp_path, event_loop):
+    async def create():
+        config = build_automation_config(
+            autoid="sqlite-test",
+            reqid="test",
+            frontier_backend="sqlite",
+            frontier_db=str(tmp_path / "frontier.db"),
+            frontier_info={
+                "crawl_depth": 2,
+                "max_retries": 1,
+                "seeds": ["http://example.com/"],
+            },
+        )
+        frontier = SqliteFrontier(None, config, loop=event_loop)
+        await frontier.init()
+        return frontier
+
+    yield create
+    close_sqlite_queues()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_frontier_admits_unseen_urls_once(create_sqlite_frontier):
+    frontier = await create_sqlite_frontier()
+    admitted = await frontier.admit(
+        ["http://example.com/", "http://example.com/a", "http://example.com/a"], 1
+    )
+    assert [result for _, result in admitted] == [
+        AdmissionResult.SEEN,
+        AdmissionResult.ADDED,
+        AdmissionResult.SEEN,
+    ]
+    assert await frontier.q_len() == 2
+    assert await frontier.next_url() == "http://example.com/"
+    await frontier.remove_current_from_pending()
+    assert await frontier.next_url() == "http://example.com/a"
+    await frontier.remove_current_from_pending()
+    assert await frontier.next_url() is None
+    assert await frontier.exhausted()
+
+
+@pytest.mark.asyncio
+async def test_sqlite_frontier_survives_restarts(create_sqlite_frontier):
+    frontier = await create_sqlite_frontier()
+    await frontier.admit(["http://example.com/a"], 1)
+    assert await frontier.next_url() == "http://example.com/"
+    close_sqlite_queues()
+
+    frontier = await create_sqlite_frontier()
+    assert await frontier.q_len() == 2
+    admitted = await frontier.admit(["http://example.com/a"], 1)
+    assert admitted == [("http://example.com/a", AdmissionResult.SEEN)]
+    assert await frontier.next_url() == "http://example.com/"
+    close_sqlite_queues()
+
+    # the seed was claimed when both runs stopped, exceeding max_retries
+    frontier = await create_sqlite_frontier()
+    assert await frontier.q_len() == 1
+    assert await frontier.next_url() == "http://example.com/a"
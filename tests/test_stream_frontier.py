@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from autobrowser.frontier import StreamFrontier
+
+URLS = ["http://example.com/1", "http://example.com/2"]
+
+
+async def consumers(redis, frontier):
+    info = await redis.execute(
+        "XINFO", "CONSUMERS", frontier.keys.queue_stream, "crawlers"
+    )
+    return {dict(zip(fields[::2], fields[1::2]))["name"] for fields in info}
+
+
+@pytest.mark.asyncio
+async def test_completed_urls_are_acknowledged(redis, create_frontier):
+    frontier = await create_frontier({}, StreamFrontier, frontier_prefetch=0)
+    assert await frontier.admit(URLS + URLS[:1], 1)
+    assert await frontier.q_len() == 2
+    crawled = []
+    for _ in URLS:
+        crawled.append(await frontier.next_url())
+        await frontier.remove_current_from_pending()
+    assert crawled == URLS
+    assert await frontier.next_url() is None
+    await frontier.release()
+    assert await redis.xlen(frontier.keys.queue_stream) == 0
+
+
+@pytest.mark.asyncio
+async def test_urls_of_stopped_crawlers_are_reclaimed(redis, create_frontier):
+    crashed = await create_frontier({}, StreamFrontier, frontier_prefetch=0)
+    live = await create_frontier(
+        {}, StreamFrontier, frontier_prefetch=0, frontier_lease_time=1
+    )
+    await crashed.admit(URLS[:1], 1)
+    assert await crashed.next_url() == URLS[0]
+    await redis.execute(
+        "XCLAIM",
+        crashed.keys.queue_stream,
+        "crawlers",
+        crashed.crawler_id,
+        0,
+        crashed.currently_crawling.stream_id,
+        "IDLE",
+        60_000,
+        "JUSTID",
+    )
+    assert await live.next_url() == URLS[0]
+    await live.remove_current_from_pending()
+    assert await live.next_url() is None
+    assert await consumers(redis, live) == {crashed.crawler_id, live.crawler_id}
+    await asyncio.sleep(1.1)
+    await live.renew_leases()
+    assert await consumers(redis, live) == {live.crawler_id}
+    await live.release()
+
+
+@pytest.mark.asyncio
+async def test_blocking_wait_reads_the_admitted_url(redis, create_frontier, event_loop):
+    waiting = await create_frontier(
+        {}, frontier_class=StreamFrontier, wait_for_q_blocking=True
+    )
+    waiter = event_loop.create_task(waiting.wait_for_populated_q(10, 5))
+    await asyncio.sleep(0.1)
+    await waiting.admit(["http://example.com/"], 1)
+    assert not await asyncio.wait_for(waiter, 3)
+    assert await waiting.next_url() == "http://example.com/"
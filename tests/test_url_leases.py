@@ -0,0 +1,63 @@
+import pytest
+
+
+async def expire_leases(redis, frontier) -> None:
+    for raw in await redis.zrange(frontier.keys.pending_leases):
+        await redis.zadd(frontier.keys.pending_leases, 0, raw)
+
+
+@pytest.mark.asyncio
+async def test_claimed_urls_are_leased_by_their_crawler(redis, create_frontier):
+    frontier = await create_frontier({}, frontier_prefetch=0)
+    await frontier.admit(["http://example.com/"], 1)
+    assert await frontier.next_url() == "http://example.com/"
+    raw = frontier.currently_crawling.raw
+    assert await redis.smembers(frontier.keys.leased_by(frontier.crawler_id)) == [raw]
+    assert await redis.zscore(frontier.keys.pending_leases, raw) is not None
+    await frontier.remove_current_from_pending()
+    await frontier.release()
+    assert await redis.zcard(frontier.keys.pending_leases) == 0
+    assert await redis.scard(frontier.keys.leased_by(frontier.crawler_id)) == 0
+
+
+@pytest.mark.asyncio
+async def test_expired_leases_are_returned_to_the_queue(redis, create_frontier):
+    crashed = await create_frontier({}, frontier_prefetch=0)
+    live = await create_frontier({}, frontier_prefetch=0)
+    await crashed.admit(["http://example.com/"], 1)
+    assert await crashed.next_url() == "http://example.com/"
+    assert await live.renew_leases() == 0
+    await expire_leases(redis, crashed)
+    assert await live.renew_leases() == 1
+    assert await live.next_url() == "http://example.com/"
+    assert await redis.hget(live.keys.pending_retries, "http://example.com/") == "1"
+    await live.remove_current_from_pending()
+    await live.release()
+
+
+@pytest.mark.asyncio
+async def test_completed_urls_are_renewed_until_released(redis, create_frontier):
+    crawler = await create_frontier({}, frontier_prefetch=0)
+    other = await create_frontier({}, frontier_prefetch=0)
+    await crawler.admit(["http://example.com/"], 1)
+    assert await crawler.next_url() == "http://example.com/"
+    await crawler.remove_current_from_pending()
+    await expire_leases(redis, crawler)
+    await crawler.renew_leases()
+    assert await other.renew_leases() == 0
+    await crawler.release()
+    assert await other.next_url() is None
+
+
+@pytest.mark.asyncio
+async def test_urls_returned_already_are_not_parked(redis, create_frontier):
+    crawler = await create_frontier({}, frontier_prefetch=0)
+    other = await create_frontier({}, frontier_prefetch=0)
+    await crawler.admit(["http://example.com/"], 1)
+    assert await crawler.next_url() == "http://example.com/"
+    await expire_leases(redis, crawler)
+    assert await other.renew_leases() == 1
+    # the URL is not to be navigated to although it was not parked
+    assert await crawler.park_current(60)
+    assert await redis.zcard(f"{crawler.keys.queue}:retry") == 0
+    assert await crawler.q_len() == 1
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+URLS = [f"http://example.com/{i}" for i in range(3)]
+
+
+@pytest.mark.asyncio
+async def test_blocking_wait_wakes_without_reordering_the_queue(
+    redis, create_frontier, event_loop
+):
+    waiting = await create_frontier({}, frontier_prefetch=0, wait_for_q_blocking=True)
+    admitting = await create_frontier({}, frontier_prefetch=0)
+    started = event_loop.time()
+    waiter = event_loop.create_task(waiting.wait_for_populated_q(10, 5))
+    await asyncio.sleep(0.1)
+    await admitting.admit(URLS, 1)
+    assert not await asyncio.wait_for(waiter, 3)
+    assert event_loop.time() - started < 3
+    for url in URLS:
+        assert await waiting.next_url() == url
+        await waiting.remove_current_from_pending()
+    await waiting.release()
+
+
+@pytest.mark.asyncio
+async def test_blocking_wait_leaves_the_bucket_index_untouched(
+    redis, create_frontier, event_loop
+):
+    waiting = await create_frontier(
+        dict(crawl_order="bfs"), frontier_prefetch=0, wait_for_q_blocking=True
+    )
+    waiter = event_loop.create_task(waiting.wait_for_populated_q(10, 5))
+    await asyncio.sleep(0.1)
+    await waiting.admit(URLS, 1)
+    assert not await asyncio.wait_for(waiter, 3)
+    assert await redis.zrange(waiting.keys.queue_buckets) == ["1"]
+    assert await waiting.q_len() == 3